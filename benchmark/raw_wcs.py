@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the construction of WCS for raw observations.
+
+Compares building the spatial, spectral and temporal WCS for every
+file of an observation (as raw.build_observation used to) with
+building the spatial and temporal WCS once per observation and the
+spectral WCS once per subsystem.
+
+Run from the top level of the repository:
+
+    PYTHONPATH=lib python benchmark/raw_wcs.py
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+from datetime import datetime, timedelta
+import logging
+import timeit
+
+from jcmt2caom2.raw import raw
+
+
+def make_observation():
+    """
+    Create common, subsystem and hybrid information resembling
+    an ACSIS science observation.
+    """
+
+    date_obs = datetime(2020, 1, 1, 10, 0, 0)
+
+    common = {
+        'obsid': 'acsis_00012_20200101T100000',
+        'obs_type': 'science',
+        'backend': 'ACSIS',
+        'date_obs': date_obs,
+        'date_end': date_obs + timedelta(minutes=30),
+        'obsrabl': 83.80, 'obsdecbl': -5.40,
+        'obsrabr': 83.84, 'obsdecbr': -5.40,
+        'obsratr': 83.84, 'obsdectr': -5.36,
+        'obsratl': 83.80, 'obsdectl': -5.36,
+    }
+
+    subsystem = {
+        'sb_mode': 'SSB',
+        'freq_sig_lower': 345.5, 'freq_sig_upper': 346.5,
+        'ssysobs': 'TOPOCENT', 'ssyssrc': 'LSRK', 'zsource': 0.00003,
+        'molecule': 'CO', 'transiti': '3  - 2',
+    }
+
+    hybrid = {
+        'meanfreq': 345.8, 'ifchansp': 488281.25, 'restfreq': 345.796e9,
+    }
+
+    return (common, subsystem, hybrid)
+
+
+def per_file(ingest, common, subsystem, hybrid, n_subsystem, n_file):
+    for i in range(n_subsystem):
+        for j in range(n_file):
+            ingest.build_spatial_wcs(common, 0.004)
+            ingest.build_spectral_wcs(common, subsystem, hybrid)
+            ingest.build_temporal_wcs(common)
+
+
+def shared(ingest, common, subsystem, hybrid, n_subsystem, n_file):
+    ingest.build_spatial_wcs(common, 0.004)
+    ingest.build_temporal_wcs(common)
+
+    for i in range(n_subsystem):
+        ingest.build_spectral_wcs(common, subsystem, hybrid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--subsystems', type=int, default=4,
+                        help='number of subsystems in the observation')
+    parser.add_argument('--files', type=int, default=20,
+                        help='number of files per subsystem')
+    parser.add_argument('--number', type=int, default=20,
+                        help='observations per timing')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of timings (the fastest is reported)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    ingest = raw()
+    (common, subsystem, hybrid) = make_observation()
+    ingest.obsid = common['obsid']
+
+    for function in (per_file, shared):
+        seconds = min(timeit.repeat(
+            lambda: function(ingest, common, subsystem, hybrid,
+                             args.subsystems, args.files),
+            number=args.number, repeat=args.repeat))
+
+        print('{0}: {1:.2f} ms per observation'.format(
+            function.__name__, 1000.0 * seconds / args.number))
+
+
+if __name__ == '__main__':
+    main()
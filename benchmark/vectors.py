@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the TwoD and ThreeD vector classes.
+
+Times a workload resembling the footprint calculations in
+raw.build_spatial_wcs (padding a line in Y by the beam size and
+checking the included angles at the corners) and measures the
+memory used per instance.
+
+Run from the top level of the repository:
+
+    PYTHONPATH=lib python benchmark/vectors.py
+
+To compare with another revision, check it out in a separate
+work tree and run this script with PYTHONPATH set to its lib
+directory.
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import math
+import timeit
+import tracemalloc
+
+from jcmt2caom2.jsa.threed import ThreeD
+from jcmt2caom2.jsa.twod import TwoD
+
+
+def footprint_workload():
+    bl = TwoD(10.0, 20.0)
+    br = TwoD(10.0, 20.0)
+    tl = TwoD(10.0, 21.0)
+    tr = TwoD(10.0, 21.0)
+    halfbeam = 0.002
+
+    for i in range(10):
+        diff = tl - bl
+        mean = (tl + bl) / 2.0
+        cosdec = math.cos(mean.y * math.pi / 180.0)
+
+        unitX = TwoD(diff.y, -diff.x * cosdec)
+        unitX = unitX / unitX.abs()
+        offsetX = -halfbeam * TwoD(unitX.x / cosdec, unitX.y)
+
+        unitY = TwoD(diff.x * cosdec, diff.y)
+        unitY = unitY / unitY.abs()
+        offsetY = halfbeam * TwoD(unitY.x / cosdec, unitY.y)
+
+        corners = (bl - offsetX - offsetY, br + offsetX - offsetY,
+                   tr + offsetX + offsetY, tl - offsetX + offsetY)
+
+    (a, b, c, d) = (ThreeD(x) for x in corners)
+    ThreeD.included_angle(b, a, d)
+    ThreeD.included_angle(c, b, a)
+    ThreeD.included_angle(d, c, b)
+    ThreeD.included_angle(a, d, c)
+
+
+def instance_size(factory, n=10000):
+    tracemalloc.start()
+    try:
+        instances = [factory() for i in range(n)]
+        (current, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return current / len(instances)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--number', type=int, default=2000,
+                        help='workload calls per timing')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of timings (the fastest is reported)')
+    args = parser.parse_args()
+
+    seconds = min(timeit.repeat(
+        footprint_workload, number=args.number, repeat=args.repeat))
+
+    print('footprint workload: {0:.1f} us per call'.format(
+        1.0e6 * seconds / args.number))
+    print('TwoD instance: {0:.0f} bytes'.format(
+        instance_size(lambda: TwoD(1.0, 2.0))))
+    print('ThreeD instance: {0:.0f} bytes'.format(
+        instance_size(lambda: ThreeD(1.0, 2.0, 3.0))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Queries of the JCMT archive database covering many observations at once.
+
+These supplement the single-observation methods of the
+omp.db.part.arc.ArcDB class, and are given an ArcDB object as their
+first argument.  Queries are made via the object's database lock
+in the same manner as the ArcDB methods themselves.
+"""
+
+from collections import defaultdict, namedtuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+RawObsInfo = namedtuple('RawObsInfo', ('common', 'subsystem', 'files'))
+
+
+def find_obsids(conn, utdate_start, utdate_end=None):
+    """
+    Find the obsids of all observations taken in the given range
+    of UT dates (inclusive), ordered by observation start time.
+
+    Dates are given as integers (or strings) in YYYYMMDD format.  If no
+    end date is given, all observations from `utdate_start` onwards
+    are found.
+    """
+
+    logger.debug('Finding observations from %s to %s',
+                 utdate_start, utdate_end)
+
+    where = ['utdate >= %(s)s']
+    params = {'s': int(utdate_start)}
+
+    if utdate_end is not None:
+        where.append('utdate <= %(e)s')
+        params['e'] = int(utdate_end)
+
+    with conn.db as c:
+        c.execute(
+            'SELECT obsid FROM jcmt.COMMON '
+            'WHERE ' + ' AND '.join(where) + ' '
+            'ORDER BY date_obs',
+            params)
+
+        return [row[0] for row in c.fetchall()]
+
+
+def find_obsids_modified_since(conn, since):
+    """
+    Find observations for which the COMMON entry has been modified, or
+    an ompobslog comment has been added, after the given time.
+
+    Returns a list of (obsid, modification time) tuples in order of
+    modification time.
+    """
+
+    logger.debug('Finding observations modified since %s', since)
+
+    modified = {}
+
+    with conn.db as c:
+        c.execute(
+            'SELECT obsid, last_modified FROM jcmt.COMMON '
+            'WHERE last_modified > %(t)s',
+            {'t': since})
+
+        for (obsid, last_modified) in c.fetchall():
+            modified[obsid] = last_modified
+
+        c.execute(
+            'SELECT obsid, MAX(commentdate) FROM omp.ompobslog '
+            'WHERE commentdate > %(t)s AND obsid IS NOT NULL '
+            'GROUP BY obsid',
+            {'t': since})
+
+        for (obsid, commentdate) in c.fetchall():
+            if (obsid not in modified) or (commentdate > modified[obsid]):
+                modified[obsid] = commentdate
+
+    return sorted(modified.items(), key=lambda x: (x[1], x[0]))
+
+
+def find_obsids_commented(conn, since, until=None):
+    """
+    Find observations which had ompobslog comments added in the
+    given time range.
+
+    Returns a list of obsids in order of latest comment time.
+    """
+
+    logger.debug('Finding observations commented from %s to %s',
+                 since, until)
+
+    where = ['commentdate >= %(s)s', 'obsid IS NOT NULL']
+    params = {'s': since}
+
+    if until is not None:
+        where.append('commentdate < %(e)s')
+        params['e'] = until
+
+    with conn.db as c:
+        c.execute(
+            'SELECT obsid, MAX(commentdate) AS latest FROM omp.ompobslog '
+            'WHERE ' + ' AND '.join(where) + ' '
+            'GROUP BY obsid ORDER BY latest',
+            params)
+
+        return [row[0] for row in c.fetchall()]
+
+
+def prefetch_raw_info(conn, obsids):
+    """
+    Fetch the COMMON, ACSIS or SCUBA2, and FILES rows for the given
+    observations using one query per table.
+
+    Rows are returned as dictionaries, as by the ArcDB.query_table method,
+    and the file information is structured as returned by
+    ArcDB.get_files(obsid, with_info=True).
+
+    Returns a dictionary of RawObsInfo tuples by obsid.  Observations
+    with no COMMON entry are omitted.  The `subsystem` entry is the list of
+    ACSIS or SCUBA2 rows, and `files` is None if there are no entries
+    in FILES.
+    """
+
+    obsids = list(obsids)
+    if not obsids:
+        return {}
+
+    logger.debug('Prefetching metadata for %i observations', len(obsids))
+
+    common = _query_table_rows(conn, 'COMMON', obsids)
+
+    subsystem = defaultdict(list)
+    for (table, backends) in (
+            ('ACSIS', ('ACSIS', 'DAS', 'AOSC')),
+            ('SCUBA2', ('SCUBA-2',))):
+        table_obsids = [
+            obsid for (obsid, rows) in common.items()
+            if rows[0]['backend'] in backends]
+
+        if table_obsids:
+            subsystem.update(_query_table_rows(conn, table, table_obsids))
+
+    files = {}
+    (placeholders, params) = _in_list(common.keys())
+    with conn.db as c:
+        c.execute(
+            'SELECT obsid, obsid_subsysnr, file_id, filesize, md5sum '
+            'FROM jcmt.FILES '
+            'WHERE obsid IN (' + placeholders + ') '
+            'ORDER BY obsid, obsid_subsysnr, file_id',
+            params)
+
+        for (obsid, obsid_subsysnr, file_id, size, md5sum) in c.fetchall():
+            if obsid not in files:
+                files[obsid] = defaultdict(list)
+
+            files[obsid][obsid_subsysnr].append({
+                'name': file_id,
+                'size': size,
+                'md5sum': md5sum,
+            })
+
+    return {
+        obsid: RawObsInfo(rows[0], subsystem[obsid], files.get(obsid))
+        for (obsid, rows) in common.items()}
+
+
+def prefetch_obsid_status(conn, obsids):
+    """
+    Fetch the latest ompobslog status of each of the given observations
+    using a single query.
+
+    Returns a dictionary of status values by obsid, including an entry of
+    None for each observation which has no active status.
+    """
+
+    obsids = list(obsids)
+    result = dict.fromkeys(obsids)
+    if not obsids:
+        return result
+
+    logger.debug('Prefetching status for %i observations', len(obsids))
+
+    (placeholders, params) = _in_list(obsids)
+
+    with conn.db as c:
+        c.execute(
+            'SELECT obsid, commentstatus FROM omp.ompobslog '
+            'WHERE obslogid IN ('
+            'SELECT MAX(obslogid) FROM omp.ompobslog '
+            'WHERE obsid IN (' + placeholders + ') AND obsactive=1 '
+            'GROUP BY obsid)',
+            params)
+
+        for (obsid, status) in c.fetchall():
+            result[obsid] = status
+
+    return result
+
+
+def _query_table_rows(conn, table, obsids):
+    """
+    Query the given jcmt table for rows matching any of the obsids.
+
+    Returns a dictionary of lists of rows by obsid, where each row is
+    a dictionary by column name.
+    """
+
+    result = defaultdict(list)
+
+    (placeholders, params) = _in_list(obsids)
+
+    with conn.db as c:
+        c.execute(
+            'SELECT * FROM jcmt.' + table + ' '
+            'WHERE obsid IN (' + placeholders + ')',
+            params)
+
+        columns = [x[0] for x in c.description]
+
+        for row in c.fetchall():
+            row = dict(zip(columns, row))
+            result[row['obsid']].append(row)
+
+    return result
+
+
+def _in_list(values):
+    """
+    Prepare placeholders for an "IN" clause.
+
+    Returns a tuple of the placeholder string and parameter dictionary.
+    """
+
+    params = {}
+    placeholders = []
+
+    for (n, value) in enumerate(values):
+        name = 'v{0}'.format(n)
+        params[name] = value
+        placeholders.append('%(' + name + ')s')
+
+    return (', '.join(placeholders), params)
@@ -26,6 +26,10 @@ ObsInfo = namedtuple('ObsInfo',
                      ('prod_id', 'date_obs', 'date_end', 'release',
                       'artifact_uri'))
 
+ObsPlaneInfo = namedtuple('ObsPlaneInfo',
+                          ('plane_id', 'prod_id', 'date_obs', 'date_end',
+                           'release'))
+
 PlaneInfo = namedtuple('PlaneInfo',
                        ('obs_id', 'prod_id'))
 
@@ -33,6 +37,12 @@ FileInfo = namedtuple('FileInfo',
                       ('collection', 'obs_id', 'prod_id', 'artifact_uri'))
 
 
+def _quote_string(value):
+    # Quote a string for use in an ADQL query, doubling any single quotes
+    # since values such as observation IDs may come from file headers.
+    return '\'' + value.replace('\'', '\'\'') + '\''
+
+
 def _remove_file_extension(artifact_uri):
     # Assume that "." only appears in artifact URIs before a file extension
     # (appears true based on TAP queries performed to check).
@@ -102,35 +112,125 @@ class CAOM2TAP(object):
         """
         Get information for the given observation.
 
-        TODO: this tap query is as extracted from the "jcmt2caom2ingest"
-        module.  It repeats all the plane information for every artifact
-        in the plane.  Why not return only the observation info and make
-        a second query for artifacts?
+        Returns a list of ObsInfo tuples, one for each artifact.
+
+        This uses a single query, repeating the plane information for
+        every artifact in the plane, since for one observation this is
+        cheaper than the two queries made by get_obs_info_multiple.
         """
 
         result = []
 
-        for (prod_id, date_obs, date_end, release, artifact_uri) in self.tap.query(
-                'SELECT'
-                ' Plane.productID,'
-                ' Plane.time_bounds_lower,'
-                ' Plane.time_bounds_upper,'
-                ' Plane.dataRelease,'
-                ' Artifact.uri '
-                'FROM caom2.Observation as Observation'
-                ' INNER JOIN caom2.Plane AS Plane'
-                '  ON Observation.obsID=Plane.obsID'
-                ' INNER JOIN caom2.Artifact AS Artifact'
-                '  ON Plane.planeID=Artifact.planeID '
-                'WHERE Observation.collection=\'JCMT\''
-                ' AND Observation.observationID=\'{0}\''.format(obs_id)):
+        for (prod_id, date_obs, date_end, release, artifact_uri) in \
+                self.tap.query(
+                    'SELECT'
+                    ' Plane.productID,'
+                    ' Plane.time_bounds_lower,'
+                    ' Plane.time_bounds_upper,'
+                    ' Plane.dataRelease,'
+                    ' Artifact.uri '
+                    'FROM caom2.Observation as Observation'
+                    ' INNER JOIN caom2.Plane AS Plane'
+                    '  ON Observation.obsID=Plane.obsID'
+                    ' INNER JOIN caom2.Artifact AS Artifact'
+                    '  ON Plane.planeID=Artifact.planeID '
+                    'WHERE Observation.collection=\'JCMT\''
+                    ' AND Observation.observationID={0}'.format(
+                        _quote_string(obs_id))):
 
             artifact_uri = ascii_decode(artifact_uri)[0]
 
-            result.append(ObsInfo(prod_id, date_obs, date_end, release, artifact_uri))
+            result.append(ObsInfo(
+                prod_id, date_obs, date_end, release, artifact_uri))
+
+        return result
+
+    def get_obs_info_multiple(self, obs_ids, chunk_size=100):
+        """
+        Get information for multiple observations, as for get_obs_info.
+
+        The plane and artifact information is retrieved by
+        get_obs_planes_artifacts and then combined.
+
+        Returns a dictionary of lists of ObsInfo tuples by observation ID,
+        with an (empty) entry for each requested observation.
+        """
+
+        (planes, artifacts) = self.get_obs_planes_artifacts(
+            obs_ids, chunk_size=chunk_size)
+
+        result = {}
+
+        for (obs_id, obs_planes) in planes.items():
+            obs_result = result[obs_id] = []
+
+            for plane in obs_planes:
+                for artifact_uri in artifacts.get(plane.plane_id, ()):
+                    obs_result.append(ObsInfo(
+                        plane.prod_id, plane.date_obs, plane.date_end,
+                        plane.release, artifact_uri))
 
         return result
 
+    def get_obs_planes_artifacts(self, obs_ids, chunk_size=100):
+        """
+        Get plane and artifact information for multiple observations,
+        using separate queries for each chunk of the given list of
+        observation IDs so that the plane information is not repeated
+        for every artifact.  The artifact query only returns the plane ID
+        and URI of each artifact.
+
+        Returns a tuple of two dictionaries:
+
+        * Lists of ObsPlaneInfo tuples by observation ID, with an (empty)
+          entry for each requested observation.
+        * Lists of artifact URIs by plane ID.
+        """
+
+        obs_ids = list(obs_ids)
+        planes = {x: [] for x in obs_ids}
+        artifacts = {}
+
+        for i in range(0, len(obs_ids), chunk_size):
+            condition = (
+                'Observation.collection=\'JCMT\''
+                ' AND Observation.observationID IN ({0})'.format(
+                    ', '.join(_quote_string(x)
+                              for x in obs_ids[i:i + chunk_size])))
+
+            for (obs_id, plane_id, prod_id, date_obs, date_end, release) in \
+                    self.tap.query(
+                        'SELECT'
+                        ' Observation.observationID,'
+                        ' Plane.planeID,'
+                        ' Plane.productID,'
+                        ' Plane.time_bounds_lower,'
+                        ' Plane.time_bounds_upper,'
+                        ' Plane.dataRelease '
+                        'FROM caom2.Observation as Observation'
+                        ' INNER JOIN caom2.Plane AS Plane'
+                        '  ON Observation.obsID=Plane.obsID '
+                        'WHERE ' + condition):
+
+                planes.setdefault(obs_id, []).append(ObsPlaneInfo(
+                    plane_id, prod_id, date_obs, date_end, release))
+
+            for (plane_id, artifact_uri) in self.tap.query(
+                    'SELECT'
+                    ' Artifact.planeID,'
+                    ' Artifact.uri '
+                    'FROM caom2.Observation as Observation'
+                    ' INNER JOIN caom2.Plane AS Plane'
+                    '  ON Observation.obsID=Plane.obsID'
+                    ' INNER JOIN caom2.Artifact AS Artifact'
+                    '  ON Plane.planeID=Artifact.planeID '
+                    'WHERE ' + condition):
+
+                artifacts.setdefault(plane_id, []).append(
+                    ascii_decode(artifact_uri)[0])
+
+        return (planes, artifacts)
+
     def get_planes_with_run_id(self, collection, run_ids):
         """
         Get information on planes featuring a (provenance) run ID
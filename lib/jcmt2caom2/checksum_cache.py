@@ -0,0 +1,123 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Persistent cache of file checksums, stored in an SQLite file.
+
+Entries are keyed by absolute path and are only used if the size,
+modification time and inode number of the file are unchanged.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+
+from jcmt2caom2.md5sum import get_md5sum
+
+logger = logging.getLogger(__name__)
+
+
+class ChecksumCache(object):
+    """
+    Class for access to a checksum cache file.
+
+    Instances may be shared between threads.
+    """
+
+    def __init__(self, filename):
+        """
+        Open the given cache file, creating it if it does not exist.
+        """
+
+        self.lock = threading.Lock()
+
+        # Use autocommit mode so that each entry is stored atomically
+        # as soon as it has been computed.
+        self.db = sqlite3.connect(
+            filename, timeout=60, isolation_level=None,
+            check_same_thread=False)
+
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS md5sum ('
+            'path TEXT PRIMARY KEY, '
+            'size INTEGER NOT NULL, '
+            'mtime_ns INTEGER NOT NULL, '
+            'inode INTEGER NOT NULL, '
+            'md5sum TEXT NOT NULL)')
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def get_md5sum(self, filename):
+        """
+        Get the MD5 sum of a file, computing it only if the cache
+        does not contain an entry for the current version of the file.
+        """
+
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        key = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+        with self.lock:
+            row = self.db.execute(
+                'SELECT size, mtime_ns, inode, md5sum FROM md5sum '
+                'WHERE path=?', (path,)).fetchone()
+
+        if row is not None and tuple(row[:3]) == key:
+            return row[3]
+
+        md5sum = get_md5sum(path)
+
+        # Only store the result if the file did not change while it was
+        # being read.
+        stat = os.stat(path)
+        if (stat.st_size, stat.st_mtime_ns, stat.st_ino) != key:
+            logger.warning('File %s changed while computing MD5 sum', path)
+            return md5sum
+
+        with self.lock:
+            self.db.execute(
+                'INSERT OR REPLACE INTO md5sum '
+                '(path, size, mtime_ns, inode, md5sum) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (path,) + key + (md5sum,))
+
+        return md5sum
+
+    def purge(self):
+        """
+        Remove entries for files which no longer exist.
+
+        Returns the number of entries removed.
+        """
+
+        with self.lock:
+            paths = [x[0] for x in self.db.execute('SELECT path FROM md5sum')]
+
+        removed = [x for x in paths if not os.path.exists(x)]
+
+        with self.lock:
+            self.db.execute('BEGIN IMMEDIATE')
+            try:
+                for path in removed:
+                    self.db.execute('DELETE FROM md5sum WHERE path=?', (path,))
+                self.db.execute('COMMIT')
+            except:
+                self.db.execute('ROLLBACK')
+                raise
+
+        return len(removed)
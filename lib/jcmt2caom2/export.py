@@ -0,0 +1,156 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Export of CAOM-2 observations as XML into compressed archive files.
+"""
+
+from io import BytesIO
+import logging
+import re
+import tarfile
+import time
+import zipfile
+
+from caom2.obs_reader_writer import ObservationWriter
+
+from tools4caom2.error import CAOMError
+
+logger = logging.getLogger(__name__)
+
+# Archive file name extensions and corresponding tarfile modes.
+# A mode of None indicates a zip file.
+archive_formats = (
+    ('.tar.gz', 'w:gz'),
+    ('.tgz', 'w:gz'),
+    ('.tar.bz2', 'w:bz2'),
+    ('.tar.xz', 'w:xz'),
+    ('.zip', None),
+)
+
+index_name = 'index.txt'
+
+
+class ObservationArchive(object):
+    """
+    Class for writing serialized observations into a compressed tar
+    or zip file.
+
+    Each observation is stored as a separate XML member, and a member
+    named "index.txt" is added on closing the archive, giving the obsid
+    and member name of each observation (tab-separated).
+
+    If a shard size is given, a new archive is started after that
+    many observations, with a shard number inserted into the file name
+    before the extension.
+    """
+
+    def __init__(self, filename, shard_size=None, writer=None):
+        for (extension, mode) in archive_formats:
+            if filename.endswith(extension):
+                self.prefix = filename[:-len(extension)]
+                self.extension = extension
+                self.mode = mode
+                break
+        else:
+            raise CAOMError(
+                'Unrecognised archive file extension: {0}'.format(filename))
+
+        self.filename = filename
+        self.shard_size = shard_size
+        self.writer = writer if writer is not None else ObservationWriter()
+
+        self.shard = 0
+        self.archive = None
+        self.index = []
+
+        # Names of the archive files written.
+        self.filenames = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type_, value, tb):
+        self.close()
+
+    def add(self, obsid, observation):
+        """
+        Serialize an observation and add it to the archive.
+        """
+
+        if ((self.archive is None) or (
+                (self.shard_size is not None) and
+                (len(self.index) >= self.shard_size))):
+            self._next_shard()
+
+        buff = BytesIO()
+        self.writer.write(observation, buff)
+
+        name = re.sub('[^-_A-Za-z0-9]', '_', obsid) + '.xml'
+
+        self._add_member(name, buff.getvalue())
+        self.index.append((obsid, name))
+
+    def close(self):
+        """
+        Write the index and close the current archive file.
+        """
+
+        if self.archive is None:
+            return
+
+        self._add_member(index_name, ''.join(
+            '{0}\t{1}\n'.format(*x) for x in self.index).encode('utf-8'))
+
+        self.archive.close()
+        self.archive = None
+
+        logger.info('Wrote %i observations to %s',
+                    len(self.index), self.filenames[-1])
+
+    def _next_shard(self):
+        """
+        Close the current archive file, if any, and open the next one.
+        """
+
+        self.close()
+
+        if self.shard_size is None:
+            filename = self.filename
+        else:
+            self.shard += 1
+            filename = '{0}-{1:04d}{2}'.format(
+                self.prefix, self.shard, self.extension)
+
+        if self.mode is None:
+            self.archive = zipfile.ZipFile(
+                filename, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            self.archive = tarfile.open(filename, self.mode)
+
+        self.index = []
+        self.filenames.append(filename)
+
+    def _add_member(self, name, data):
+        if self.mode is None:
+            self.archive.writestr(name, data)
+
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            self.archive.addfile(info, BytesIO(data))
@@ -0,0 +1,106 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Scanning of directory trees for files to be ingested.
+"""
+
+from collections import OrderedDict, deque
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+
+def combine_regexes(regexes):
+    """
+    Combine a list of compiled regular expressions into a single
+    compiled alternation which matches if any of them would match.
+
+    The regular expressions must all have been compiled with the same
+    flags, which are applied to the combined expression.  Otherwise
+    ValueError is raised, since the flags apply to the whole of the
+    combined expression.
+    """
+
+    regexes = list(regexes)
+
+    flags = set(x.flags for x in regexes)
+
+    if len(flags) > 1:
+        raise ValueError(
+            'Can not combine regular expressions with different flags')
+
+    return re.compile(
+        '|'.join('(?:{0})'.format(x.pattern) for x in regexes),
+        flags.pop() if flags else 0)
+
+
+def scan_files(rootdir, pattern):
+    """
+    Find files in the directory tree rooted at `rootdir` with names
+    matching the given compiled regular expression.
+
+    Each directory is visited once, including those reached via symbolic
+    links.  Files which are empty, or which can not be accessed, are
+    omitted.
+
+    Returns an ordered dictionary of `os.stat_result` objects by
+    file path, in order of directory traversal and then file name.
+    """
+
+    result = OrderedDict()
+    visited = set()
+    pending = deque([rootdir])
+
+    while pending:
+        dirpath = pending.popleft()
+
+        try:
+            dirstat = os.stat(dirpath)
+            key = (dirstat.st_dev, dirstat.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+
+            entries = sorted(os.scandir(dirpath), key=lambda x: x.name)
+
+        except OSError as e:
+            logger.warning('Could not scan directory %s: %s', dirpath, e)
+            continue
+
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    pending.append(entry.path)
+                    continue
+
+                if not pattern.match(entry.name):
+                    continue
+
+                stat = entry.stat()
+
+            except OSError as e:
+                logger.warning('Could not access %s: %s', entry.path, e)
+                continue
+
+            if stat.st_size == 0:
+                logger.debug('Skipping empty file %s', entry.path)
+                continue
+
+            result[entry.path] = stat
+
+    return result
@@ -0,0 +1,383 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Reading of the FITS headers required for ingestion of processed data.
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+import logging
+import os
+
+from astropy.io import fits
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FitsHeaders = namedtuple(
+    'FitsHeaders', ('header', 'first_extension', 'moc_area', 'hdu_count'))
+
+FitsStructure = namedtuple(
+    'FitsStructure', ('hdu_count', 'header', 'first_extension'))
+
+# Keywords of commentary cards, which are not copied into header snapshots.
+commentary_keywords = frozenset(('COMMENT', 'HISTORY', ''))
+
+block_size = 2880
+card_size = 80
+
+# Maximum HEALPix order supported in MOC files.
+moc_max_order = 29
+
+# Area of the whole sphere in square degrees.
+sphere_sq_deg = 4.0 * np.pi * (180.0 / np.pi) ** 2
+
+
+def read_fits_headers(filepath):
+    """
+    Read the primary header and, if present, the first extension header
+    of a FITS file.  If the first extension appears to be a MOC, the
+    area which it covers is also determined.
+
+    The file structure is determined by scan_fits_structure where possible,
+    falling back to astropy (e.g. for compressed files) otherwise.
+
+    Returns a FitsHeaders tuple, or None if the file could not be read.
+    """
+
+    try:
+        structure = scan_fits_structure(filepath)
+
+    except Exception as e:
+        logger.debug('...could not scan %s (%s), trying astropy',
+                     filepath, e)
+        return _read_fits_headers_astropy(filepath)
+
+    (hdu_count, header, first_extension) = structure
+    moc_area = None
+
+    if _is_moc(header, first_extension):
+        try:
+            with closing(fits.open(
+                    filepath, mode='readonly', memmap=True)) as f:
+                moc_area = moc_area_sq_deg(f[1].data.field(0))
+
+        except Exception:
+            logger.exception('Could not read MOC from %s', filepath)
+            moc_area = None
+
+    logger.debug('...got primary header from %s', filepath)
+
+    return FitsHeaders(header, first_extension, moc_area, hdu_count)
+
+
+def scan_fits_structure(filepath):
+    """
+    Determine the structure of a FITS file by reading only its header
+    blocks, seeking past each data unit.
+
+    Returns a FitsStructure tuple giving the number of HDUs, the primary
+    header and the first extension header (or None) as astropy Header
+    objects.  Raises an exception if the file does not appear to be
+    an uncompressed FITS file.
+    """
+
+    headers = []
+    hdu_count = 0
+
+    with open(filepath, 'rb') as f:
+        while True:
+            data = _read_header_blocks(f)
+            if data is None:
+                break
+
+            if hdu_count == 0:
+                if not data.startswith(b'SIMPLE  ='):
+                    raise ValueError('file does not start with SIMPLE')
+
+            elif not data.startswith(b'XTENSION='):
+                # Ignore anything after the last extension, as astropy does.
+                break
+
+            hdu_count += 1
+
+            if len(headers) < 2:
+                headers.append(fits.Header.fromstring(data.decode('latin-1')))
+
+            size = _data_size(_header_values(data))
+            if size:
+                f.seek(
+                    block_size * ((size + block_size - 1) // block_size),
+                    os.SEEK_CUR)
+
+    if not hdu_count:
+        raise ValueError('file is empty')
+
+    return FitsStructure(
+        hdu_count, headers[0], (headers[1] if len(headers) > 1 else None))
+
+
+class HeaderSnapshot(dict):
+    """
+    Plain dictionary of FITS header values by (upper case) keyword.
+
+    Blank values are represented by None, as returned when indexing
+    a Header.  The card comments are available via the `comments`
+    dictionary.  Indexing with a lower case keyword is also allowed,
+    as for a Header.
+    """
+
+    __slots__ = ('comments',)
+
+    def __init__(self, *args, **kwargs):
+        super(HeaderSnapshot, self).__init__(*args, **kwargs)
+        self.comments = {}
+
+    def __missing__(self, key):
+        upper = key.upper()
+        if upper == key:
+            raise KeyError(key)
+        return self[upper]
+
+
+def header_snapshot(header, keywords=None, pattern=None):
+    """
+    Copy the values of an astropy Header into a HeaderSnapshot.
+
+    If a set of `keywords` or a compiled regular expression `pattern` is
+    given, only the keywords included in the set or matching the pattern
+    are copied.  Otherwise all keywords except those of commentary cards
+    are copied.  Where a keyword is repeated, the first value is used.
+    """
+
+    snapshot = HeaderSnapshot()
+    comments = snapshot.comments
+    select = keywords is not None or pattern is not None
+
+    for card in header.cards:
+        keyword = card.keyword
+
+        if keyword in snapshot:
+            continue
+
+        if select:
+            if not ((keywords is not None and keyword in keywords) or
+                    (pattern is not None and pattern.match(keyword))):
+                continue
+
+        elif keyword in commentary_keywords:
+            continue
+
+        value = card.value
+        if value is fits.card.UNDEFINED:
+            value = None
+
+        snapshot[keyword] = value
+        comments[keyword] = card.comment
+
+    return snapshot
+
+
+def _read_fits_headers_astropy(filepath):
+    """
+    Read headers as for read_fits_headers, but entirely using astropy.
+    """
+
+    moc_area = None
+    first_extension = None
+
+    try:
+        with closing(fits.open(filepath, mode='readonly')) as f:
+            header = f[0].header
+            hdu_count = len(f)
+
+            # For some files, e.g. catalogs, the primary HDU does not
+            # contain the main data and we may wish to extract information
+            # from the first extension.
+            try:
+                first_extension = f[1].header
+
+                # Does this look like a MOC file?
+                if _is_moc(header, first_extension):
+                    moc_area = moc_area_sq_deg(f[1].data.field(0))
+
+            except IndexError:
+                pass
+
+    except Exception:
+        logger.debug('...could not read primary header from %s', filepath)
+        return None
+
+    logger.debug('...got primary header from %s', filepath)
+
+    return FitsHeaders(header, first_extension, moc_area, hdu_count)
+
+
+def moc_area_sq_deg(nuniq):
+    """
+    Determine the area (in square degrees) covered by a MOC, given
+    its cells as an array of NUNIQ values.
+
+    Each cell is converted to a range of cells at the maximum order so
+    that any overlapping or repeated cells are only counted once, giving
+    the same result as the area of the normalized MOC.
+    """
+
+    nuniq = np.asarray(nuniq, dtype=np.int64).ravel()
+
+    if not nuniq.size:
+        return 0.0
+
+    # NUNIQ = 4 * 4 ** order + npix: the floating point estimate of the
+    # order may be one too high just below a power of 4.
+    order = ((np.log2(nuniq) - 2.0) // 2.0).astype(np.int64)
+    order -= nuniq < (4 << (2 * order))
+
+    if order.min() < 0 or order.max() > moc_max_order:
+        raise ValueError('MOC contains invalid NUNIQ values')
+
+    shift = 2 * (moc_max_order - order)
+    start = (nuniq - (4 << (2 * order))) << shift
+    end = start + (1 << shift)
+
+    # Find the length of the union of the ranges.
+    sort = np.argsort(start, kind='stable')
+    start = start[sort]
+    end = np.maximum.accumulate(end[sort])
+    previous_end = np.concatenate(([start[0]], end[:-1]))
+    count = np.maximum(end - np.maximum(start, previous_end), 0).sum()
+
+    return sphere_sq_deg * (
+        float(count) / (12.0 * 4.0 ** moc_max_order))
+
+
+def _is_moc(header, first_extension):
+    """
+    Determine whether the given headers appear to be those of a MOC file.
+    """
+
+    return ((first_extension is not None)
+            and (header.get('NAXIS') == 0)
+            and (first_extension.get('XTENSION') == 'BINTABLE')
+            and (first_extension.get('PIXTYPE') == 'HEALPIX'))
+
+
+def _read_header_blocks(f):
+    """
+    Read header blocks from the current position in a file up to the
+    block containing the END card.
+
+    Returns the header as bytes, or None if the end of the file has
+    been reached.
+    """
+
+    blocks = []
+
+    while True:
+        block = f.read(block_size)
+
+        if not block:
+            if blocks:
+                raise ValueError('header has no END card')
+            return None
+
+        if len(block) < block_size:
+            raise ValueError('truncated header block')
+
+        blocks.append(block)
+
+        for i in range(0, block_size, card_size):
+            if block[i:i + 8] == b'END     ':
+                return b''.join(blocks)
+
+
+def _header_values(data):
+    """
+    Extract the values of the keywords which determine the size of a data
+    unit from a header, as bytes.
+    """
+
+    values = {}
+
+    for i in range(0, len(data), card_size):
+        keyword = data[i:i + 8]
+
+        if not (keyword.startswith((b'BITPIX', b'NAXIS', b'PCOUNT',
+                                    b'GCOUNT', b'GROUPS'))
+                and data[i + 8:i + 10] == b'= '):
+            continue
+
+        values[keyword.decode('ascii').strip()] = \
+            data[i + 10:i + card_size].split(b'/', 1)[0].strip()
+
+    return values
+
+
+def _data_size(values):
+    """
+    Compute the size (in bytes, without padding) of a data unit from
+    the header values extracted by _header_values.
+    """
+
+    naxis = int(values.get('NAXIS', 0))
+    if not naxis:
+        return 0
+
+    axes = [int(values['NAXIS{0}'.format(i)]) for i in range(1, naxis + 1)]
+
+    # Random groups have NAXIS1 = 0 and do not include it in the size.
+    if axes[0] == 0 and values.get('GROUPS') == b'T':
+        axes = axes[1:]
+
+    n = 1
+    for axis in axes:
+        n *= axis
+
+    bitpix = abs(int(values['BITPIX']))
+    pcount = int(values.get('PCOUNT', 0))
+    gcount = int(values.get('GCOUNT', 1))
+
+    return (bitpix // 8) * gcount * (pcount + n)
+
+
+def iter_fits_headers(filepaths, threads=1, reader=read_fits_headers):
+    """
+    Read headers from the given FITS files using a pool of threads.
+
+    The results of `reader` for each file are yielded in the order in which
+    the files were given, while the headers of up to twice as many files as
+    there are threads are read ahead.  With a single thread, the files are
+    read in turn as the results are consumed.
+    """
+
+    if threads <= 1:
+        for filepath in filepaths:
+            yield reader(filepath)
+        return
+
+    window = 2 * threads
+    pending = deque()
+
+    with ThreadPoolExecutor(threads) as executor:
+        for filepath in filepaths:
+            if len(pending) >= window:
+                yield pending.popleft().result()
+
+            pending.append(executor.submit(reader, filepath))
+
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,208 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Local record of the state of raw ingestion, stored in an SQLite file.
+"""
+
+from datetime import datetime
+from hashlib import sha1
+import json
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+watermark_format = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def make_fingerprint(*values):
+    """
+    Compute a stable fingerprint of the given values, which may be
+    nested structures of dictionaries, lists and scalars.
+
+    Values which can not be represented in JSON, such as dates, are
+    included via their string representation.
+    """
+
+    return sha1(json.dumps(
+        values, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def advance_watermark(watermark, modified, held):
+    """
+    Determine how far a watermark can be advanced.
+
+    :param watermark: the current watermark
+    :param modified: list of (obsid, modification time) tuples for the
+        observations found, in order of modification time
+    :param held: collection of obsids which should be included in the
+        next pass (e.g. because of a transient failure)
+
+    The watermark is advanced to the latest modification time preceding
+    that of the earliest held observation.
+    """
+
+    held = set(held)
+    limit = None
+    if held:
+        limit = min(
+            modification for (obsid, modification) in modified
+            if obsid in held)
+
+    new_watermark = watermark
+    for (obsid, modification) in modified:
+        if (limit is not None) and not (modification < limit):
+            break
+
+        new_watermark = max(new_watermark, modification)
+
+    return new_watermark
+
+
+class IngestState(object):
+    """
+    Class for access to the ingestion state file.
+
+    The file records a fingerprint of the metadata from which each
+    observation was last successfully ingested, observations which were
+    rejected as permanently unsuitable for ingestion, and named "watermark"
+    times up to which incremental ingestion has been performed.
+    """
+
+    def __init__(self, filename):
+        """
+        Open the given state file, creating it if it does not exist.
+        """
+
+        self.db = sqlite3.connect(filename, timeout=60)
+
+        with self.db:
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS fingerprint ('
+                'obsid TEXT PRIMARY KEY, '
+                'fingerprint TEXT NOT NULL, '
+                'ingested TEXT NOT NULL)')
+
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS rejected ('
+                'obsid TEXT PRIMARY KEY, '
+                'reason TEXT NOT NULL, '
+                'rejected TEXT NOT NULL)')
+
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS watermark ('
+                'name TEXT PRIMARY KEY, '
+                'value TEXT NOT NULL)')
+
+    def close(self):
+        self.db.close()
+
+    def get_fingerprint(self, obsid):
+        """
+        Get the fingerprint recorded for an observation, or None if
+        there is no record for it.
+        """
+
+        row = self.db.execute(
+            'SELECT fingerprint FROM fingerprint WHERE obsid=?',
+            (obsid,)).fetchone()
+
+        if row is None:
+            return None
+
+        return row[0]
+
+    def set_fingerprint(self, obsid, fingerprint):
+        """
+        Record the fingerprint for a successfully ingested observation.
+        """
+
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO fingerprint '
+                '(obsid, fingerprint, ingested) VALUES (?, ?, ?)',
+                (obsid, fingerprint, datetime.utcnow().isoformat()))
+
+            self.db.execute(
+                'DELETE FROM rejected WHERE obsid=?', (obsid,))
+
+    def set_rejected(self, obsid, reason):
+        """
+        Record that an observation was rejected for a reason which
+        will persist until its metadata are changed.
+        """
+
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO rejected '
+                '(obsid, reason, rejected) VALUES (?, ?, ?)',
+                (obsid, reason, datetime.utcnow().isoformat()))
+
+    def get_rejected(self, obsids):
+        """
+        Get the set of the given observations which are recorded
+        as having been rejected.
+        """
+
+        result = set()
+
+        for obsid in obsids:
+            row = self.db.execute(
+                'SELECT obsid FROM rejected WHERE obsid=?',
+                (obsid,)).fetchone()
+
+            if row is not None:
+                result.add(obsid)
+
+        return result
+
+    def clear_rejected(self, obsids):
+        """
+        Remove the rejection records of the given observations.
+        """
+
+        with self.db:
+            self.db.executemany(
+                'DELETE FROM rejected WHERE obsid=?',
+                ((x,) for x in obsids))
+
+    def get_watermark(self, name):
+        """
+        Get the named watermark as a datetime object, or None if it
+        has not been set.
+        """
+
+        row = self.db.execute(
+            'SELECT value FROM watermark WHERE name=?',
+            (name,)).fetchone()
+
+        if row is None:
+            return None
+
+        return datetime.strptime(row[0], watermark_format)
+
+    def set_watermark(self, name, value):
+        """
+        Set the named watermark to the given datetime.
+        """
+
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO watermark (name, value) '
+                'VALUES (?, ?)',
+                (name, value.strftime(watermark_format)))
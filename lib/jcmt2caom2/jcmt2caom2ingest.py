@@ -18,7 +18,7 @@ __author__ = "Russell O. Redman"
 
 import argparse
 from collections import defaultdict, namedtuple, OrderedDict
-from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 import logging
 import os
@@ -29,8 +29,6 @@ import sys
 
 from astropy.io import fits
 from astropy.time import Time
-from pymoc import MOC
-from pymoc.io.fits import read_moc_fits_hdu
 
 from omp.db.part.arc import ArcDB
 
@@ -63,6 +61,10 @@ from tools4caom2.validation import CAOMValidation, CAOMValidationError
 
 from jcmt2caom2.__version__ import version as jcmt2caom2version
 from jcmt2caom2.caom2_tap import CAOM2TAP
+from jcmt2caom2.checksum_cache import ChecksumCache
+from jcmt2caom2.file_scan import combine_regexes, scan_files
+from jcmt2caom2.fits_headers import HeaderSnapshot, header_snapshot, \
+    iter_fits_headers
 from jcmt2caom2.instrument.scuba2 import scuba2_spectral_wcs
 from jcmt2caom2.jsa.file_id import make_file_id_jcmt
 from jcmt2caom2.jsa.instrument_keywords import instrument_keywords
@@ -72,7 +74,7 @@ from jcmt2caom2.jsa.obsid import obsidss_to_obsid
 from jcmt2caom2.jsa.product_id import product_id
 from jcmt2caom2.jsa.target_name import target_name
 from jcmt2caom2.jsa.tile import jsa_tile_wcs
-from jcmt2caom2.md5sum import get_md5sum
+from jcmt2caom2.md5sum import get_md5sum, get_md5sums
 from jcmt2caom2.mime import determine_mime_type
 from jcmt2caom2.png_keywords import read_png_keywords
 from jcmt2caom2.project import get_project_pi_title, truncate_string
@@ -87,6 +89,28 @@ FileInfo = namedtuple(
      'plane', 'plane_custom', 'fitsuri', 'fitsuri_custom',
      'members', 'inputs'))
 
+# Header keywords used by read_file_info, either directly or via
+# CAOMValidation, jsa_tile_wcs and scuba2_spectral_wcs.  Only these
+# keywords are copied into the header snapshots passed to read_file_info,
+# so any further keywords to be used must be added here.
+header_keywords = frozenset((
+    'ASN_ID', 'ASN_TYPE', 'ATSTART', 'BACKEND', 'BANDWID', 'BITPIX',
+    'BWMODE', 'CALLEVEL', 'CHECKSUM', 'CTYPE1', 'CTYPE1A', 'DATAPROD',
+    'DATASUM', 'DATE-OBS', 'DPDATE', 'DPPROJ', 'DPRCINST', 'ELSTART',
+    'ENGVERS', 'FILTER', 'HUMSTART', 'INBEAM', 'INPCNT', 'INSTNAME',
+    'INSTREAM', 'INSTRUME', 'MBRCNT', 'MOLECULE', 'MOVING', 'NAXIS',
+    'NAXIS1', 'NAXIS2', 'NAXIS3', 'NAXIS4', 'OBJECT', 'OBSCNT', 'OBSDEC',
+    'OBSID', 'OBSRA', 'OBS_SB', 'OBS_TYPE', 'PI', 'PIPEVERS', 'PROCVERS',
+    'PRODID', 'PRODTYPE', 'PRODUCER', 'PRODUCT', 'PROJECT', 'PRVCNT',
+    'RECIPE', 'REFERENC', 'RESTFREQ', 'RESTFRQ', 'RESTWAV', 'SAM_MODE',
+    'SB_MODE', 'SCAN_PAT', 'SEEINGST', 'STANDARD', 'SUBSYSNR', 'SURVEY',
+    'SW_MODE', 'TARGTYPE', 'TAU225ST', 'TELESCOP', 'TILENUM', 'TITLE',
+    'TRANSITI', 'WAVELEN', 'ZSOURCE',
+))
+
+# Pattern matching the numbered membership and provenance keywords.
+header_keyword_pattern = re.compile(r'(?:MBR|OBS|INP|PRV)[1-9][0-9]*$')
+
 
 # Utility functions
 def is_defined(key, header):
@@ -96,7 +120,7 @@ def is_defined(key, header):
     metadata with more complicated logic than is supported using the
     prepackaged tests in CAOMValidation.
     """
-    return (key in header and header[key] != fits.card.UNDEFINED)
+    return header.get(key, fits.card.UNDEFINED) is not fits.card.UNDEFINED
 
 
 def is_blank(key, header):
@@ -105,7 +129,48 @@ def is_blank(key, header):
     This is useful for optional headers whose presence or absence acts as a
     flag for some condition.
     """
-    return (key in header and header[key] == fits.card.UNDEFINED)
+    return header.get(key) is fits.card.UNDEFINED
+
+
+def member_keywords(header):
+    """
+    Return the list of keywords giving the members of an observation,
+    i.e. MBR1 to MBRn if MBRCNT is defined, otherwise OBS1 to OBSn if
+    OBSCNT is defined.
+    """
+
+    if is_defined('MBRCNT', header):
+        (prefix, count) = ('MBR', int(header['MBRCNT']))
+    elif is_defined('OBSCNT', header):
+        (prefix, count) = ('OBS', int(header['OBSCNT']))
+    else:
+        return []
+
+    return [prefix + str(n + 1) for n in range(count)]
+
+
+def member_obsid(filename, keyword, value):
+    """
+    Return the observation ID of the member given by the value of
+    one of the keywords returned by member_keywords.
+
+    MBRn values are CAOM-2 URIs for member observations, i.e.
+    caom:<collection>/<observationID>, where the collection must be
+    JCMT.  OBSn values are the obsid_subsysnr of a plane of raw data,
+    from which the observation ID is guessed.
+    """
+
+    if keyword.startswith('MBR'):
+        mbr_coll, obsid = value.split('/')
+        if mbr_coll != 'caom:JCMT':
+            raise CAOMError(
+                'file {0}: {1} must point to an observation in'
+                ' the JCMT collection: {2}'.format(
+                    filename, keyword, value))
+
+        return obsid
+
+    return obsidss_to_obsid(value)
 
 
 def read_recipe_instance_mapping():
@@ -248,6 +313,14 @@ class jcmt2caom2ingest(object):
         # found in a member observation.
         self.fileset = set()
         self.input_cache = dict()
+        # The obs_info_cache is a dictionary giving the result of the
+        # CAOM2TAP.get_obs_info query for each member observation ID.
+        # It is filled for batches of files by prefetch_members so that
+        # read_file_info does not need to query members one at a time,
+        # and is cleared after each batch since the useful information
+        # is then held in member_cache and input_cache.
+        self.obs_info_cache = dict()
+        self.member_batch_size = 500
 
         # The metadata dictionary - fundamental structure for the entire class
         # For the detailed structure of metadict, see the help text for
@@ -260,6 +333,18 @@ class jcmt2caom2ingest(object):
         # Validation object
         self.validation = None
 
+        # Compiled alternation of the regular expressions which the names
+        # of files to be ingested must match, and the stat results for
+        # the files found by getfilelist, by file path.
+        self.file_name_pattern = None
+        self.file_stat = {}
+
+        # Number of threads with which to read FITS headers.
+        self.read_threads = 1
+
+        # Persistent cache of MD5 sums, if configured.
+        self.checksum_cache = None
+
         # TAP client
         self.tap = None
 
@@ -316,27 +401,42 @@ class jcmt2caom2ingest(object):
         """
         Return a list of valid files in the directory tree rooted at dirpath.
 
+        The stat results for the files are retained in self.file_stat
+        so that they can be re-used by check_size and get_png_info.
+
         Arguments:
         rootdir: absolute path to the root of the directory tree
         """
-        mylist = []
+        self.file_stat = scan_files(rootdir, self.file_name_pattern)
 
-        for dirpath, dirlist, filelist in os.walk(rootdir):
-            for f in filelist:
-                filepath = os.path.join(dirpath, f)
+        # The combined pattern only preselects the files: apply the full
+        # name check for each file, as before.
+        for filepath in list(self.file_stat.keys()):
+            try:
+                self.validation.check_name(filepath)
+            except CAOMValidationError:
+                del self.file_stat[filepath]
 
-                try:
-                    self.validation.check_name(filepath)
-                    self.validation.check_size(filepath)
-                except CAOMValidationError:
-                    pass
-                else:
-                    mylist.append(filepath)
+        return list(self.file_stat.keys())
 
-            for d in dirlist:
-                mylist.extend(self.getfilelist(os.path.join(dirpath, d)))
+    def check_size(self, filepath):
+        """
+        Check that a file is not empty, unless it was already checked
+        when found by getfilelist.
+        """
+        if filepath not in self.file_stat:
+            self.validation.check_size(filepath)
+
+    def get_file_size(self, filepath):
+        """
+        Get the size of a file, using the stat result from getfilelist
+        if available.
+        """
+        stat = self.file_stat.get(filepath)
+        if stat is None:
+            return os.path.getsize(filepath)
 
-        return mylist
+        return stat.st_size
 
     def fillMetadict(self, files):
         """
@@ -358,13 +458,120 @@ class jcmt2caom2ingest(object):
         logger.debug('in fillMetadict, file_ids = %s',
                      repr(file_ids))
 
-        # Gather metadata from each file.
+        # Read the headers of files with valid names concurrently, but
+        # process them in order of file_id.
+        valid_ids = []
         for file_id in file_ids:
-            logger.debug('In fillMetadict, use %s', file_id)
+            try:
+                self.validation.check_name(files_by_id[file_id])
+            except CAOMValidationError:
+                continue
+
+            valid_ids.append(file_id)
+
+        headers = iter_fits_headers(
+            [files_by_id[x] for x in valid_ids], threads=self.read_threads)
+
+        # Gather metadata from each file, first looking up the members
+        # of each batch of files together.
+        batch = []
+        for (file_id, file_headers) in zip(valid_ids, headers):
+            batch.append((file_id, file_headers))
+
+            if len(batch) >= self.member_batch_size:
+                self.fillMetadictFromBatch(files_by_id, batch)
+                batch = []
+
+        if batch:
+            self.fillMetadictFromBatch(files_by_id, batch)
+
+    def fillMetadictFromBatch(self, files_by_id, batch):
+        """
+        Fill the metadict structure from a batch of files, given as a list
+        of (file_id, headers) tuples, after prefetching information
+        about the members listed in their headers.
+        """
+
+        try:
+            self.prefetch_members(
+                [(files_by_id[file_id], x.header)
+                 for (file_id, x) in batch if x is not None])
+
+            for (file_id, file_headers) in batch:
+                logger.debug('In fillMetadict, use %s', file_id)
+
+                self.fillMetadictFromFile(
+                    file_id, files_by_id[file_id], file_headers)
+
+        finally:
+            self.obs_info_cache.clear()
+
+    def prefetch_members(self, headers):
+        """
+        Collect the member observation IDs from the MBRn or OBSn keywords
+        of the given (filename, header) pairs and query information for
+        those which have not already been cached in member_cache, storing
+        the results in obs_info_cache.
+
+        Members are found using the same member_keywords and member_obsid
+        functions as read_file_info.  Values which can not be interpreted
+        are skipped here, leaving read_file_info to report them.
+        """
+
+        if self.tap is None:
+            return
+
+        obsids = set()
+
+        for (filename, header) in headers:
+            try:
+                keys = member_keywords(header)
+            except (TypeError, ValueError) as e:
+                logger.debug('Not prefetching members of %s: %s', filename, e)
+                continue
+
+            for key in keys:
+                if not is_defined(key, header):
+                    continue
+
+                value = header[key]
+
+                try:
+                    obsid = member_obsid(filename, key, value)
+                except (CAOMError, AttributeError, ValueError) as e:
+                    logger.debug('Not prefetching %s: %s', key, e)
+                    continue
+
+                if key.startswith('MBR'):
+                    cache_key = self.observationURI('JCMT', obsid)
+                else:
+                    cache_key = value
+
+                if cache_key not in self.member_cache:
+                    obsids.add(obsid)
+
+        if obsids:
+            logger.info('Querying information for %i member observations',
+                        len(obsids))
+
+            self.obs_info_cache.update(
+                self.tap.get_obs_info_multiple(sorted(obsids)))
 
-            self.fillMetadictFromFile(file_id, files_by_id[file_id])
+    def get_obs_info(self, obsid):
+        """
+        Get information for a member observation, from obs_info_cache if
+        present, otherwise via a TAP query.
+        """
+
+        result = self.obs_info_cache.get(obsid)
+
+        if result is None:
+            result = self.obs_info_cache[obsid] = \
+                self.tap.get_obs_info(obsid)
 
-    def fillMetadictFromFile(self, file_id, filepath):
+        return result
+
+    def fillMetadictFromFile(self, file_id, filepath, headers):
         """
         Generic routine to read metadata and fill the internal structure
         metadict (a nested set of dictionaries) that will be used to control
@@ -373,6 +580,8 @@ class jcmt2caom2ingest(object):
         Arguments:
         file_id : must be added to the header
         filepath : absolute path to the file, must be added to the header
+        headers : FitsHeaders tuple read from the file, or None if it
+            could not be read
         """
         logger.info('fillMetadictFromFile: %s %s', file_id, filepath)
 
@@ -385,45 +594,28 @@ class jcmt2caom2ingest(object):
         except CAOMValidationError:
             return
 
-        head = {}
-        moc = None
-
-        try:
-            with closing(fits.open(filepath, mode='readonly')) as f:
-                head = f[0].header
-                self.artifact_part_count[self.fitsfileURI(
-                    self.archive, file_id)] = len(f)
-
-                # For some files, e.g. catalogs, the primary HDU does not
-                # contain the main data and we may wish to extract information
-                # from the first extension.
-                first_extension = None
-                try:
-                    first_extension = f[1].header
-
-                    # Does this look like a MOC file?
-                    if ((head['NAXIS'] == 0)
-                            and (first_extension['XTENSION'] == 'BINTABLE')
-                            and (first_extension.get('PIXTYPE') == 'HEALPIX')):
-                        moc = MOC()
-                        read_moc_fits_hdu(moc, f[1],
-                                          include_meta=True)
-
-                except IndexError:
-                    pass
-
-            logger.debug('...got primary header from %s', filepath)
-
-        except:
-            logger.debug('...could not read primary header from ',
-                         filepath)
+        head = HeaderSnapshot()
+        first_extension = None
+        moc_area = None
+
+        if headers is not None:
+            # Copy the keywords which we use into plain dictionaries
+            # to avoid repeated astropy card lookups in read_file_info.
+            head = header_snapshot(
+                headers.header, header_keywords, header_keyword_pattern)
+            if headers.first_extension is not None:
+                first_extension = header_snapshot(
+                    headers.first_extension, header_keywords)
+            moc_area = headers.moc_area
+            self.artifact_part_count[self.fitsfileURI(
+                self.archive, file_id)] = headers.hdu_count
 
         if self.ingest:
             self.validation.is_in_archive(filepath)
 
         self.build_metadict(
             filepath, self.read_file_info(
-                file_id, filepath, head, first_extension, moc))
+                file_id, filepath, head, first_extension, moc_area))
 
     def get_png_info(self, filenames):
         """
@@ -440,6 +632,7 @@ class jcmt2caom2ingest(object):
         """
 
         info = defaultdict(lambda: defaultdict(dict))
+        previews = []
 
         for filename in filenames:
             if filename.endswith('preview_64.png'):
@@ -452,25 +645,45 @@ class jcmt2caom2ingest(object):
                 logger.warning('Unexpected preview size: %s', filename)
                 continue
 
-            file_id = self.make_file_id(filename)
-            keywords = read_png_keywords(filename)
+            previews.append((filename, type_))
 
-            if keywords['jsa:asn_type'] == 'obs':
-                observationID = keywords['jsa:obsid']
+        paths = [x[0] for x in previews]
 
-            else:
-                observationID = keywords['jsa:asn_id']
+        # Read the keywords, which are near the start of each file, and
+        # compute the MD5 sums of the files in separate thread pools.
+        with ThreadPoolExecutor(self.read_threads) as executor:
+            keywords_iter = executor.map(read_png_keywords, paths)
+            md5sums = get_md5sums(
+                paths, workers=self.read_threads,
+                md5sum_function=self.get_md5sum)
 
-            productID = keywords['jsa:productID']
+            for ((filename, type_), keywords, (_, md5sum)) in zip(
+                    previews, keywords_iter, md5sums):
+                if keywords['jsa:asn_type'] == 'obs':
+                    observationID = keywords['jsa:obsid']
 
-            info[observationID][productID][type_] = {
-                'file_id': file_id,
-                'size': os.path.getsize(filename),
-                'md5sum': get_md5sum(filename),
-            }
+                else:
+                    observationID = keywords['jsa:asn_id']
+
+                productID = keywords['jsa:productID']
+
+                info[observationID][productID][type_] = {
+                    'file_id': self.make_file_id(filename),
+                    'size': self.get_file_size(filename),
+                    'md5sum': md5sum,
+                }
 
         return info
 
+    def get_md5sum(self, filepath):
+        """
+        Get the MD5 sum of a file, via the checksum cache if configured.
+        """
+        if self.checksum_cache is None:
+            return get_md5sum(filepath)
+
+        return self.checksum_cache.get_md5sum(filepath)
+
     def observationURI(self, collection, observationID):
         """
         Generic method to format an observation URI, i.e. the URI used to
@@ -812,7 +1025,7 @@ class jcmt2caom2ingest(object):
                 self.remove_dict[result.obs_id].append(result.prod_id)
 
     def read_file_info(self, file_id, filename, header,
-                       first_extension=None, moc=None):
+                       first_extension=None, moc_area=None):
         """
         Given the headers from a FITS file, define plane and URI-dependent
         data structures.
@@ -831,7 +1044,7 @@ class jcmt2caom2ingest(object):
         memberset = set()
         inputset = set()
 
-        self.validation.check_size(filename)
+        self.check_size(filename)
 
         logger.info('Starting %s', file_id)
         # Doing all the required checks here simplifies the code
@@ -969,8 +1182,7 @@ class jcmt2caom2ingest(object):
             if is_defined('DATE-OBS', header):
                 earliest_utdate = Time(header['DATE-OBS']).mjd
 
-        obscnt = None
-        mbrcnt = None
+        members = member_keywords(header)
         date_obs = None
         date_end = None
         release_date = None
@@ -989,104 +1201,200 @@ class jcmt2caom2ingest(object):
             # Each MBRn is a CAOM-2 URI for a member observation,
             # i.e. caom:<collection>/<observationID>
             # where <collection>=JCMT for observations recording raw data.
-            mbrcnt = int(header['MBRCNT'])
-            if mbrcnt > 0:
-                for n in range(mbrcnt):
-                    # verify that the expected membership headers are present
-                    mbrkey = 'MBR' + str(n+1)
-                    self.validation.expect_keyword(filename, mbrkey, header)
-                    mbrn_str = header[mbrkey]
-                    # mbrn contains a caom observation uri
-                    mbr_coll, obsid = mbrn_str.split('/')
-                    if mbr_coll != 'caom:JCMT':
-                        raise CAOMError(
-                            'file {0}: {1} must point to an observation in'
-                            ' the JCMT collection: {2}'.format(
-                                filename, mbrkey, mbrn_str))
-
-                    mbrn = self.observationURI('JCMT', obsid)
-                    mbr_date_obs = None
-                    mbr_date_end = None
-
-                    # Only get here if mbrn has a defined value
-                    if mbrn in self.member_cache:
-                        # Skip the query if this member has been cached
-                        (this_mbrn,
-                         mbr_date_obs,
-                         mbr_date_end,
-                         release_date) = self.member_cache[mbrn]
-                        if (latest_release_date is None or
-                                release_date > latest_release_date):
-
-                            latest_release_date = release_date
+            for mbrkey in members:
+                # verify that the expected membership headers are present
+                self.validation.expect_keyword(filename, mbrkey, header)
+                # mbrn contains a caom observation uri
+                obsid = member_obsid(filename, mbrkey, header[mbrkey])
+
+                mbrn = self.observationURI('JCMT', obsid)
+                mbr_date_obs = None
+                mbr_date_end = None
+
+                # Only get here if mbrn has a defined value
+                if mbrn in self.member_cache:
+                    # Skip the query if this member has been cached
+                    (this_mbrn,
+                     mbr_date_obs,
+                     mbr_date_end,
+                     release_date) = self.member_cache[mbrn]
+                    if (latest_release_date is None or
+                            release_date > latest_release_date):
+
+                        latest_release_date = release_date
+
+                    logger.debug(
+                        'fetch from member_cache[%s] = [%s, %s, %s, %s]',
+                        mbrn, this_mbrn, date_obs, date_end, release_date)
 
-                        logger.debug(
-                            'fetch from member_cache[%s] = [%s, %s, %s, %s]',
-                            mbrn, this_mbrn, date_obs, date_end, release_date)
+                else:
+                    # Verify that the member header points to a real
+                    # observation.
+                    # Extract the start, end release times from the member.
+                    # Also, do a nasty optimization for performance,
+                    # caching useful information from the member for later
+                    # re-use.
+
+                    # To reduce the number of TAP queries, we will return
+                    # all the files and planes in this observation, in the
+                    # expectation that they will be part of the membership
+                    # and provenance inputs for this release.
+
+                    missing = True
+                    for row in self.get_obs_info(obsid):
+                        if (not row.date_obs or
+                                not row.date_end or
+                                not row.release):
+                            continue
+
+                        # Only extract date_obs, date_end and release
+                        # raw planes
+                        if missing and re.match(r'raw.*', row.prod_id):
+                            missing = False
+                            if (latest_release_date is None or
+                                    row.release >
+                                    latest_release_date):
+
+                                latest_release_date = row.release
+                            # cache mbrn, start, end and release
+                            # caching mbrn is NOT needlessly repetitive
+                            # because with obsn headers it will be
+                            # different
+                            logger.debug(
+                                'cache member_cache[%s] ='
+                                ' [%s, %s, %s, %s]',
+                                mbrn,
+                                mbrn, row.date_obs, row.date_end,
+                                row.release)
+                            self.member_cache[mbrn] = (mbrn,
+                                                       row.date_obs,
+                                                       row.date_end,
+                                                       row.release)
+                            mbr_date_obs = row.date_obs
+                            mbr_date_end = row.date_end
+
+                        # Cache provenance input candidates
+                        # Do NOT rewrite the file_id
+                        if row.artifact_uri not in self.input_cache:
+                            filecoll, this_file_id = \
+                                row.artifact_uri.split('/')
+
+                            # Temporarily adjust file_id values to re-add file extension.
+                            this_file_id = _ensure_file_extension(this_file_id)
+
+                            inURI = self.planeURI('JCMT',
+                                                  obsid,
+                                                  row.prod_id)
+                            self.input_cache[this_file_id] = inURI
+                            self.input_cache[inURI.uri] = inURI
+
+                # At this point we have mbrn, mbr_date_obs, mbr_date_end
+                # and release_date either from the member_cache or from
+                # the query
+                if mbr_date_obs:
+                    if (earliest_utdate is None or
+                            mbr_date_obs < earliest_utdate):
+
+                        earliest_utdate = mbr_date_obs
+
+                    if mbrn not in obstimes:
+                        obstimes[mbrn] = (mbr_date_obs, mbr_date_end)
+
+                    memberset.add(mbrn)
 
-                    else:
-                        # Verify that the member header points to a real
-                        # observation.
-                        # Extract the start, end release times from the member.
-                        # Also, do a nasty optimization for performance,
-                        # caching useful information from the member for later
-                        # re-use.
-
-                        # To reduce the number of TAP queries, we will return
-                        # all the files and planes in this observation, in the
-                        # expectation that they will be part of the membership
-                        # and provenance inputs for this release.
-
-                        missing = True
-                        for row in self.tap.get_obs_info(obsid):
-                            if (not row.date_obs or
-                                    not row.date_end or
-                                    not row.release):
-                                continue
-
-                            # Only extract date_obs, date_end and release
-                            # raw planes
-                            if missing and re.match(r'raw.*', row.prod_id):
-                                missing = False
-                                if (latest_release_date is None or
-                                        row.release >
-                                        latest_release_date):
-
-                                    latest_release_date = row.release
-                                # cache mbrn, start, end and release
-                                # caching mbrn is NOT needlessly repetitive
-                                # because with obsn headers it will be
-                                # different
-                                logger.debug(
-                                    'cache member_cache[%s] ='
-                                    ' [%s, %s, %s, %s]',
-                                    mbrn,
-                                    mbrn, row.date_obs, row.date_end,
-                                    row.release)
-                                self.member_cache[mbrn] = (mbrn,
-                                                           row.date_obs,
-                                                           row.date_end,
-                                                           row.release)
+        elif is_defined('OBSCNT', header):
+            for obskey in members:
+                mbrn = None
+                mbr_date_obs = None
+                mbr_date_end = None
+                # verify that the expected membership headers are present
+                self.validation.expect_keyword(filename, obskey, header)
+                # This is the obsid_subsysnr of a plane of raw data
+                obsn = header[obskey]
+
+                # Only get here if obsn has a defined value
+                if obsn in self.member_cache:
+                    # Skip the query if this member has been cached
+                    (obsid,
+                     mbrn,
+                     mbr_date_obs,
+                     mbr_date_end,
+                     release_date) = self.member_cache[obsn]
+                    if (latest_release_date is None or
+                            release_date > latest_release_date):
+
+                        latest_release_date = release_date
+
+                    logger.debug(
+                        'fetch from member_cache[%s] = [%s, %s, %s, %s]',
+                        obsn, mbrn.uri, date_obs, date_end, release_date)
+
+                else:
+                    # Verify that the member header points to a real
+                    # observation
+                    # Extract the start, end release times from the member.
+                    # Also, do a nasty optimization for performance,
+                    # caching useful information from the member for later
+                    # re-use.
+
+                    # obsn contains an obsid_subsysnr
+                    obsid_guess = member_obsid(filename, obskey, obsn)
+
+                    for row in self.get_obs_info(obsid_guess):
+                        if (not row.date_obs or
+                                not row.date_end or
+                                not row.release):
+                            continue
+
+                        # Only cache member date_obs, date_end and
+                        # release_date from raw planes
+                        if re.match(r'raw.*', row.prod_id):
+                            if (latest_release_date is None or
+                                    row.release >
+                                    latest_release_date):
+
+                                latest_release_date = row.release
+
+                            mbrn = self.observationURI('JCMT',
+                                                       obsid_guess)
+                            # cache the members start and end times
+                            logger.debug(
+                                'cache member_cache[%s] ='
+                                ' [%s, %s, %s, %s]',
+                                obsn, mbrn.uri, row.date_obs, row.date_end,
+                                row.release)
+                            if mbrn not in self.member_cache:
+                                self.member_cache[obsn] = \
+                                    (obsid_guess,
+                                     mbrn,
+                                     row.date_obs,
+                                     row.date_end,
+                                     row.release)
                                 mbr_date_obs = row.date_obs
                                 mbr_date_end = row.date_end
 
-                            # Cache provenance input candidates
-                            # Do NOT rewrite the file_id
-                            if row.artifact_uri not in self.input_cache:
-                                filecoll, this_file_id = \
-                                    row.artifact_uri.split('/')
-
-                                # Temporarily adjust file_id values to re-add file extension.
-                                this_file_id = _ensure_file_extension(this_file_id)
-
-                                inURI = self.planeURI('JCMT',
-                                                      obsid,
-                                                      row.prod_id)
-                                self.input_cache[this_file_id] = inURI
-                                self.input_cache[inURI.uri] = inURI
-
-                    # At this point we have mbrn, mbr_date_obs, mbr_date_end
-                    # and release_date either from the member_cache or from
+                        # Cache provenance input candidates
+                        # Do NOT rewrite the file_id!
+                        if row.artifact_uri not in self.input_cache:
+                            filecoll, this_file_id = \
+                                row.artifact_uri.split('/')
+
+                            # Temporarily adjust file_id values to re-add file extension.
+                            this_file_id = _ensure_file_extension(this_file_id)
+
+                            inURI = self.planeURI('JCMT',
+                                                  obsid_guess,
+                                                  row.prod_id)
+                            self.input_cache[this_file_id] = inURI
+                            self.input_cache[inURI.uri] = inURI
+
+                if mbrn is None:
+                    raise CAOMError('file {0}: {1} = {2}'
+                                    ' is not present in the JSA'.format(
+                                        filename, obskey, obsn))
+                else:
+                    # At this point we have mbrn, date_obs, date_end and
+                    # release_date either from the member_cache or from
                     # the query
                     if mbr_date_obs:
                         if (earliest_utdate is None or
@@ -1096,118 +1404,10 @@ class jcmt2caom2ingest(object):
 
                         if mbrn not in obstimes:
                             obstimes[mbrn] = (mbr_date_obs, mbr_date_end)
-
                         memberset.add(mbrn)
 
-        elif is_defined('OBSCNT', header):
-            obscnt = header['OBSCNT']
-            if obscnt > 0:
-                for n in range(obscnt):
-                    mbrn = None
-                    mbr_date_obs = None
-                    mbr_date_end = None
-                    obskey = 'OBS' + str(n+1)
-                    # verify that the expected membership headers are present
-                    self.validation.expect_keyword(filename, obskey, header)
-                    # This is the obsid_subsysnr of a plane of raw data
-                    obsn = header[obskey]
-
-                    # Only get here if obsn has a defined value
-                    if obsn in self.member_cache:
-                        # Skip the query if this member has been cached
-                        (obsid,
-                         mbrn,
-                         mbr_date_obs,
-                         mbr_date_end,
-                         release_date) = self.member_cache[obsn]
-                        if (latest_release_date is None or
-                                release_date > latest_release_date):
-
-                            latest_release_date = release_date
-
-                        logger.debug(
-                            'fetch from member_cache[%s] = [%s, %s, %s, %s]',
-                            obsn, mbrn.uri, date_obs, date_end, release_date)
-
-                    else:
-                        # Verify that the member header points to a real
-                        # observation
-                        # Extract the start, end release times from the member.
-                        # Also, do a nasty optimization for performance,
-                        # caching useful information from the member for later
-                        # re-use.
-
-                        # obsn contains an obsid_subsysnr
-                        obsid_guess = obsidss_to_obsid(obsn)
-
-                        for row in self.tap.get_obs_info(obsid_guess):
-                            if (not row.date_obs or
-                                    not row.date_end or
-                                    not row.release):
-                                continue
-
-                            # Only cache member date_obs, date_end and
-                            # release_date from raw planes
-                            if re.match(r'raw.*', row.prod_id):
-                                if (latest_release_date is None or
-                                        row.release >
-                                        latest_release_date):
-
-                                    latest_release_date = row.release
-
-                                mbrn = self.observationURI('JCMT',
-                                                           obsid_guess)
-                                # cache the members start and end times
-                                logger.debug(
-                                    'cache member_cache[%s] ='
-                                    ' [%s, %s, %s, %s]',
-                                    obsn, mbrn.uri, row.date_obs, row.date_end,
-                                    row.release)
-                                if mbrn not in self.member_cache:
-                                    self.member_cache[obsn] = \
-                                        (obsid_guess,
-                                         mbrn,
-                                         row.date_obs,
-                                         row.date_end,
-                                         row.release)
-                                    mbr_date_obs = row.date_obs
-                                    mbr_date_end = row.date_end
-
-                            # Cache provenance input candidates
-                            # Do NOT rewrite the file_id!
-                            if row.artifact_uri not in self.input_cache:
-                                filecoll, this_file_id = \
-                                    row.artifact_uri.split('/')
-
-                                # Temporarily adjust file_id values to re-add file extension.
-                                this_file_id = _ensure_file_extension(this_file_id)
-
-                                inURI = self.planeURI('JCMT',
-                                                      obsid_guess,
-                                                      row.prod_id)
-                                self.input_cache[this_file_id] = inURI
-                                self.input_cache[inURI.uri] = inURI
-
-                    if mbrn is None:
-                        raise CAOMError('file {0}: {1} = {2}'
-                                        ' is not present in the JSA'.format(
-                                            filename, obskey, obsn))
-                    else:
-                        # At this point we have mbrn, date_obs, date_end and
-                        # release_date either from the member_cache or from
-                        # the query
-                        if mbr_date_obs:
-                            if (earliest_utdate is None or
-                                    mbr_date_obs < earliest_utdate):
-
-                                earliest_utdate = mbr_date_obs
-
-                            if mbrn not in obstimes:
-                                obstimes[mbrn] = (mbr_date_obs, mbr_date_end)
-                            memberset.add(mbrn)
-
         # Only record the environment from single-member observations
-        if algorithm == 'exposure' or (obscnt == 1 or mbrcnt == 1):
+        if algorithm == 'exposure' or len(members) == 1:
             # NB 'SEEINGST' is sometimes defined as an empty string which will
             # fail the >0.0 test
             if (is_defined('SEEINGST', header) and header['SEEINGST'] and
@@ -1989,10 +2189,10 @@ class jcmt2caom2ingest(object):
             else:
                 plane_custom_dict['source_count'] = first_extension['NAXIS2']
         elif product in ['tile-moc']:
-            if moc is None:
-                logger.warning('Didn\'t get MOC object for a tile-moc')
+            if moc_area is None:
+                logger.warning('Didn\'t get MOC area for a tile-moc')
             else:
-                plane_custom_dict['area_covered'] = moc.area_sq_deg
+                plane_custom_dict['area_covered'] = moc_area
 
         return FileInfo(
             observationID=observationID, productID=productID, uri=uri,
@@ -2851,6 +3051,15 @@ class jcmt2caom2ingest(object):
                         action='store_true',
                         help='request extra heap space and RAM')
 
+        ap.add_argument('--read-threads',
+                        type=int,
+                        default=8,
+                        help='number of threads with which to read'
+                             ' FITS headers and PNG files (default 8)')
+        ap.add_argument('--checksum-cache',
+                        help='SQLite file in which to cache MD5 sums'
+                             ' of files between runs')
+
         # output directory
         ap.add_argument('--workdir',
                         help='output directory, (default = current directory')
@@ -2902,6 +3111,10 @@ class jcmt2caom2ingest(object):
         if args.big:
             self.big = args.big
 
+        if args.read_threads < 1:
+            ap.error('--read-threads must be at least 1')
+        self.read_threads = args.read_threads
+
         if args.config:
             self.config = os.path.abspath(
                 os.path.expandvars(
@@ -2951,6 +3164,12 @@ class jcmt2caom2ingest(object):
         logger.info('workdir            = %s', self.workdir)
 
         try:
+            # Open the checksum cache here so that it is always closed
+            # in the finally clause below.
+            if args.checksum_cache:
+                self.checksum_cache = ChecksumCache(os.path.abspath(
+                    os.path.expanduser(args.checksum_cache)))
+
             if args.fix:
                 return self.fix_observation(args.fix)
 
@@ -2994,6 +3213,7 @@ class jcmt2caom2ingest(object):
             # Construct validation object
             self.validation = CAOMValidation(
                 self.archive, file_id_regexes, self.make_file_id)
+            self.file_name_pattern = combine_regexes(file_id_regexes)
 
 
             files = self.getfilelist(indirpath)
@@ -3021,4 +3241,7 @@ class jcmt2caom2ingest(object):
             if self.conn is not None:
                 self.conn.close()
 
+            if self.checksum_cache is not None:
+                self.checksum_cache.close()
+
         return True
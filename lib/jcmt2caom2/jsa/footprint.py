@@ -0,0 +1,269 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Vectorized computation of raw observation footprints.
+
+These functions follow the same steps as raw.build_spatial_wcs, but
+handle the bounding boxes of many observations at once.  Corners are given
+as an array of shape (n, 4, 2) containing (RA, Dec) in degrees in the order
+bl, br, tr, tl, which is also the order of the resulting polygon vertices.
+
+The padding applied to degenerate (point and line) footprints is
+proportional to the beam size, so the geometry is returned as a "base"
+array of vertices and a "pad" array giving the offset of each vertex
+per unit of beam size.
+"""
+
+import numpy as np
+
+from jcmt2caom2.jsa.threed import cross_array, dot_array, unit_vectors
+
+# Position accuracy (degrees) within which corners are considered
+# to coincide.
+eps = 0.1 / 3600.0
+
+# Columns of the COMMON table giving each corner, in polygon order.
+corner_columns = (
+    ('obsrabl', 'obsdecbl'),
+    ('obsrabr', 'obsdecbr'),
+    ('obsratr', 'obsdectr'),
+    ('obsratl', 'obsdectl'),
+)
+
+BL = 0
+BR = 1
+TR = 2
+TL = 3
+
+
+class FootprintType(object):
+    """
+    Defines the footprint classifications.
+    """
+
+    NORMAL = 0
+    POINT = 1
+    LINE_Y = 2
+    LINE_X = 3
+    BOWTIE = 4
+    DEGENERATE = 5
+
+
+def footprint_corners(commons):
+    """
+    Construct the corner array from a sequence of COMMON rows.
+
+    Missing (None) values are converted to NaN.
+    """
+
+    return np.array(
+        [[(common[ra], common[dec]) for (ra, dec) in corner_columns]
+         for common in commons],
+        dtype=np.float64).reshape((-1, 4, 2))
+
+
+def raw_footprint_geometry(corners):
+    """
+    Classify footprints and determine their padded vertices.
+
+    Point footprints are expanded to a box one beam across.  Line footprints
+    are expanded sideways, and lengthwise, by half a beam.  Bowtie footprints,
+    where the corners were recorded in the wrong order, have either the bl
+    and br or the br and tr corners swapped, whichever makes the turns at
+    all of the corners the same direction.  Footprints with non-finite
+    coordinates, or for which raw.build_spatial_wcs would not be able to
+    compute the included angles at the corners, are classified as
+    DEGENERATE and their vertices should not be used.
+
+    Returns a tuple (kind, base, pad) where `kind` is an array of
+    FootprintType values.
+    """
+
+    corners = np.asarray(corners, dtype=np.float64)
+    n = corners.shape[0]
+
+    kind = np.full(n, FootprintType.NORMAL, dtype=np.int8)
+    base = corners.copy()
+    pad = np.zeros_like(corners)
+
+    (bl, br, tr, tl) = (corners[:, i, :] for i in (BL, BR, TR, TL))
+
+    def close(a, b):
+        diff = a - b
+        return np.hypot(diff[:, 0], diff[:, 1]) < eps
+
+    bl_br = close(bl, br)
+    bl_tl = close(bl, tl)
+    tl_tr = close(tl, tr)
+    br_tr = close(br, tr)
+
+    point = bl_br & bl_tl & tl_tr
+    line_y = ~point & bl_br & tl_tr & ~bl_tl
+    line_x = ~(point | line_y) & bl_tl & br_tr & ~bl_br
+    normal = ~(point | line_y | line_x)
+
+    kind[point] = FootprintType.POINT
+    kind[line_y] = FootprintType.LINE_Y
+    kind[line_x] = FootprintType.LINE_X
+
+    # Expand points by half a beam in each direction.
+    if point.any():
+        cosdec = np.cos(np.radians(br[point, 1]))
+        pad[point, :, 0] = (
+            0.5 * np.array([-1.0, 1.0, 1.0, -1.0]) / cosdec[:, np.newaxis])
+        pad[point, :, 1] = 0.5 * np.array([-1.0, -1.0, 1.0, 1.0])
+
+    _pad_lines(pad, line_y, bl, tl, along_x=False)
+    _pad_lines(pad, line_x, bl, br, along_x=True)
+
+    # Check the orientation of the remaining boxes at each corner.
+    if normal.any():
+        boxes = np.flatnonzero(normal)
+        v = unit_vectors(corners[boxes])
+
+        (degenerate, mixed) = _corner_turns(v)
+        mixed &= ~degenerate
+
+        kind[boxes[degenerate]] = FootprintType.DEGENERATE
+
+        # If the turns are not all in the same direction, the box may
+        # be a bowtie.  Try swapping bl and br, then br and tr.  (If
+        # neither gives consistent turns, the box is concave rather than
+        # crossed, and is left as it is.)
+        for (i, j) in ((BL, BR), (BR, TR)):
+            order = [BL, BR, TR, TL]
+            (order[i], order[j]) = (j, i)
+
+            (swap_degenerate, swap_mixed) = _corner_turns(v[:, order])
+            fixed = mixed & ~(swap_degenerate | swap_mixed)
+            mixed &= ~fixed
+
+            swap = boxes[fixed]
+            kind[swap] = FootprintType.BOWTIE
+            base[np.ix_(swap, [i, j])] = base[np.ix_(swap, [j, i])]
+
+    kind[~np.isfinite(corners).all(axis=(1, 2))] = FootprintType.DEGENERATE
+
+    return (kind, base, pad)
+
+
+def raw_footprints(corners, beamsize):
+    """
+    Compute footprint vertices for the given beam size(s), which may
+    be a scalar or an array with one value per footprint.
+
+    Returns a tuple (kind, vertices) where `vertices` is an array
+    of the same shape as `corners`.
+    """
+
+    (kind, base, pad) = raw_footprint_geometry(corners)
+
+    beamsize = np.asarray(beamsize, dtype=np.float64)
+    if beamsize.ndim:
+        beamsize = beamsize[:, np.newaxis, np.newaxis]
+
+    return (kind, base + beamsize * pad)
+
+
+def prefetch_footprints(commons):
+    """
+    Determine the footprint geometry for those of the given COMMON
+    rows for which raw.build_spatial_wcs would construct a spatial WCS.
+
+    Returns a dictionary of (kind, base, pad) tuples by obsid, where `base`
+    and `pad` are each of shape (4, 2).
+    """
+
+    commons = [
+        x for x in commons
+        if x['obs_type'] in ('science', 'pointing', 'focus')
+        and x['obsrabl'] is not None]
+
+    if not commons:
+        return {}
+
+    (kind, base, pad) = raw_footprint_geometry(footprint_corners(commons))
+
+    return {
+        common['obsid']: (kind[i], base[i], pad[i])
+        for (i, common) in enumerate(commons)}
+
+
+def _corner_turns(v):
+    """
+    Check the turns at the corners of polygons given as an array of unit
+    vectors of shape (n, 4, 3).
+
+    Returns a tuple of boolean arrays (degenerate, mixed) indicating
+    polygons for which ThreeD.included_angle would fail at any corner,
+    and those for which the turns, with direction as given by
+    ThreeD.signed_included_angle, are not all the same.
+    """
+
+    # Corner b with its neighbours a (following) and c (preceding).
+    b = v
+    a = np.roll(v, -1, axis=1)
+    c = np.roll(v, 1, axis=1)
+    amb = a - b
+    cmb = c - b
+
+    degenerate = (
+        np.all(a == b, axis=2) | np.all(c == b, axis=2) |
+        np.all(c == a, axis=2) |
+        ~np.any(cross_array(amb, b), axis=2) |
+        ~np.any(cross_array(cmb, b), axis=2)).any(axis=1)
+
+    orientation = dot_array(cross_array(amb, cmb), b)
+    sign = np.where(orientation < 0.0, -1, 1)
+    mixed = np.any(sign != sign[:, :1], axis=1)
+
+    return (degenerate, mixed)
+
+
+def _pad_lines(pad, mask, start, end, along_x):
+    """
+    Set the padding for line footprints running from `start` to `end`,
+    which are the bl and br (along_x) or bl and tl corners.
+    """
+
+    if not mask.any():
+        return
+
+    diff = end[mask] - start[mask]
+    cosdec = np.cos(np.radians((end[mask, 1] + start[mask, 1]) / 2.0))
+
+    along = np.column_stack((diff[:, 0] * cosdec, diff[:, 1]))
+    perp = np.column_stack((diff[:, 1], -diff[:, 0] * cosdec))
+    norm = np.hypot(along[:, 0], along[:, 1])[:, np.newaxis]
+
+    along /= norm
+    perp /= norm
+    along[:, 0] /= cosdec
+    perp[:, 0] /= cosdec
+
+    if along_x:
+        offset_x = 0.5 * along
+        offset_y = 0.5 * perp
+    else:
+        offset_x = -0.5 * perp
+        offset_y = 0.5 * along
+
+    pad[mask] = np.stack((
+        - offset_x - offset_y,
+        offset_x - offset_y,
+        offset_x + offset_y,
+        - offset_x + offset_y), axis=1)
+
@@ -49,7 +49,8 @@ permitted = {
 }
 
 
-def instrument_keywords(strictness, frontend, backend, keyword_dict):
+def instrument_keywords(strictness, frontend, backend, keyword_dict,
+                        messages=None):
     """
     Generates a list of keywords for the CAOM-2 field Instrument.keywords.
 
@@ -71,6 +72,8 @@ def instrument_keywords(strictness, frontend, backend, keyword_dict):
         sideband: for heterodyne observations, the signal sideband (USB, LSB)
         sideband_mode: single or double sideband (SSB, DSB)
         swiching_mode: the switching mode in use
+    messages: optional list to which to append a description of each
+              violation found (in addition to it being logged)
 
     Returns a tuple containing:
     bad: True if an error was encountered, False otherwise
@@ -103,6 +106,11 @@ def instrument_keywords(strictness, frontend, backend, keyword_dict):
     """
     bad = False
 
+    def warn(message, *args):
+        logger.warning(message, *args)
+        if messages is not None:
+            messages.append(message % args)
+
     # The backend is not mandatory for external data products, but the
     # rest of the backend-dependent validity checks must then be skipped
 
@@ -111,32 +119,32 @@ def instrument_keywords(strictness, frontend, backend, keyword_dict):
     myFrontend = frontend.strip().upper()
 
     if myBackend not in permitted:
-        logger.warning('instrument_keywords does not recognize ' +
-                       '"%s" as a permitted backend', backend)
+        warn('instrument_keywords does not recognize ' +
+             '"%s" as a permitted backend', backend)
         bad = True
     else:
         # The remaining checks only work if backend is permitted
         if myBackend in ('ACSIS', 'DAS', 'AOS-C'):
             if 'sideband' not in keyword_dict and strictness == 'raw':
-                logger.warning('with strictness = %s'
-                               ' backend = %s'
-                               ' frontend = %s'
-                               ' sideband is not defined',
-                               strictness, backend, frontend)
+                warn('with strictness = %s'
+                     ' backend = %s'
+                     ' frontend = %s'
+                     ' sideband is not defined',
+                     strictness, backend, frontend)
                 bad = True
             if 'sideband' in keyword_dict:
                 sideband = keyword_dict['sideband'].strip().upper()
                 if sideband not in permitted[myBackend]['sideband']:
-                    logger.warning('sideband %s'
-                                   ' is not in the list permited for %s: %s',
-                                   sideband, myBackend,
-                                   repr(permitted[myBackend]['sideband']))
+                    warn('sideband %s'
+                         ' is not in the list permited for %s: %s',
+                         sideband, myBackend,
+                         repr(permitted[myBackend]['sideband']))
                     bad = True
 
             if ('sideband_filter' not in keyword_dict and
                     strictness != 'external'):
 
-                logger.warning('sideband_filter is not defined')
+                warn('sideband_filter is not defined')
                 bad = True
             if 'sideband_filter' in keyword_dict:
                 sideband_filter = \
@@ -157,7 +165,7 @@ def instrument_keywords(strictness, frontend, backend, keyword_dict):
 
                 elif (sideband_filter not in
                         permitted[myBackend]['sideband_filter']):
-                    logger.warning(
+                    warn(
                         'sideband_filter %s'
                         ' is not in the list permited for %s: %s',
                         sideband_filter, backend,
@@ -165,17 +173,17 @@ def instrument_keywords(strictness, frontend, backend, keyword_dict):
                     bad = True
         else:
             if 'sideband' in keyword_dict:
-                logger.warning('sideband is not permitted for %s',
-                               backend)
+                warn('sideband is not permitted for %s',
+                     backend)
                 bad = True
 
             if 'sideband_filter' in keyword_dict:
-                logger.warning('sideband_filter is not permitted for %s',
-                               backend)
+                warn('sideband_filter is not permitted for %s',
+                     backend)
                 bad = True
 
         if 'switching_mode' not in keyword_dict and strictness == 'raw':
-            logger.warning('switching_mode is not defined')
+            warn('switching_mode is not defined')
             bad = True
         if 'switching_mode' in keyword_dict:
             switching_mode = keyword_dict['switching_mode'].strip().upper()
@@ -185,10 +193,10 @@ def instrument_keywords(strictness, frontend, backend, keyword_dict):
                 keyword_dict['switching_mode'] = switching_mode
 
             if switching_mode not in permitted[myBackend]['switching_mode']:
-                logger.warning('switching_mode %s'
-                               ' is not in the list permited for %s: %s',
-                               switching_mode, backend,
-                               repr(permitted[myBackend]['switching_mode']))
+                warn('switching_mode %s'
+                     ' is not in the list permited for %s: %s',
+                     switching_mode, backend,
+                     repr(permitted[myBackend]['switching_mode']))
                 bad = True
 
     # If there were no actual errors, compose the keyword list
@@ -14,6 +14,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import Counter
+from functools import lru_cache
 import logging
 
 from tools4caom2.error import CAOMError
@@ -23,14 +25,15 @@ from jcmt2caom2.jsa.product_id import product_id
 logger = logging.getLogger(__name__)
 
 
-def raw_product_id(backend, obsid, conn):
+def raw_product_id(backend, obsid, subsystem):
     """
     Generates raw (observationID, productID) values for an observation.
 
     Arguments:
     backend: one of ACSIS, DAS, AOS-C, SCUBA-2
     obsid: observation identifier, primary key in COMMON table
-    conn: connection to database
+    subsystem: dictionary of ACSIS rows keyed on subsysnr
+               (not used for SCUBA-2)
 
     Returns:
     return a dictionary of productID keyed on
@@ -43,19 +46,22 @@ def raw_product_id(backend, obsid, conn):
     else:
         subsysnr_dict = {}
 
-        result = conn.get_heterodyne_product_info(backend, obsid)
+        if subsystem:
+            # Subsystems sharing a spectrum ID form a hybrid mode spectrum.
+            hybrid = Counter(row['specid'] for row in subsystem.values())
 
-        if result:
-            for subsysnr, restfreq, bwmode, specid, hybrid, ifchansp in result:
-                restfreqhz = 1.0e9 * float(restfreq)
+            for (subsysnr, row) in subsystem.items():
+                restfreqhz = 1.0e9 * float(row['restfreq'])
                 prefix = 'raw'
-                if int(hybrid) > 1:
+                if hybrid[row['specid']] > 1:
                     prefix = 'raw-hybrid'
 
                 # If "bwmode" is not specified, try to infer the (modern style)
                 # string from the ifchansp value -- see ORAC-DR
                 # heterodyne/_VERIFY_HEADERS_ primitive.
+                bwmode = row['bwmode']
                 if bwmode is None:
+                    ifchansp = row['ifchansp']
                     if ifchansp is None:
                         raise CAOMError('both BWMODE and IFCHANSP are null')
 
@@ -75,12 +81,23 @@ def raw_product_id(backend, obsid, conn):
                     logger.warning('inferred BWMODE=%s from IFCHANSP=%f',
                                    bwmode, ifchansp)
 
-                subsysnr_dict[str(subsysnr)] = product_id(backend,
-                                                          product=prefix,
-                                                          restfreq=restfreqhz,
-                                                          bwmode=bwmode,
-                                                          subsysnr=str(specid))
+                subsysnr_dict[str(subsysnr)] = _heterodyne_product_id(
+                    backend, prefix, restfreqhz, bwmode, str(row['specid']))
         else:
             raise CAOMError('no rows returned from ACSIS for obsid = ' + obsid)
 
     return subsysnr_dict
+
+
+@lru_cache(maxsize=1024)
+def _heterodyne_product_id(backend, product, restfreq, bwmode, specid):
+    """
+    Memoized wrapper for product_id for heterodyne raw data, since
+    the same configurations recur in many observations.
+    """
+
+    return product_id(backend,
+                      product=product,
+                      restfreq=restfreq,
+                      bwmode=bwmode,
+                      subsysnr=specid)
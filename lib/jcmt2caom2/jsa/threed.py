@@ -17,6 +17,8 @@ __author__ = "Russell O. Redman"
 
 import math
 
+import numpy as np
+
 from jcmt2caom2.jsa.twod import TwoD
 
 
@@ -24,28 +26,26 @@ class ThreeD(object):
     """
     Simple three-tuple vector
     """
+    __slots__ = ('x', 'y', 'z')
+
     radiansPerDegree = math.pi / 180.0
 
     def __init__(self, x=None, y=None, z=None):
         """
         Create a three-tuple with coordinates (x, y, z)
         """
-        __slots__ = ["x", "y", "z"]
         if isinstance(x, ThreeD):
             self.x = x.x
             self.y = x.y
             self.z = x.z
         elif isinstance(x, TwoD):
-            self.x = (math.cos(ThreeD.radiansPerDegree * x.x) *
-                      math.cos(ThreeD.radiansPerDegree * x.y))
-            self.y = (math.sin(ThreeD.radiansPerDegree * x.x) *
-                      math.cos(ThreeD.radiansPerDegree * x.y))
-            self.z = math.sin(ThreeD.radiansPerDegree * x.y)
-        elif isinstance(x, tuple) and len(x) == 3:
-            self.x = float(x[0])
-            self.y = float(x[1])
-            self.z = float(x[2])
-        elif isinstance(x, list) and len(x) == 3:
+            ra = ThreeD.radiansPerDegree * x.x
+            dec = ThreeD.radiansPerDegree * x.y
+            cosdec = math.cos(dec)
+            self.x = math.cos(ra) * cosdec
+            self.y = math.sin(ra) * cosdec
+            self.z = math.sin(dec)
+        elif isinstance(x, (tuple, list)) and len(x) == 3:
             self.x = float(x[0])
             self.y = float(x[1])
             self.z = float(x[2])
@@ -58,6 +58,18 @@ class ThreeD(object):
             self.y = None
             self.z = None
 
+    @classmethod
+    def _make(cls, x, y, z):
+        """
+        Create a three-tuple from values which are already floats,
+        bypassing the checks in the constructor.
+        """
+        t = object.__new__(cls)
+        t.x = x
+        t.y = y
+        t.z = z
+        return t
+
     def __str__(self):
         """
         string representation
@@ -89,9 +101,9 @@ class ThreeD(object):
         Arguments:
         t: another twod
         """
-        return ThreeD(self.x + t.x,
-                      self.y + t.y,
-                      self.z + t.z)
+        return ThreeD._make(self.x + t.x,
+                            self.y + t.y,
+                            self.z + t.z)
 
     def __sub__(self, t):
         """
@@ -100,9 +112,9 @@ class ThreeD(object):
         Arguments:
         t: another twod
         """
-        return ThreeD(self.x - t.x,
-                      self.y - t.y,
-                      self.z - t.z)
+        return ThreeD._make(self.x - t.x,
+                            self.y - t.y,
+                            self.z - t.z)
 
     def __mul__(self, f):
         """
@@ -111,9 +123,9 @@ class ThreeD(object):
         Arguments:
         t: another twod
         """
-        return ThreeD(f*self.x,
-                      f*self.y,
-                      f*self.z)
+        return ThreeD._make(f*self.x,
+                            f*self.y,
+                            f*self.z)
 
     def __rmul__(self, f):
         """
@@ -122,9 +134,9 @@ class ThreeD(object):
         Arguments:
         t: another twod
         """
-        return ThreeD(f*self.x,
-                      f*self.y,
-                      f*self.z)
+        return ThreeD._make(f*self.x,
+                            f*self.y,
+                            f*self.z)
 
     def __truediv__(self, f):
         """
@@ -133,13 +145,64 @@ class ThreeD(object):
         Arguments:
         t: another twod
         """
-        return ThreeD(self.x / f,
-                      self.y / f,
-                      self.z / f)
+        return ThreeD._make(self.x / f,
+                            self.y / f,
+                            self.z / f)
 
     def __div__(self, f):
         return self.__truediv__(f)
 
+    def __iadd__(self, t):
+        """
+        add t to self in place
+
+        Arguments:
+        t: another threed
+        """
+        self.x += t.x
+        self.y += t.y
+        self.z += t.z
+        return self
+
+    def __isub__(self, t):
+        """
+        subtract t from self in place
+
+        Arguments:
+        t: another threed
+        """
+        self.x -= t.x
+        self.y -= t.y
+        self.z -= t.z
+        return self
+
+    def __imul__(self, f):
+        """
+        multiply self by f in place
+
+        Arguments:
+        f: scale factor
+        """
+        self.x *= f
+        self.y *= f
+        self.z *= f
+        return self
+
+    def __itruediv__(self, f):
+        """
+        divide self by f in place
+
+        Arguments:
+        f: scale factor
+        """
+        self.x /= f
+        self.y /= f
+        self.z /= f
+        return self
+
+    def __idiv__(self, f):
+        return self.__itruediv__(f)
+
     def abs(self):
         """
         length of self
@@ -147,13 +210,16 @@ class ThreeD(object):
         Arguments:
         <none>
         """
-        return math.sqrt(self.x**2 + self.y**2 + self.z**2)
+        x = self.x
+        y = self.y
+        z = self.z
+        return math.sqrt(x*x + y*y + z*z)
 
     @staticmethod
     def cross(a, b):
-        return ThreeD(a.y * b.z - a.z * b.y,
-                      a.z * b.x - a.x * b.z,
-                      a.x * b.y - a.y * b.x)
+        return ThreeD._make(a.y * b.z - a.z * b.y,
+                            a.z * b.x - a.x * b.z,
+                            a.x * b.y - a.y * b.x)
 
     @staticmethod
     def dot(a, b):
@@ -176,14 +242,14 @@ class ThreeD(object):
         if 0.0 == norm:
             raise ValueError('The origin, a = ' + str(a) + ', and '
                              'b = ' + str(b) + ' are colinear')
-        amb = amb / norm
+        amb /= norm
 
         cmb = ThreeD.cross(c - b, b)
         norm = cmb.abs()
         if 0.0 == norm:
             raise ValueError('The origin, b = ' + str(b) + ', and '
                              'c = ' + str(c) + ' are colinear')
-        cmb = cmb / norm
+        cmb /= norm
 
         cosval = ThreeD.dot(amb, cmb)
         if cosval > 1.0:
@@ -191,3 +257,73 @@ class ThreeD(object):
         if cosval < -1.0:
             cosval = -1.0
         return math.acos(cosval) / ThreeD.radiansPerDegree
+
+    @staticmethod
+    def signed_included_angle(a, b, c):
+        """
+        Calculate the included angle as for included_angle, but negative
+        if the turn from a to c at b is clockwise as seen from outside
+        the sphere.
+        """
+        angle = ThreeD.included_angle(a, b, c)
+        if ThreeD.dot(ThreeD.cross(a - b, c - b), b) < 0.0:
+            return -angle
+        return angle
+
+
+def unit_vectors(radec):
+    """
+    Convert an array of (RA, Dec) in degrees, with the coordinates
+    in the last dimension, to an array of Cartesian unit vectors,
+    as ThreeD(TwoD(ra, dec)).
+    """
+    ra = np.radians(radec[..., 0])
+    dec = np.radians(radec[..., 1])
+    cosdec = np.cos(dec)
+
+    return np.stack(
+        (np.cos(ra) * cosdec, np.sin(ra) * cosdec, np.sin(dec)), axis=-1)
+
+
+def cross_array(a, b):
+    """
+    Cross products of arrays of vectors, as ThreeD.cross.
+    """
+    return np.cross(a, b)
+
+
+def dot_array(a, b):
+    """
+    Dot products of arrays of vectors, as ThreeD.dot.
+    """
+    return np.einsum('...k,...k->...', a, b)
+
+
+def included_angle_array(a, b, c, signed=False):
+    """
+    Calculate included angles for arrays of vectors, as
+    ThreeD.included_angle, or ThreeD.signed_included_angle
+    if `signed` is specified.
+
+    Instead of raising an exception, the result is NaN for
+    degenerate cases.
+    """
+    amb = cross_array(a - b, b)
+    cmb = cross_array(c - b, b)
+    amb_norm = np.sqrt(dot_array(amb, amb))
+    cmb_norm = np.sqrt(dot_array(cmb, cmb))
+
+    degenerate = (
+        np.all(a == b, axis=-1) | np.all(b == c, axis=-1) |
+        np.all(c == a, axis=-1) | (amb_norm == 0.0) | (cmb_norm == 0.0))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cosval = dot_array(amb, cmb) / (amb_norm * cmb_norm)
+
+    angle = np.degrees(np.arccos(np.clip(cosval, -1.0, 1.0)))
+
+    if signed:
+        angle = np.where(
+            dot_array(cross_array(a - b, c - b), b) < 0.0, -angle, angle)
+
+    return np.where(degenerate, np.nan, angle)
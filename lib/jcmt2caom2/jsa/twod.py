@@ -23,18 +23,16 @@ class TwoD(object):
     Simple two-tuple vector
     """
 
+    __slots__ = ('x', 'y')
+
     def __init__(self, x=None, y=None):
         """
         Create a two-tuple with coordinates (x, y)
         """
-        __slots__ = ["x", "y"]
         if isinstance(x, TwoD):
             self.x = x.x
             self.y = x.y
-        elif isinstance(x, tuple) and len(x) == 2:
-            self.x = float(x[0])
-            self.y = float(x[1])
-        elif isinstance(x, list) and len(x) == 2:
+        elif isinstance(x, (tuple, list)) and len(x) == 2:
             self.x = float(x[0])
             self.y = float(x[1])
         elif x is not None and y is not None:
@@ -44,6 +42,17 @@ class TwoD(object):
             self.x = None
             self.y = None
 
+    @classmethod
+    def _make(cls, x, y):
+        """
+        Create a two-tuple from values which are already floats,
+        bypassing the checks in the constructor.
+        """
+        t = object.__new__(cls)
+        t.x = x
+        t.y = y
+        return t
+
     def __str__(self):
         """
         string representation
@@ -75,7 +84,7 @@ class TwoD(object):
         Arguments:
         t: another twod
         """
-        return TwoD(self.x + t.x, self.y + t.y)
+        return TwoD._make(self.x + t.x, self.y + t.y)
 
     def __sub__(self, t):
         """
@@ -84,7 +93,7 @@ class TwoD(object):
         Arguments:
         t: another twod
         """
-        return TwoD(self.x - t.x, self.y - t.y)
+        return TwoD._make(self.x - t.x, self.y - t.y)
 
     def __mul__(self, f):
         """
@@ -93,7 +102,7 @@ class TwoD(object):
         Arguments:
         t: another twod
         """
-        return TwoD(f*self.x, f*self.y)
+        return TwoD._make(f*self.x, f*self.y)
 
     def __rmul__(self, f):
         """
@@ -102,7 +111,7 @@ class TwoD(object):
         Arguments:
         t: another twod
         """
-        return TwoD(f*self.x, f*self.y)
+        return TwoD._make(f*self.x, f*self.y)
 
     def __truediv__(self, f):
         """
@@ -111,11 +120,58 @@ class TwoD(object):
         Arguments:
         t: another twod
         """
-        return TwoD(self.x/f, self.y/f)
+        return TwoD._make(self.x/f, self.y/f)
 
     def __div__(self, f):
         return self.__truediv__(f)
 
+    def __iadd__(self, t):
+        """
+        add t to self in place
+
+        Arguments:
+        t: another twod
+        """
+        self.x += t.x
+        self.y += t.y
+        return self
+
+    def __isub__(self, t):
+        """
+        subtract t from self in place
+
+        Arguments:
+        t: another twod
+        """
+        self.x -= t.x
+        self.y -= t.y
+        return self
+
+    def __imul__(self, f):
+        """
+        multiply self by f in place
+
+        Arguments:
+        f: scale factor
+        """
+        self.x *= f
+        self.y *= f
+        return self
+
+    def __itruediv__(self, f):
+        """
+        divide self by f in place
+
+        Arguments:
+        f: scale factor
+        """
+        self.x /= f
+        self.y /= f
+        return self
+
+    def __idiv__(self, f):
+        return self.__itruediv__(f)
+
     def swap(self, t):
         """
         swap the values of self and t
@@ -123,13 +179,7 @@ class TwoD(object):
         Arguments:
         t: another twod
         """
-        store = self.x
-        self.x = t.x
-        t.x = store
-
-        store = self.y
-        self.y = t.y
-        t.y = store
+        (self.x, self.y, t.x, t.y) = (t.x, t.y, self.x, self.y)
 
     def abs(self):
         """
@@ -138,7 +188,9 @@ class TwoD(object):
         Arguments:
         <none>
         """
-        return math.sqrt(self.x**2 + self.y**2)
+        x = self.x
+        y = self.y
+        return math.sqrt(x*x + y*y)
 
     @staticmethod
     def cross(v1, v2):
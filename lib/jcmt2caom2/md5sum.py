@@ -17,17 +17,57 @@
 
 from __future__ import absolute_import, division, print_function
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from hashlib import md5
 
+# Size of buffer used when reading files.  hashlib releases the GIL while
+# hashing large blocks of data, so multiple files can be hashed in parallel.
+buffer_size = 1024 * 1024
+
 
 def get_md5sum(filename):
     sum = md5()
+    buffer_ = bytearray(buffer_size)
+    view = memoryview(buffer_)
 
-    with open(filename, 'rb') as f:
+    with open(filename, 'rb', buffering=0) as f:
         while True:
-            data = f.read(1024)
-            if len(data) == 0:
+            n = f.readinto(buffer_)
+            if not n:
                 break
-            sum.update(data)
+            sum.update(view[:n])
 
     return sum.hexdigest()
+
+
+def get_md5sums(filenames, workers=1, md5sum_function=get_md5sum):
+    """
+    Compute the MD5 sums of the given files using a pool of threads.
+
+    Yields (filename, md5sum) tuples in the order in which the files were
+    given, while up to twice as many files as there are workers are hashed
+    ahead.  An alternative function to compute each MD5 sum, such as
+    ChecksumCache.get_md5sum, can be specified.
+    """
+
+    if workers <= 1:
+        for filename in filenames:
+            yield (filename, md5sum_function(filename))
+        return
+
+    window = 2 * workers
+    pending = deque()
+
+    with ThreadPoolExecutor(workers) as executor:
+        for filename in filenames:
+            if len(pending) >= window:
+                (done, future) = pending.popleft()
+                yield (done, future.result())
+
+            pending.append(
+                (filename, executor.submit(md5sum_function, filename)))
+
+        while pending:
+            (done, future) = pending.popleft()
+            yield (done, future.result())
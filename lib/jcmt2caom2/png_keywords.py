@@ -13,19 +13,57 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from binascii import unhexlify
 from codecs import ascii_decode
 import json
+import logging
+import struct
 import subprocess
+from xml.etree import ElementTree
+import zlib
 
 from tools4caom2.error import CAOMError
 
+logger = logging.getLogger(__name__)
+
 EXIFTOOL_COMMAND = 'exiftool'
 
+png_signature = b'\x89PNG\r\n\x1a\n'
+
+# Namespaces of XMP elements which may contain keywords.
+xmp_keyword_elements = (
+    '{http://purl.org/dc/elements/1.1/}subject',
+    '{http://ns.adobe.com/pdf/1.3/}Keywords',
+)
+xmp_list_item = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}li'
+
 
 def read_png_keywords(filename):
     """
     Read EXIF data from a PNG file.  The list of keywords is then returned as
     a dictionary by assuming each entry is a JSA-style "key=value" pair.
+
+    The keywords are read from the PNG file's text chunks by
+    read_png_chunk_keywords where possible, otherwise exiftool is used.
+    """
+
+    try:
+        keywords = read_png_chunk_keywords(filename)
+
+    except (IOError, ValueError, zlib.error, ElementTree.ParseError) as e:
+        logger.debug('Could not read PNG chunks from %s (%s)', filename, e)
+        keywords = None
+
+    if not keywords:
+        logger.debug('Reading keywords from %s using exiftool', filename)
+        keywords = read_png_keywords_exiftool(filename)
+
+    return dict(x.split('=', 1) for x in keywords)
+
+
+def read_png_keywords_exiftool(filename):
+    """
+    Read the list of keywords from a PNG file using exiftool.
     """
 
     exif_json = subprocess.check_output(
@@ -39,4 +77,149 @@ def read_png_keywords(filename):
 
     keywords = exif_data[0]['Keywords']
 
-    return dict(x.split('=', 1) for x in keywords)
+    if not isinstance(keywords, list):
+        keywords = [keywords]
+
+    return keywords
+
+
+def read_png_chunk_keywords(filename):
+    """
+    Read the list of keywords from the text chunks of a PNG file which
+    precede the image data.
+
+    Keywords are taken from "Keywords" text chunks, XMP packets (dc:subject
+    or pdf:Keywords) and IPTC raw profiles (as written by exiftool).
+
+    Returns the list of keywords which contain "=", and so appear to be
+    JSA-style "key=value" pairs, logging any others.  Raises ValueError
+    if the file does not appear to be a PNG file.
+    """
+
+    keywords = []
+
+    for (keyword, text) in _read_png_text_chunks(filename):
+        if keyword == 'Keywords':
+            keywords.extend(text.splitlines())
+
+        elif keyword == 'XML:com.adobe.xmp':
+            keywords.extend(_parse_xmp_keywords(text))
+
+        elif keyword == 'Raw profile type iptc':
+            keywords.extend(_parse_iptc_keywords(text))
+
+    result = []
+
+    for keyword in keywords:
+        if '=' in keyword:
+            result.append(keyword.strip())
+        else:
+            logger.warning('Ignoring keyword without "=" in %s: %s',
+                           filename, keyword)
+
+    return result
+
+
+def _read_png_text_chunks(filename):
+    """
+    Generator yielding (keyword, text) tuples for the tEXt, zTXt and iTXt
+    chunks of a PNG file, stopping at the first IDAT chunk.
+    """
+
+    with open(filename, 'rb') as f:
+        if f.read(len(png_signature)) != png_signature:
+            raise ValueError('file does not have a PNG signature')
+
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError('truncated chunk header')
+
+            (length, type_) = struct.unpack('>I4s', chunk_header)
+
+            if type_ in (b'IDAT', b'IEND'):
+                break
+
+            if type_ not in (b'tEXt', b'zTXt', b'iTXt'):
+                # Skip the chunk data and CRC.
+                f.seek(length + 4, 1)
+                continue
+
+            data = f.read(length)
+            if len(data) < length:
+                raise ValueError('truncated chunk data')
+            f.seek(4, 1)
+
+            (keyword, data) = data.split(b'\0', 1)
+            keyword = keyword.decode('latin-1')
+
+            if type_ == b'tEXt':
+                text = data.decode('latin-1')
+
+            elif type_ == b'zTXt':
+                text = zlib.decompress(data[1:]).decode('latin-1')
+
+            else:
+                (compressed, data) = (data[0:1], data[2:])
+                (_, _, data) = data.split(b'\0', 2)
+                if compressed == b'\1':
+                    data = zlib.decompress(data)
+                text = data.decode('utf-8')
+
+            yield (keyword, text)
+
+
+def _parse_xmp_keywords(text):
+    """
+    Extract the keywords from an XMP packet.
+    """
+
+    keywords = []
+
+    root = ElementTree.fromstring(text.encode('utf-8'))
+
+    for element_name in xmp_keyword_elements:
+        for element in root.iter(element_name):
+            items = list(element.iter(xmp_list_item))
+            if items:
+                keywords.extend(x.text for x in items if x.text)
+            elif element.text:
+                keywords.append(element.text)
+
+    # pdf:Keywords may also be written as an attribute.
+    for element in root.iter():
+        value = element.get(xmp_keyword_elements[1])
+        if value:
+            keywords.append(value)
+
+    return keywords
+
+
+def _parse_iptc_keywords(text):
+    """
+    Extract the keywords (dataset 2:25) from an ImageMagick-style raw
+    IPTC profile, which consists of a type line, the length of the data
+    and the data as hexadecimal digits.
+    """
+
+    keywords = []
+
+    (_, length, hexdata) = text.strip().split(None, 2)
+    data = unhexlify(''.join(hexdata.split()))[:int(length)]
+
+    i = 0
+    while i + 5 <= len(data):
+        (marker, record, dataset, size) = struct.unpack(
+            '>BBBH', data[i:i + 5])
+
+        if marker != 0x1c or size & 0x8000:
+            break
+
+        i += 5
+
+        if record == 2 and dataset == 25:
+            keywords.append(data[i:i + size].decode('utf-8', 'replace'))
+
+        i += size
+
+    return keywords
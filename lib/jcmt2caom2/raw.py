@@ -16,13 +16,21 @@
 
 __author__ = "Russell O. Redman"
 
-from collections import defaultdict
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import copy
+from datetime import datetime, timedelta
 import argparse
+import json
 import logging
 import math
+import multiprocessing
 import os.path
 import re
+import socket
 import sys
+import threading
+import time
 
 from omp.db.part.arc import ArcDB
 from omp.obs.state import OMPState
@@ -66,9 +74,16 @@ from tools4caom2.error import CAOMError
 from tools4caom2.mjd import utc2mjd
 
 from jcmt2caom2.__version__ import version as jcmt2caom2version
+from jcmt2caom2.arcdb import \
+    find_obsids, find_obsids_commented, find_obsids_modified_since, \
+    prefetch_obsid_status, prefetch_raw_info
 from jcmt2caom2.caom2_tap import CAOM2TAP
+from jcmt2caom2.export import ObservationArchive
+from jcmt2caom2.ingest_state import IngestState, advance_watermark, \
+    make_fingerprint
 from jcmt2caom2.instrument.scuba2 import scuba2_spectral_wcs
 from jcmt2caom2.jsa.file_id import make_file_id_jcmt
+from jcmt2caom2.jsa.footprint import FootprintType, prefetch_footprints
 from jcmt2caom2.jsa.instrument_keywords import instrument_keywords
 from jcmt2caom2.jsa.instrument_name import instrument_name
 from jcmt2caom2.jsa.intent import intent
@@ -78,6 +93,7 @@ from jcmt2caom2.jsa.threed import ThreeD
 from jcmt2caom2.jsa.twod import TwoD
 from jcmt2caom2.mime import determine_mime_type
 from jcmt2caom2.project import get_project_pi_title, truncate_string
+from jcmt2caom2.work_queue import WorkQueue
 
 __doc__ = """
 The raw class immplements methods to collect metadata from the database
@@ -89,6 +105,200 @@ It therefore always reads the metadata from SYBASE.
 
 logger = logging.getLogger(__name__)
 
+pattern_date = re.compile(r'^\d{8}$')
+
+# raw object used by each worker process during parallel ingestion,
+# and the arguments for its connect method.
+_worker = None
+_worker_connect_args = None
+
+# Information required to write an observation to the repository,
+# as prepared by raw.prepare_ingestion.
+IngestJob = namedtuple(
+    'IngestJob',
+    ('obsid', 'uri', 'common', 'subsystem', 'files', 'fingerprint'))
+
+
+class ObservationRejected(CAOMError):
+    """
+    Exception raised when an observation can not be ingested for a reason
+    which will persist until its metadata are changed, as opposed to a
+    transient error.
+    """
+
+    pass
+
+
+def read_obsid_file(filename):
+    """
+    Read a list of obsids from a file containing one obsid per line.
+
+    Blank lines and lines starting with "#" are ignored.
+    """
+
+    result = []
+
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('#') or not line:
+                continue
+
+            result.append(line)
+
+    return result
+
+
+def _initialize_worker(collection, dry_run, xmloutdir, proxy, ams,
+                       state_file, force, writers, write_depth):
+    """
+    Prepare a raw object in a worker process for parallel ingestion.
+
+    Connections are opened when the worker receives its first batch
+    of observations.
+    """
+
+    global _worker, _worker_connect_args
+
+    _worker = raw()
+    _worker.collection = collection
+    _worker.dry_run = dry_run
+    _worker.xmloutdir = xmloutdir
+    _worker.force = force
+    _worker.writers = writers
+    _worker.write_depth = write_depth
+
+    if state_file is not None:
+        _worker.state = IngestState(state_file)
+
+    _worker_connect_args = (proxy, ams)
+
+
+def _ingest_worker_batch(obsids):
+    """
+    Ingest a batch of observations in a worker process.
+
+    Returns a list of the obsids which could not be ingested.
+    """
+
+    if _worker.conn is None:
+        try:
+            _worker.connect(*_worker_connect_args)
+
+        except Exception:
+            logger.exception('Error connecting worker process %i',
+                             os.getpid())
+            _worker.conn = None
+            return list(obsids)
+
+    return _worker.ingest_obsids(obsids)
+
+
+def write_report(filename, report):
+    """
+    Write a report in JSON format to the given file, or to standard
+    output if the filename is "-".
+    """
+
+    if filename == '-':
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+    else:
+        with open(filename, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+def subsystem_dict(backend, subsystemlist):
+    """
+    Convert a list of ACSIS or SCUBA2 rows into a dictionary by
+    subsystem number (filter for SCUBA-2).
+    """
+
+    subsystem = {}
+
+    if backend in ['ACSIS', 'DAS', 'AOSC']:
+        for row in subsystemlist:
+            subsysnr = row.pop('subsysnr')
+            subsystem[subsysnr] = row
+
+    elif backend == 'SCUBA-2':
+        for row in subsystemlist:
+            subsysnr = int(row['filter'])
+            subsystem[subsysnr] = row
+
+    else:
+        logger.warning(
+            'backend = "%s" is not one of '
+            '["ACSIS", "DAS", "AOSC", "SCUBA", "SCUBA-2"]',
+            backend)
+
+    return subsystem
+
+
+def _validate_observation(info):
+    """
+    Validate the prefetched metadata for an observation, for use
+    in worker processes.
+
+    Returns a tuple of the obsid and list of problems found.
+    """
+
+    validator = raw()
+    validator.obsid = info.common['obsid']
+
+    return (validator.obsid, validator.validate_observation(info))
+
+
+def corner_turn_signs(corners):
+    """
+    Determine the set of directions (as +1 or -1, according to
+    ThreeD.signed_included_angle) of the turns at the corners of
+    a polygon given as a list of ThreeD vectors.
+
+    Raises ValueError if the polygon is degenerate.
+    """
+
+    return set(
+        math.copysign(1, ThreeD.signed_included_angle(
+            corners[(i + 1) % len(corners)], corners[i], corners[i - 1]))
+        for i in range(len(corners)))
+
+
+def polygon_spatial_wcs(vertices):
+    """
+    Construct an ICRS spatial WCS with the given polygon, specified
+    as an iterable of (RA, Dec) tuples in degrees, as its bounds.
+    """
+
+    bounding_box = CoordPolygon2D()
+    for (x, y) in vertices:
+        bounding_box.vertices.append(ValueCoord2D(x, y))
+
+    spatial_axes = CoordAxis2D(Axis('RA', 'deg'),
+                               Axis('DEC', 'deg'))
+    spatial_axes.bounds = bounding_box
+
+    return SpatialWCS(spatial_axes, coordsys='ICRS', equinox=2000.0)
+
+
+def quality_metadata(quality):
+    """
+    Determine the CAOM-2 data quality (plane-level) and requirements
+    status (observation-level) corresponding to an OMP state.
+
+    Returns a (data_quality, requirements) tuple, either of which may be
+    None.
+    """
+
+    data_quality = DataQuality(Quality.JUNK) \
+        if OMPState.is_caom_junk(quality) else None
+    requirement_status = Requirements(Status.FAIL) \
+        if OMPState.is_caom_fail(quality) else None
+
+    return (data_quality, requirement_status)
+
 
 class INGESTIBILITY(object):
     """
@@ -138,7 +348,7 @@ class raw(object):
 
     def __init__(self):
         """
-        Create a jcmt2caom2.raw instance to ingest a single observation.
+        Create a jcmt2caom2.raw instance to ingest raw observations.
         """
 
         self.collection = None
@@ -148,21 +358,62 @@ class raw(object):
 
         self.conn = None
         self.tap = None
+        self.repository = None
 
         self.xmloutdir = None
 
+        # Ingestion state file, if used, and whether to ingest observations
+        # even if their fingerprint matches that in the state file.
+        self.state = None
+        self.state_file = None
+        self.force = False
+
+        # ObservationArchive to which to export observations instead
+        # of ingesting them into the repository.
+        self.export = None
+
+        # Number of observations for which to prefetch database rows
+        # when ingesting a list of observations, and the prefetched
+        # rows (a dictionary of RawObsInfo tuples by obsid).
+        self.prefetch_size = 200
+        self.prefetched = {}
+        self.prefetched_status = {}
+
+        # Number of threads with which to write observations to the
+        # repository (none if zero) and the maximum number of observations
+        # waiting to be written (twice the number of threads if None).
+        self.writers = 0
+        self.write_depth = None
+
+        # Number of observations to lease at a time from a work queue.
+        self.queue_batch_size = 20
+
+        # Prefetched footprint geometry by obsid, and that for the
+        # current observation.
+        self.prefetched_footprints = {}
+        self.footprint = None
+
+        # Proposal information by project ID, retained for the whole run.
+        self.proposal_cache = {}
+
     def get_proposal(self, project_id):
         """
         Get the PI name and proposal title for this project.
+
+        The result is cached so that each project is only looked up
+        once per run.
         """
 
-        (proposal_pi, proposal_title) = get_project_pi_title(
-            project_id, self.conn, self.tap)
+        if project_id not in self.proposal_cache:
+            (proposal_pi, proposal_title) = get_project_pi_title(
+                project_id, self.conn, self.tap)
 
-        return {
-            'pi': proposal_pi,
-            'title': proposal_title,
-        }
+            self.proposal_cache[project_id] = {
+                'pi': proposal_pi,
+                'title': proposal_title,
+            }
+
+        return dict(self.proposal_cache[project_id])
 
     def get_quality(self, obsid):
         """
@@ -177,32 +428,52 @@ class raw(object):
              as the value
         """
 
-        status = self.conn.get_obsid_status(obsid)
+        if obsid in self.prefetched_status:
+            status = self.prefetched_status.pop(obsid)
+        else:
+            status = self.conn.get_obsid_status(obsid)
 
-        results = {'quality': OMPState.GOOD}
-        if status is not None:
-            if not OMPState.is_valid(status):
-                raise CAOMError('Invalid OMP status: {0}'.format(status))
-            results['quality'] = status
+        results = {'quality': self.status_to_quality(status)}
         logger.info('For %s state = %s from ompobslog',
                     obsid, OMPState.get_name(results['quality']))
         return results
 
+    @staticmethod
+    def status_to_quality(status):
+        """
+        Convert an ompobslog status to the JSA quality, which is
+        JSA_QA.GOOD if no status has been entered.
+        """
+
+        if status is None:
+            return OMPState.GOOD
+
+        if not OMPState.is_valid(status):
+            raise CAOMError('Invalid OMP status: {0}'.format(status))
+
+        return status
+
     def check_observation(self,
                           common,
-                          subsystem):
+                          subsystem,
+                          problems=None):
         """
         Check the validity of the metadata for a single observation
 
         Arguments:
         common      dictionary containing fields common to the observation
         subsystem   dictionary containing fields from ACSIS or SCUBA2
+        problems    optional list to which to append a dictionary
+                    describing each problem found
 
         Returns:
         INGESTIBILITY.GOOD if observation is OK
         INGESTIBILITY.BAD  if observation should be skipped
         """
 
+        if problems is None:
+            problems = []
+
         nullvalues = []
         ingestibility = INGESTIBILITY.GOOD
 
@@ -213,6 +484,10 @@ class raw(object):
         if nullvalues:
             logger.warning('The following mandatory fields are NULL: %s',
                            ', '.join(sorted(nullvalues)))
+            problems.append({
+                'problem': 'null_fields',
+                'fields': sorted(nullvalues),
+            })
             ingestibility = INGESTIBILITY.BAD
 
         if common['obs_type'] in ('phase', 'RAMP'):
@@ -221,28 +496,43 @@ class raw(object):
             logger.warning(
                 'Observation %s is being skipped because obs_type = %s',
                 self.obsid, common['obs_type'])
+            problems.append({
+                'problem': 'obs_type',
+                'obs_type': common['obs_type'],
+            })
             ingestibility = INGESTIBILITY.BAD
 
         # Check observation-level mandatory headers with restricted values
         # by creating the instrument keyword list
         keyword_dict = {}
-        keyword_dict['switching_mode'] = common['sw_mode']
+        if common['sw_mode'] is not None:
+            keyword_dict['switching_mode'] = common['sw_mode']
         if common['scan_pat']:
             keyword_dict['x_scan_pat'] = common['scan_pat']
         if common['inbeam']:
             keyword_dict['inbeam'] = common['inbeam']
-        if common['backend'] in ('ACSIS', 'DAS', 'AOS-C'):
+        if common['backend'] in ('ACSIS', 'DAS', 'AOS-C') and subsystem:
             # Although stored in ACSIS, the sideband properties belong to the
             # whole observation.  Fetch them using any subsysnr.
             subsysnr = min(subsystem.keys())
             keyword_dict['sideband'] = subsystem[subsysnr]['obs_sb']
             keyword_dict['sideband_filter'] = subsystem[subsysnr]['sb_mode']
-        someBad, keyword_list = instrument_keywords('raw',
-                                                    common['instrume'],
-                                                    common['backend'],
-                                                    keyword_dict)
+        messages = []
+        if common['instrume'] is None or common['backend'] is None:
+            # Already reported as NULL mandatory fields.
+            someBad, keyword_list = (False, [])
+        else:
+            someBad, keyword_list = instrument_keywords('raw',
+                                                        common['instrume'],
+                                                        common['backend'],
+                                                        keyword_dict,
+                                                        messages=messages)
 
         if someBad:
+            problems.append({
+                'problem': 'instrument_keywords',
+                'messages': messages,
+            })
             ingestibility = INGESTIBILITY.BAD
             self.instrument_keywords = []
         else:
@@ -250,6 +540,123 @@ class raw(object):
 
         return ingestibility
 
+    def validate_observation(self, info):
+        """
+        Check the metadata for an observation without ingesting it.
+
+        Arguments:
+        info        RawObsInfo tuple of prefetched database rows
+
+        Returns a list of dictionaries describing the problems found,
+        which is empty if the observation could be ingested.
+        """
+
+        problems = []
+        common = info.common
+
+        instrument = common['instrume']
+        if ((instrument is not None) and
+                (instrument.upper() not in self.ALLOWED_INSTRUMENTS)):
+            problems.append({
+                'problem': 'forbidden_instrument',
+                'instrument': instrument,
+            })
+            return problems
+
+        backend = common['backend']
+        subsystem = subsystem_dict(backend, info.subsystem)
+        if not subsystem:
+            problems.append({
+                'problem': 'no_subsystems',
+                'backend': backend,
+            })
+
+        if info.files is None:
+            problems.append({'problem': 'no_files'})
+
+        # Continue without subsystems so that the other problems, such as
+        # NULL mandatory fields, are also reported.
+        if subsystem:
+            try:
+                raw_product_id(backend, self.obsid, subsystem)
+
+            except CAOMError as e:
+                problems.append({'problem': 'product_id', 'message': str(e)})
+
+        try:
+            self.check_observation(common, subsystem, problems)
+
+        except Exception as e:
+            problems.append({'problem': 'exception', 'message': str(e)})
+
+        return problems
+
+    def validate_obsids(self, obsids, jobs=1):
+        """
+        Check the metadata for the given observations, using a pool of
+        worker processes if more than one job is requested.
+
+        The database rows are prefetched in batches, and the checks
+        for each batch are distributed to the worker processes.
+
+        Returns a list of dictionaries giving the obsid and problems
+        for each observation which could not be ingested.
+        """
+
+        result = []
+
+        pool = None
+        if jobs > 1:
+            pool = multiprocessing.Pool(jobs)
+
+        try:
+            for i in range(0, len(obsids), self.prefetch_size):
+                batch = obsids[i:i + self.prefetch_size]
+
+                prefetched = prefetch_raw_info(self.conn, batch)
+
+                for obsid in batch:
+                    if obsid not in prefetched:
+                        result.append({
+                            'obsid': obsid,
+                            'problems': [{'problem': 'no_common'}],
+                        })
+
+                infos = [prefetched[x] for x in batch if x in prefetched]
+
+                footprints = prefetch_footprints(x.common for x in infos)
+
+                if pool is None:
+                    checked = map(_validate_observation, infos)
+                else:
+                    checked = pool.map(_validate_observation, infos)
+
+                for (obsid, problems) in checked:
+                    footprint = footprints.get(obsid)
+                    if ((footprint is not None) and
+                            footprint[0] == FootprintType.DEGENERATE):
+                        problems.append({'problem': 'degenerate_footprint'})
+
+                    if problems:
+                        result.append({
+                            'obsid': obsid,
+                            'problems': problems,
+                        })
+
+            if pool is not None:
+                pool.close()
+
+        except:
+            if pool is not None:
+                pool.terminate()
+            raise
+
+        finally:
+            if pool is not None:
+                pool.join()
+
+        return result
+
     def build_observation(self,
                           observation,
                           common,
@@ -277,10 +684,8 @@ class raw(object):
                                             observationID)
 
         # Determine data quality metrics for this observation.
-        data_quality = DataQuality(Quality.JUNK) \
-            if OMPState.is_caom_junk(common['quality']) else None
-        requirement_status = Requirements(Status.FAIL) \
-            if OMPState.is_caom_fail(common['quality']) else None
+        (data_quality, requirement_status) = quality_metadata(
+            common['quality'])
 
         # "Requirements" is an observation-level attribute, so fill it in now.
         observation.requirements = requirement_status
@@ -469,6 +874,13 @@ class raw(object):
             else:
                 observation.planes[productID].quality = data_quality
 
+        # For JCMT raw data, all artifacts have the same spatial and temporal
+        # WCS, and the same spectral WCS within each subsystem, so construct
+        # these only once.  The WCS objects are not modified after
+        # construction, so can be shared by all of the chunks.
+        spatial_wcs = self.build_spatial_wcs(common, beamsize)
+        temporal_wcs = self.build_temporal_wcs(common)
+
         # Use key for the numeric value of subsysnr here for brevity and
         # to distinguish it from the string representation that will be
         # named subsysnr in this section
@@ -496,17 +908,19 @@ class raw(object):
             # set the plane data quality
             plane.quality = data_quality
 
-            # For JCMT raw data, all artifacts have the same WCS
+            spectral_wcs = self.build_spectral_wcs(
+                common, subsystem[key], hybrid.get(productID))
+
+            if observation.intent == ObservationIntentType.SCIENCE:
+                artifact_product_type = ProductType.SCIENCE
+            else:
+                artifact_product_type = ProductType.CALIBRATION
+
             for file_info in files[obsid_subsysnr]:
                 file_name = file_info['name']
                 file_id = make_file_id_jcmt(file_name)
                 uri = make_artifact_uri(file_id, archive='JCMT')
 
-                if observation.intent == ObservationIntentType.SCIENCE:
-                    artifact_product_type = ProductType.SCIENCE
-                else:
-                    artifact_product_type = ProductType.CALIBRATION
-
                 artifact = Artifact(
                     uri, product_type=artifact_product_type,
                     release_type=ReleaseType.DATA,
@@ -529,14 +943,12 @@ class raw(object):
                 artifact.parts['0'].meta_release = common['release_date']
                 chunk.meta_release = common['release_date']
 
-                spatial_wcs = self.build_spatial_wcs(common, beamsize)
                 if spatial_wcs is not None:
                     chunk.position = spatial_wcs
 
-                chunk.energy = self.build_spectral_wcs(
-                    common, subsystem[key], hybrid.get(productID))
+                chunk.energy = spectral_wcs
 
-                chunk.time = self.build_temporal_wcs(common)
+                chunk.time = temporal_wcs
 
                 # Chunk is done, so append it to the part
                 artifact.parts['0'].chunks.append(chunk)
@@ -580,6 +992,12 @@ class raw(object):
         # Position axis bounds are in ICRS
         # Check for various pathologies due to different
         # observing strategies
+        # Use the footprint geometry computed for a batch of
+        # observations if available.
+        if self.footprint is not None:
+            return self.build_spatial_wcs_prefetched(
+                common, beamsize, *self.footprint)
+
         # position accuracy is about 0.1 arcsec (in decimal
         # degrees)
         eps = 0.1 / 3600.0
@@ -671,43 +1089,73 @@ class raw(object):
             tl3d = ThreeD(tl)
 
             try:
-                sign1 = math.copysign(
-                    1, ThreeD.included_angle(br3d, bl3d, tl3d))
-                sign2 = math.copysign(
-                    1, ThreeD.included_angle(tr3d, br3d, bl3d))
-                sign3 = math.copysign(
-                    1, ThreeD.included_angle(tl3d, tr3d, br3d))
-                sign4 = math.copysign(
-                    1, ThreeD.included_angle(bl3d, tl3d, tr3d))
+                signs = corner_turn_signs([bl3d, br3d, tr3d, tl3d])
             except ValueError as e:
                 raise CAOMError('The bounding box for obsid = ' +
                                 self.obsid + ' is degenerate')
 
-            # If the signs are not all the same, the vertices
-            # were recorded in a bowtie order.  Swap any two.
-            if (sign1 != sign2 or sign2 != sign3 or
-                    sign3 != sign4):
-                logger.warning(
-                    'For observation %s the bounds are in a'
-                    ' bowtie order',
-                    common['obsid'])
-                bl.swap(br)
+            # If the signs are not all the same, the vertices may have
+            # been recorded in a bowtie order.  Swap bl and br, or br
+            # and tr, whichever makes the signs consistent.  (If neither
+            # does, the box is concave rather than crossed.)
+            if len(signs) > 1:
+                for (first, second, order) in (
+                        (bl, br, [br3d, bl3d, tr3d, tl3d]),
+                        (br, tr, [bl3d, tr3d, br3d, tl3d])):
+                    try:
+                        if len(corner_turn_signs(order)) > 1:
+                            continue
+                    except ValueError:
+                        continue
+
+                    logger.warning(
+                        'For observation %s the bounds are in a'
+                        ' bowtie order',
+                        common['obsid'])
+                    first.swap(second)
+                    break
 
         logger.debug('final bounds bl = ' + str(bl))
         logger.debug('final bounds br = ' + str(br))
         logger.debug('final bounds tr = ' + str(tr))
         logger.debug('final bounds tl = ' + str(tl))
-        bounding_box = CoordPolygon2D()
-        bounding_box.vertices.append(ValueCoord2D(bl.x, bl.y))
-        bounding_box.vertices.append(ValueCoord2D(br.x, br.y))
-        bounding_box.vertices.append(ValueCoord2D(tr.x, tr.y))
-        bounding_box.vertices.append(ValueCoord2D(tl.x, tl.y))
 
-        spatial_axes = CoordAxis2D(Axis('RA', 'deg'),
-                                   Axis('DEC', 'deg'))
-        spatial_axes.bounds = bounding_box
+        return polygon_spatial_wcs(
+            [(bl.x, bl.y), (br.x, br.y), (tr.x, tr.y), (tl.x, tl.y)])
+
+    def build_spatial_wcs_prefetched(self, common, beamsize, kind, base, pad):
+        """
+        Construct spatial WCS from footprint geometry computed by
+        jcmt2caom2.jsa.footprint.prefetch_footprints.
+        """
+
+        if kind == FootprintType.DEGENERATE:
+            raise CAOMError('The bounding box for obsid = ' +
+                            self.obsid + ' is degenerate')
 
-        return SpatialWCS(spatial_axes, coordsys='ICRS', equinox=2000.0)
+        elif kind == FootprintType.POINT:
+            logger.info(
+                'For observation %s the bounds are a point',
+                common['obsid'])
+
+        elif kind == FootprintType.LINE_Y:
+            logger.info(
+                'For observation %s the bounds are in a line in Y',
+                common['obsid'])
+
+        elif kind == FootprintType.LINE_X:
+            logger.info(
+                'For observation %s the bounds are in a line in X',
+                common['obsid'])
+
+        elif kind == FootprintType.BOWTIE:
+            logger.warning(
+                'For observation %s the bounds are in a'
+                ' bowtie order',
+                common['obsid'])
+
+        return polygon_spatial_wcs(
+            (float(x), float(y)) for (x, y) in base + beamsize * pad)
 
     def build_spectral_wcs(self, common, subsystem, hybrid):
         """
@@ -796,19 +1244,45 @@ class raw(object):
         <none>
         """
 
+        job = self.prepare_ingestion()
+        if job is None:
+            return
+
+        self.write_observation(self.repository, job)
+
+        self.finish_ingestion(job)
+
+    def prepare_ingestion(self):
+        """
+        Perform the database queries and checks required to ingest
+        the current observation.
+
+        Returns an IngestJob tuple describing the observation to be
+        written to the repository, or None if there is nothing further
+        to do (because it is unchanged or has been exported).
+        """
+
+        # Use prefetched database rows for this observation if available.
+        info = self.prefetched.pop(self.obsid, None)
+        self.footprint = self.prefetched_footprints.pop(self.obsid, None)
+
         # Check that this is a valid observation and
         # get the dictionary of common metadata
-        common = self.conn.query_table('COMMON', self.obsid)
-        if len(common):
-            common = common[0]
+        if info is not None:
+            common = info.common
         else:
-            raise CAOMError('There is no observation with '
-                            'obsid = %s' % (self.obsid,))
+            common = self.conn.query_table('COMMON', self.obsid)
+            if len(common):
+                common = common[0]
+            else:
+                raise CAOMError('There is no observation with '
+                                'obsid = %s' % (self.obsid,))
 
         # There are some instruments we wish to reject immediately.
         instrument = common['instrume'].upper()
         if instrument not in self.ALLOWED_INSTRUMENTS:
-            raise CAOMError('Forbidden instrument: %s', instrument)
+            raise ObservationRejected(
+                'Forbidden instrument: {0}'.format(instrument))
 
         # Append the proposal metadata
         proposal = self.get_proposal(common['project'])
@@ -822,74 +1296,542 @@ class raw(object):
 
         # get a list of rows for the subsystems in this observation
         backend = common['backend']
-        if backend in ['ACSIS', 'DAS', 'AOSC']:
+        if info is not None:
+            subsystemlist = info.subsystem
+        elif backend in ['ACSIS', 'DAS', 'AOSC']:
             subsystemlist = self.conn.query_table('ACSIS', self.obsid)
-            # Convert the list of rows into a dictionary
-            subsystem = {}
-            for row in subsystemlist:
-                subsysnr = row.pop('subsysnr')
-                subsystem[subsysnr] = row
-
         elif backend == 'SCUBA-2':
             subsystemlist = self.conn.query_table('SCUBA2', self.obsid)
-            # Convert the list of rows into a dictionary
-            subsystem = {}
-            for row in subsystemlist:
-                subsysnr = int(row['filter'])
-                subsystem[subsysnr] = row
-
         else:
-            logger.warning(
-                'backend = "%s" is not one of '
-                '["ACSIS", "DAS", "AOSC", "SCUBA", "SCUBA-2"]',
-                backend)
+            subsystemlist = []
+
+        subsystem = subsystem_dict(backend, subsystemlist)
 
-        # somewhat repetitive, but custom SQL is useful
         # get dictionary of productID's for each subsystem
         self.productID_dict = raw_product_id(backend,
                                              self.obsid,
-                                             self.conn)
+                                             subsystem)
         logger.debug('query complete')
 
         ingestibility = self.check_observation(common, subsystem)
         if ingestibility == INGESTIBILITY.BAD:
             logger.error('SERIOUS ERRORS were found in %s', self.obsid)
-            raise CAOMError('Serious errors found')
-
-        repository = Repository()
+            raise ObservationRejected('Serious errors found')
 
         uri = 'caom:' + self.collection + '/' + common['obsid']
         # get the list of files for this observation
-        files = self.conn.get_files(self.obsid, with_info=True)
+        if info is not None:
+            files = info.files
+        else:
+            files = self.conn.get_files(self.obsid, with_info=True)
         if files is None:
-            raise CAOMError('No rows in FILES for obsid = ' + self.obsid)
+            raise ObservationRejected(
+                'No rows in FILES for obsid = ' + self.obsid)
+
+        # Skip the observation if the metadata have not changed since it was
+        # last ingested.
+        fingerprint = None
+        if self.state is not None:
+            fingerprint = make_fingerprint(
+                jcmt2caom2version, self.collection,
+                common, subsystem, files)
+
+            if ((not self.force) and
+                    self.state.get_fingerprint(self.obsid) == fingerprint):
+                logger.info('SKIPPING: Observation %s is unchanged',
+                            self.obsid)
+                return None
+
+        if self.export is not None:
+            self.export.add(self.obsid, self.build_observation(
+                None, common, subsystem, files))
+
+            logger.info('SUCCESS: Observation %s has been exported',
+                        self.obsid)
+            return None
+
+        return IngestJob(
+            self.obsid, uri, common, subsystem, files, fingerprint)
+
+    def write_observation(self, repository, job):
+        """
+        Build the observation described by an IngestJob, merging it
+        with any existing version, and store it in the given repository.
 
-        with repository.process(uri, dry_run=self.dry_run) as wrapper:
+        This method uses only the attributes of this object set up
+        by prepare_ingestion for the same observation (and no database
+        connections), so it may be called on a copy of this object in
+        another thread.
+        """
+
+        with repository.process(job.uri, dry_run=self.dry_run) as wrapper:
             wrapper.observation = self.build_observation(
-                wrapper.observation, common, subsystem, files)
+                wrapper.observation, job.common, job.subsystem, job.files)
 
             if self.xmloutdir:
                 with open(os.path.join(self.xmloutdir, re.sub(
-                        '[^-_A-Za-z0-9]', '_', self.obsid)) + '.xml',
+                        '[^-_A-Za-z0-9]', '_', job.obsid)) + '.xml',
                         'wb') as f:
                     repository.writer.write(wrapper.observation, f)
 
+    def finish_ingestion(self, job):
+        """
+        Record the successful ingestion of the observation described
+        by an IngestJob.
+        """
+
+        if (job.fingerprint is not None) and not self.dry_run:
+            self.state.set_fingerprint(job.obsid, job.fingerprint)
+
         logger.info('SUCCESS: Observation %s has been ingested',
-                    self.obsid)
+                    job.obsid)
+
+    def update_quality(self, changes):
+        """
+        Update only the quality information of existing observations.
+
+        This sets the observation "requirements" and the data quality
+        of every plane, raw or otherwise, as build_observation would,
+        without rebuilding the rest of the observation.
+
+        :param changes: list of (obsid, status) tuples, where status
+            is the latest ompobslog status or None
+
+        Returns a list of the obsids which could not be updated.
+        """
+
+        failed = []
+
+        for (obsid, status) in changes:
+            uri = 'caom:' + self.collection + '/' + obsid
+
+            try:
+                quality = self.status_to_quality(status)
+                (data_quality, requirement_status) = quality_metadata(quality)
+
+                with self.repository.process(
+                        uri, dry_run=self.dry_run) as wrapper:
+                    observation = wrapper.observation
+
+                    if observation is None:
+                        logger.warning('Observation %s does not exist', obsid)
+                        continue
+
+                    observation.requirements = requirement_status
+
+                    for plane in observation.planes.values():
+                        plane.quality = data_quality
+
+                logger.info('SUCCESS: Observation %s quality set to %s',
+                            obsid, OMPState.get_name(quality))
+
+            except Exception:
+                logger.exception('Error updating quality of %s', obsid)
+                failed.append(obsid)
+
+        return failed
+
+    def ingest_obsids(self, obsids):
+        """
+        Ingest each of the given observations in turn, re-using the
+        existing database, TAP and repository connections.
+
+        Errors are logged and do not prevent ingestion of the remaining
+        observations.
+
+        Returns a list of the obsids which could not be ingested.
+        """
+
+        if self.writers:
+            return self.ingest_obsids_pipelined(obsids)
+
+        failed = []
+
+        for i in range(0, len(obsids), self.prefetch_size):
+            batch = obsids[i:i + self.prefetch_size]
+
+            self.prefetch(batch)
+
+            for obsid in batch:
+                self.obsid = obsid
+
+                try:
+                    self.ingest()
+
+                except ObservationRejected as e:
+                    self.reject(obsid, e)
+                    failed.append(obsid)
+
+                except Exception:
+                    logger.exception('Error during ingestion of %s', obsid)
+                    failed.append(obsid)
+
+        return failed
+
+    def reject(self, obsid, error):
+        """
+        Log the rejection of an observation and record it in the state
+        file, if there is one.
+        """
+
+        logger.error('Observation %s rejected: %s', obsid, error)
+
+        if (self.state is not None) and not self.dry_run:
+            self.state.set_rejected(obsid, str(error))
+
+    def ingest_obsids_pipelined(self, obsids):
+        """
+        Ingest each of the given observations, writing them to the
+        repository using a pool of background threads.
+
+        The database queries for each observation are performed in this
+        thread while the observations prepared previously are being
+        retrieved from, merged and stored in the repository.  At most
+        `write_depth` observations are queued or in progress at once.
+        Each thread uses its own Repository object.
+
+        Returns a list of the obsids which could not be ingested.
+        """
+
+        depth = self.write_depth
+        if depth is None:
+            depth = 2 * self.writers
+
+        logger.debug('Writing observations with %i threads, depth %i',
+                     self.writers, depth)
+
+        failed = set()
+        pending = deque()
+        local = threading.local()
+
+        def write(builder, job):
+            repository = getattr(local, 'repository', None)
+            if repository is None:
+                repository = local.repository = Repository()
+
+            builder.write_observation(repository, job)
+
+        def collect():
+            (job, future) = pending.popleft()
+
+            try:
+                future.result()
+
+            except Exception:
+                logger.exception('Error during ingestion of %s', job.obsid)
+                failed.add(job.obsid)
+
+            else:
+                self.finish_ingestion(job)
+
+        with ThreadPoolExecutor(self.writers) as executor:
+            for i in range(0, len(obsids), self.prefetch_size):
+                batch = obsids[i:i + self.prefetch_size]
+
+                self.prefetch(batch)
+
+                for obsid in batch:
+                    self.obsid = obsid
+
+                    try:
+                        job = self.prepare_ingestion()
+
+                    except ObservationRejected as e:
+                        self.reject(obsid, e)
+                        failed.add(obsid)
+                        continue
+
+                    except Exception:
+                        logger.exception('Error during ingestion of %s',
+                                         obsid)
+                        failed.add(obsid)
+                        continue
+
+                    if job is None:
+                        continue
+
+                    while len(pending) >= depth:
+                        collect()
+
+                    # Give the writer a copy of this object so that
+                    # it retains the attributes set up for this
+                    # observation while the next is prepared.
+                    pending.append((job, executor.submit(
+                        write, copy.copy(self), job)))
+
+            while pending:
+                collect()
+
+        return [x for x in obsids if x in failed]
+
+    def ingest_obsids_parallel(self, obsids, jobs, proxy, ams=True):
+        """
+        Ingest the given observations using a pool of worker processes.
+
+        Each worker process opens its own database, TAP and repository
+        connections.  The observations are distributed to the workers in
+        batches, each of which is ingested by the ingest_obsids method.
+
+        Returns a list of the obsids which could not be ingested.
+        """
+
+        if not obsids:
+            return []
+
+        batch_size = min(
+            self.prefetch_size, int(math.ceil(len(obsids) / float(jobs))))
+
+        batches = [
+            obsids[i:i + batch_size]
+            for i in range(0, len(obsids), batch_size)]
+
+        logger.debug('Ingesting %i batches with %i processes',
+                     len(batches), jobs)
+
+        failed = set()
+
+        pool = multiprocessing.Pool(
+            jobs, initializer=_initialize_worker,
+            initargs=(self.collection, self.dry_run, self.xmloutdir,
+                      proxy, ams, self.state_file, self.force,
+                      self.writers, self.write_depth))
+
+        try:
+            for batch_failed in pool.imap_unordered(
+                    _ingest_worker_batch, batches):
+                failed.update(batch_failed)
+
+            pool.close()
+
+        except:
+            pool.terminate()
+            raise
+
+        finally:
+            pool.join()
+
+        return [x for x in obsids if x in failed]
+
+    def process_obsids(self, obsids, jobs, proxy, ams=True):
+        """
+        Ingest the given observations, using worker processes
+        if more than one job is requested.
+
+        Returns a list of the obsids which could not be ingested.
+        """
+
+        if jobs > 1:
+            # Each worker process makes its own connections, so close
+            # ours before the workers are started.
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+            return self.ingest_obsids_parallel(obsids, jobs, proxy, ams)
+
+        if self.tap is None:
+            self.connect(proxy, ams, with_repository=(self.export is None))
+
+        return self.ingest_obsids(obsids)
+
+    def ingest_from_queue(self, queue, poll_interval=None):
+        """
+        Lease observations from the given WorkQueue and ingest them,
+        acknowledging each observation ingested or recording its failure
+        so that it can be retried.
+
+        If no poll interval is given, returns when there are no
+        observations available in the queue.  (There may still be
+        observations waiting to be retried.)
+
+        Returns a tuple of the number of observations leased and the list
+        of those which could not be ingested.
+        """
+
+        worker = '{0}:{1}'.format(socket.gethostname(), os.getpid())
+
+        n_leased = 0
+        failed = []
+
+        while True:
+            obsids = queue.lease(worker, limit=self.queue_batch_size)
+
+            if not obsids:
+                if poll_interval is None:
+                    break
+
+                time.sleep(poll_interval)
+                continue
+
+            n_leased += len(obsids)
+
+            self.prefetch(obsids)
+
+            for obsid in obsids:
+                # Renew the lease before starting each observation, since
+                # ingesting the preceding observations of the batch may
+                # have taken a significant fraction of the lease time.
+                # If the lease has already expired, the observation may
+                # have been given to another worker, so skip it.
+                if not queue.renew(obsid, worker):
+                    continue
+
+                self.obsid = obsid
+
+                try:
+                    self.ingest()
+
+                except Exception as e:
+                    logger.exception('Error during ingestion of %s', obsid)
+                    failed.append(obsid)
+                    queue.fail(obsid, worker, str(e))
+
+                else:
+                    queue.ack(obsid, worker)
+
+        return (n_leased, failed)
+
+    def ingest_since_watermark(self, jobs, proxy, ams=True, start=None):
+        """
+        Ingest observations which have been modified since the watermark
+        stored in the state file, and then advance the watermark.
+
+        If there are failures, the watermark is only advanced to just
+        before the earliest modification time of a failed observation,
+        so that it will be included in the next pass.  Observations which
+        were rejected (see ObservationRejected) do not hold back the
+        watermark: they will be selected again if they are modified.
+
+        :param start: time from which to begin if no watermark is stored
+
+        Returns a tuple of the list of obsids found and the list of those
+        which could not be ingested.
+        """
+
+        name = 'raw-' + self.collection
+
+        watermark = self.state.get_watermark(name)
+        if watermark is None:
+            if start is None:
+                raise CAOMError(
+                    'No watermark has been stored for ' + name)
+            watermark = start
+
+        if self.conn is None:
+            self.conn = ArcDB()
+
+        modified = find_obsids_modified_since(self.conn, watermark)
+        obsids = [obsid for (obsid, modification) in modified]
+
+        logger.info('Found %i observations modified since %s',
+                    len(obsids), watermark)
+
+        self.state.clear_rejected(obsids)
+
+        failed = self.process_obsids(obsids, jobs, proxy, ams)
+
+        rejected = self.state.get_rejected(failed)
+        if rejected:
+            logger.warning('Skipping %i rejected observations: %s',
+                           len(rejected), ', '.join(sorted(rejected)))
+
+        new_watermark = advance_watermark(
+            watermark, modified, [x for x in failed if x not in rejected])
+
+        if (new_watermark > watermark) and not self.dry_run:
+            logger.info('Advancing watermark to %s', new_watermark)
+            self.state.set_watermark(name, new_watermark)
+
+        return (obsids, failed)
+
+    def connect(self, proxy, ams=True, with_repository=True):
+        """
+        Open connections to the database, TAP service and
+        (optionally) CAOM-2 repository.
+        """
+
+        self.tap = CAOM2TAP(proxy=proxy, ams=ams)
+
+        if self.conn is None:
+            self.conn = ArcDB()
+
+        if with_repository:
+            self.repository = Repository()
+
+    def prefetch(self, obsids):
+        """
+        Fetch the database rows and OMP status values required to ingest
+        the given observations.
+
+        If this fails, the information will instead be queried separately
+        for each observation as it is ingested.
+        """
+
+        try:
+            self.prefetched = prefetch_raw_info(self.conn, obsids)
+            self.prefetched_status = prefetch_obsid_status(self.conn, obsids)
+
+        except Exception:
+            logger.exception('Error prefetching database rows')
+            self.prefetched = {}
+            self.prefetched_status = {}
+
+        self.prefetched_footprints = prefetch_footprints(
+            x.common for x in self.prefetched.values())
 
     def run(self):
         """
-        Fetch metadata, build a CAOM-2 object, and push it into the repository.
+        Fetch metadata, build CAOM-2 objects, and push them into the
+        repository.
 
         Returns True on success, False otherwise.
         """
 
         ap = argparse.ArgumentParser()
 
-        ap.add_argument(
+        obsid_group = ap.add_mutually_exclusive_group(required=True)
+        obsid_group.add_argument(
             '--obsid',
-            required=True,
             help='obsid, primary key in COMMON table')
+        obsid_group.add_argument(
+            '--obsid-file',
+            help='file listing obsids to ingest, one per line')
+        obsid_group.add_argument(
+            '--utdate',
+            help='ingest all observations from this UT date (YYYYMMDD)')
+        obsid_group.add_argument(
+            '--date-start',
+            help='ingest all observations from this UT date (YYYYMMDD)'
+                 ' onwards')
+        obsid_group.add_argument(
+            '--quality-since',
+            help='only update the quality of observations with OMP comments'
+                 ' made since this UT date (YYYYMMDD)')
+        obsid_group.add_argument(
+            '--since-watermark',
+            action='store_true',
+            help='ingest observations modified since the watermark'
+                 ' recorded in the state file, and advance it')
+        obsid_group.add_argument(
+            '--queue-worker',
+            action='store_true',
+            help='ingest observations leased from the work queue')
+
+        ap.add_argument(
+            '--date-end',
+            help='last UT date (YYYYMMDD) to ingest with --date-start')
+        ap.add_argument(
+            '--quality-until',
+            help='last UT date (YYYYMMDD) of comments for --quality-since')
+        ap.add_argument(
+            '--watermark-start',
+            help='UT date (YYYYMMDD) from which to start --since-watermark'
+                 ' if no watermark has yet been recorded')
+        ap.add_argument(
+            '--poll-interval',
+            type=float,
+            help='with --since-watermark or --queue-worker, continue'
+                 ' checking for observations at this interval (seconds)')
 
         ap.add_argument(
             '--collection',
@@ -912,6 +1854,73 @@ class raw(object):
             '--xmloutdir',
             help='directory into which to write XML files')
 
+        ap.add_argument(
+            '--validate-only',
+            action='store_true',
+            help='check the metadata for the observations without'
+                 ' ingesting them')
+        ap.add_argument(
+            '--report',
+            default='-',
+            help='file in which to write the JSON report of problems'
+                 ' found with --validate-only (default: standard output)')
+
+        ap.add_argument(
+            '--export',
+            help='write XML for the observations into this archive file'
+                 ' (.tar.gz, .tar.bz2, .tar.xz or .zip) instead of'
+                 ' ingesting them')
+        ap.add_argument(
+            '--export-shard-size',
+            type=int,
+            help='number of observations per archive file with --export')
+
+        ap.add_argument(
+            '--state-file',
+            help='SQLite file in which to record ingested observations,'
+                 ' so that unchanged observations can be skipped')
+        ap.add_argument(
+            '--force',
+            action='store_true',
+            help='ingest observations even if unchanged according to'
+                 ' the state file')
+
+        ap.add_argument(
+            '--queue',
+            help='SQLite work queue file: add the selected observations'
+                 ' to it, or with --queue-worker, ingest observations'
+                 ' from it')
+        ap.add_argument(
+            '--lease-time',
+            type=float,
+            default=3600.0,
+            help='time (seconds) for which a --queue-worker holds'
+                 ' observations before they can be given to another worker')
+        ap.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='number of times to try to ingest an observation'
+                 ' from the work queue')
+
+        ap.add_argument(
+            '--jobs', '-j',
+            type=int,
+            default=1,
+            help='number of worker processes to use for ingestion')
+        ap.add_argument(
+            '--writers',
+            type=int,
+            default=0,
+            help='number of background threads (per process) with which'
+                 ' to write observations to the repository while the next'
+                 ' are being prepared')
+        ap.add_argument(
+            '--write-depth',
+            type=int,
+            help='maximum number of observations waiting to be written'
+                 ' with --writers (default: twice the number of writers)')
+
         ap.add_argument(
             '--proxy',
             default='~/.ssl/cadcproxy.pem',
@@ -923,11 +1932,78 @@ class raw(object):
 
         args = ap.parse_args()
 
+        for date in (args.utdate, args.date_start, args.date_end,
+                     args.quality_since, args.quality_until,
+                     args.watermark_start):
+            if not ((date is None) or pattern_date.search(date)):
+                ap.error('dates must be given as YYYYMMDD')
+
+        if (args.date_end is not None) and (args.date_start is None):
+            ap.error('--date-end can only be used with --date-start')
+
+        if (args.quality_until is not None) and (args.quality_since is None):
+            ap.error('--quality-until can only be used with --quality-since')
+
+        if args.since_watermark and args.state_file is None:
+            ap.error('--since-watermark requires --state-file')
+
+        if (args.poll_interval is not None) and not (
+                args.since_watermark or args.queue_worker):
+            ap.error('--poll-interval can only be used with --since-watermark'
+                     ' or --queue-worker')
+
+        if args.queue is not None:
+            if (args.since_watermark or (args.quality_since is not None)
+                    or args.validate_only or (args.export is not None)):
+                ap.error('--queue can not be used with --since-watermark,'
+                         ' --quality-since, --validate-only or --export')
+            if args.queue_worker and args.jobs > 1:
+                ap.error('--queue-worker can not be used with --jobs:'
+                         ' start several workers instead')
+
+        elif args.queue_worker:
+            ap.error('--queue-worker requires --queue')
+
+        if args.validate_only:
+            if ((args.export is not None) or (args.state_file is not None)
+                    or args.since_watermark
+                    or (args.quality_since is not None)):
+                ap.error('--validate-only can not be used with --export,'
+                         ' --state-file or --quality-since')
+
+        if args.export is not None:
+            if args.jobs > 1:
+                ap.error('--export can not be used with --jobs')
+            if (args.state_file is not None) or args.since_watermark:
+                ap.error('--export can not be used with --state-file')
+            if args.quality_since is not None:
+                ap.error('--export can not be used with --quality-since')
+
+        elif args.export_shard_size is not None:
+            ap.error('--export-shard-size can only be used with --export')
+
+        if args.jobs < 1:
+            ap.error('--jobs must be at least 1')
+
+        if args.writers < 0:
+            ap.error('--writers can not be negative')
+
+        if args.writers:
+            if ((args.export is not None) or args.validate_only
+                    or args.queue_worker
+                    or (args.quality_since is not None)):
+                ap.error('--writers can not be used with --export,'
+                         ' --validate-only, --queue-worker'
+                         ' or --quality-since')
+            if (args.write_depth is not None) and args.write_depth < 1:
+                ap.error('--write-depth must be at least 1')
+
+        elif args.write_depth is not None:
+            ap.error('--write-depth can only be used with --writers')
+
         if args.collection:
             self.collection = args.collection
 
-        self.obsid = args.obsid
-
         if args.loglevel:
             logging.getLogger().setLevel(args.loglevel)
 
@@ -935,10 +2011,15 @@ class raw(object):
 
         self.xmloutdir = args.xmloutdir
 
+        self.state_file = args.state_file
+        self.force = args.force
+
+        self.writers = args.writers
+        self.write_depth = args.write_depth
+
         logger.info(sys.argv[0])
         logger.info('jcmt2caom2version    = %s', jcmt2caom2version)
         logger.info('tools4caom2version   = %s', tools4caom2version)
-        logger.info('obsid                = %s', self.obsid)
         logger.info('dry run              = %s', self.dry_run)
 
         proxy = os.path.abspath(
@@ -946,16 +2027,135 @@ class raw(object):
                 os.path.expanduser(args.proxy)))
 
         try:
-            if not os.path.exists(proxy):
+            if not (args.validate_only or os.path.exists(proxy)):
                 raise CAOMError('proxy does not exist: ' + proxy)
 
-            self.tap = CAOM2TAP(proxy=proxy, ams=(not args.argus))
+            if self.state_file is not None:
+                self.state = IngestState(self.state_file)
+
+            if args.export is not None:
+                self.export = ObservationArchive(
+                    args.export, shard_size=args.export_shard_size)
 
             self.conn = ArcDB()
 
-            self.ingest()
+            if args.queue_worker:
+                queue = WorkQueue(
+                    args.queue, lease_time=args.lease_time,
+                    max_attempts=args.max_attempts)
+
+                try:
+                    self.connect(proxy, ams=(not args.argus))
+
+                    (n_leased, failed) = self.ingest_from_queue(
+                        queue, poll_interval=args.poll_interval)
+
+                finally:
+                    queue.close()
+
+                logger.info('DONE: %i of %i observations ingested',
+                            n_leased - len(failed), n_leased)
+
+            elif args.quality_since is not None:
+                quality_until = None
+                if args.quality_until is not None:
+                    quality_until = datetime.strptime(
+                        args.quality_until, '%Y%m%d') + timedelta(days=1)
+
+                obsids = find_obsids_commented(
+                    self.conn,
+                    datetime.strptime(args.quality_since, '%Y%m%d'),
+                    quality_until)
+
+                logger.info('number of obsids     = %i', len(obsids))
+
+                status = {}
+                for i in range(0, len(obsids), self.prefetch_size):
+                    status.update(prefetch_obsid_status(
+                        self.conn, obsids[i:i + self.prefetch_size]))
+
+                self.connect(proxy, ams=(not args.argus))
+
+                failed = self.update_quality(
+                    [(obsid, status[obsid]) for obsid in obsids])
 
-            logger.info('DONE')
+                logger.info('DONE: %i of %i observations updated',
+                            len(obsids) - len(failed), len(obsids))
+
+            elif args.since_watermark:
+                watermark_start = None
+                if args.watermark_start is not None:
+                    watermark_start = datetime.strptime(
+                        args.watermark_start, '%Y%m%d')
+
+                while True:
+                    (obsids, failed) = self.ingest_since_watermark(
+                        args.jobs, proxy, ams=(not args.argus),
+                        start=watermark_start)
+
+                    logger.info('DONE: %i of %i observations ingested',
+                                len(obsids) - len(failed), len(obsids))
+
+                    if args.poll_interval is None:
+                        break
+
+                    if failed:
+                        logger.error('Failed to ingest: %s',
+                                     ', '.join(failed))
+
+                    time.sleep(args.poll_interval)
+
+            else:
+                if args.obsid is not None:
+                    obsids = [args.obsid]
+                elif args.obsid_file is not None:
+                    obsids = read_obsid_file(args.obsid_file)
+                elif args.utdate is not None:
+                    obsids = find_obsids(
+                        self.conn, args.utdate, args.utdate)
+                else:
+                    obsids = find_obsids(
+                        self.conn, args.date_start, args.date_end)
+
+                logger.info('number of obsids     = %i', len(obsids))
+
+                if args.queue is not None:
+                    queue = WorkQueue(args.queue)
+
+                    try:
+                        n_added = queue.enqueue(obsids)
+
+                    finally:
+                        queue.close()
+
+                    logger.info('DONE: %i of %i observations added to queue',
+                                n_added, len(obsids))
+
+                    return True
+
+                if args.validate_only:
+                    invalid = self.validate_obsids(obsids, args.jobs)
+
+                    write_report(args.report, {
+                        'checked': len(obsids),
+                        'invalid': len(invalid),
+                        'observations': invalid,
+                    })
+
+                    logger.info('DONE: %i of %i observations are invalid',
+                                len(invalid), len(obsids))
+
+                    return not invalid
+
+                failed = self.process_obsids(
+                    obsids, args.jobs, proxy, ams=(not args.argus))
+
+                logger.info('DONE: %i of %i observations ingested',
+                            len(obsids) - len(failed), len(obsids))
+
+            if failed:
+                logger.error('Failed to ingest: %s', ', '.join(failed))
+                return False
 
         except:
             logger.exception('Error during ingestion')
@@ -965,4 +2165,10 @@ class raw(object):
             if self.conn is not None:
                 self.conn.close()
 
+            if self.state is not None:
+                self.state.close()
+
+            if self.export is not None:
+                self.export.close()
+
         return True
@@ -0,0 +1,292 @@
+# Copyright (C) 2026 East Asian Observatory
+# All Rights Reserved.
+#
+# This program is free software; you can redistribute it and/or modify it under
+# the terms of the GNU General Public License as published by the Free Software
+# Foundation; either version 2 of the License, or (at your option) any later
+# version.
+#
+# This program is distributed in the hope that it will be useful,but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc.,51 Franklin
+# Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""
+Durable queue of observations to be ingested, stored in an SQLite file.
+
+Any number of worker processes may lease items from the queue.  A leased
+item is not given to another worker until its lease expires, so that an
+observation is not ingested by two workers at once.  Items which fail are
+returned to the queue to be retried after an exponentially increasing
+delay, until the maximum number of attempts is reached.
+
+Note that when the queue is shared between machines, the file must be on
+a filesystem with working POSIX locking.
+"""
+
+import logging
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QueueState(object):
+    """
+    Defines queue item states.
+    """
+    PENDING = 'pending'
+    LEASED = 'leased'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class WorkQueue(object):
+    """
+    Class for access to a work queue file.
+
+    Times are given as Unix timestamps.  Methods accept an optional `now`
+    argument to override the current time.
+    """
+
+    def __init__(self, filename, lease_time=3600.0, max_attempts=5,
+                 backoff=60.0):
+        """
+        Open the given queue file, creating it if it does not exist.
+
+        :param lease_time: duration of leases (seconds)
+        :param max_attempts: number of attempts before an item is
+            marked as failed
+        :param backoff: delay before the first retry (seconds), which
+            doubles for each subsequent attempt
+        """
+
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+        # Use autocommit mode so that transactions can be started
+        # explicitly with BEGIN IMMEDIATE.
+        self.db = sqlite3.connect(
+            filename, timeout=60, isolation_level=None)
+
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS queue ('
+            'obsid TEXT PRIMARY KEY, '
+            'state TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'available REAL NOT NULL, '
+            'worker TEXT, '
+            'expires REAL, '
+            'error TEXT)')
+
+        self.db.execute(
+            'CREATE INDEX IF NOT EXISTS queue_state '
+            'ON queue (state, available)')
+
+    def close(self):
+        self.db.close()
+
+    def enqueue(self, obsids, now=None):
+        """
+        Add observations to the queue.
+
+        Observations already in the queue are reset to be pending
+        unless they are currently leased.
+
+        Returns the number of observations added or reset.
+        """
+
+        if now is None:
+            now = time.time()
+
+        n = 0
+
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            for obsid in obsids:
+                n += self.db.execute(
+                    'INSERT OR IGNORE INTO queue (obsid, state, available) '
+                    'VALUES (?, ?, ?)',
+                    (obsid, QueueState.PENDING, now)).rowcount
+
+                n += self.db.execute(
+                    'UPDATE queue SET state=?, attempts=0, available=?, '
+                    'worker=NULL, expires=NULL, error=NULL '
+                    'WHERE obsid=? AND state IN (?, ?)',
+                    (QueueState.PENDING, now, obsid,
+                     QueueState.DONE, QueueState.FAILED)).rowcount
+
+            self.db.execute('COMMIT')
+
+        except:
+            self.db.execute('ROLLBACK')
+            raise
+
+        return n
+
+    def lease(self, worker, limit=1, now=None):
+        """
+        Lease up to `limit` available observations for the given worker.
+
+        Items whose leases have expired are first returned to the queue
+        (or marked as failed if they have no attempts remaining).
+
+        Returns a list of obsids, which is empty if no items are available.
+        """
+
+        if now is None:
+            now = time.time()
+
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            self.db.execute(
+                'UPDATE queue SET state=?, worker=NULL, expires=NULL, '
+                'error=? '
+                'WHERE state=? AND expires <= ? AND attempts >= ?',
+                (QueueState.FAILED, 'lease expired', QueueState.LEASED,
+                 now, self.max_attempts))
+
+            self.db.execute(
+                'UPDATE queue SET state=?, available=?, worker=NULL, '
+                'expires=NULL, error=? '
+                'WHERE state=? AND expires <= ?',
+                (QueueState.PENDING, now, 'lease expired',
+                 QueueState.LEASED, now))
+
+            obsids = [row[0] for row in self.db.execute(
+                'SELECT obsid FROM queue '
+                'WHERE state=? AND available <= ? '
+                'ORDER BY available, obsid LIMIT ?',
+                (QueueState.PENDING, now, limit))]
+
+            for obsid in obsids:
+                self.db.execute(
+                    'UPDATE queue SET state=?, attempts=attempts+1, '
+                    'worker=?, expires=? '
+                    'WHERE obsid=?',
+                    (QueueState.LEASED, worker, now + self.lease_time,
+                     obsid))
+
+            self.db.execute('COMMIT')
+
+        except:
+            self.db.execute('ROLLBACK')
+            raise
+
+        return obsids
+
+    def renew(self, obsid, worker, now=None):
+        """
+        Extend the lease of an observation held by the given worker,
+        so that it expires `lease_time` from now.
+
+        Returns False (and logs a warning) if the worker no longer
+        held the lease, in which case it may have been given to
+        another worker.
+        """
+
+        if now is None:
+            now = time.time()
+
+        with_lease = self.db.execute(
+            'UPDATE queue SET expires=? '
+            'WHERE obsid=? AND state=? AND worker=? AND expires > ?',
+            (now + self.lease_time, obsid, QueueState.LEASED, worker,
+             now)).rowcount
+
+        if not with_lease:
+            logger.warning('Worker %s no longer holds the lease for %s',
+                           worker, obsid)
+
+        return bool(with_lease)
+
+    def ack(self, obsid, worker):
+        """
+        Mark a leased observation as done.
+
+        Returns False (and logs a warning) if the worker no longer
+        held the lease.
+        """
+
+        with_lease = self.db.execute(
+            'UPDATE queue SET state=?, worker=NULL, expires=NULL, '
+            'error=NULL '
+            'WHERE obsid=? AND state=? AND worker=?',
+            (QueueState.DONE, obsid, QueueState.LEASED, worker)).rowcount
+
+        if not with_lease:
+            logger.warning('Worker %s no longer holds the lease for %s',
+                           worker, obsid)
+
+        return bool(with_lease)
+
+    def fail(self, obsid, worker, error, now=None):
+        """
+        Record the failure of a leased observation.
+
+        The observation is returned to the queue to be retried after a
+        delay, or marked as failed if it has no attempts remaining.
+
+        Returns False (and logs a warning) if the worker no longer
+        held the lease.
+        """
+
+        if now is None:
+            now = time.time()
+
+        self.db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self.db.execute(
+                'SELECT attempts FROM queue '
+                'WHERE obsid=? AND state=? AND worker=?',
+                (obsid, QueueState.LEASED, worker)).fetchone()
+
+            if row is not None:
+                attempts = row[0]
+
+                if attempts >= self.max_attempts:
+                    state = QueueState.FAILED
+                    available = now
+                else:
+                    state = QueueState.PENDING
+                    available = now + self.backoff * 2 ** (attempts - 1)
+
+                self.db.execute(
+                    'UPDATE queue SET state=?, available=?, worker=NULL, '
+                    'expires=NULL, error=? '
+                    'WHERE obsid=?',
+                    (state, available, error, obsid))
+
+            self.db.execute('COMMIT')
+
+        except:
+            self.db.execute('ROLLBACK')
+            raise
+
+        if row is None:
+            logger.warning('Worker %s no longer holds the lease for %s',
+                           worker, obsid)
+
+        return row is not None
+
+    def counts(self):
+        """
+        Get the number of queue items in each state, as a dictionary.
+        """
+
+        return dict(self.db.execute(
+            'SELECT state, COUNT(*) FROM queue GROUP BY state'))
+
+    def get_failed(self):
+        """
+        Get a list of (obsid, error) tuples for failed items.
+        """
+
+        return list(self.db.execute(
+            'SELECT obsid, error FROM queue WHERE state=? ORDER BY obsid',
+            (QueueState.FAILED,)))
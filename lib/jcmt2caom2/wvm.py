@@ -25,7 +25,7 @@ from tools4caom2.tapclient import tapclient_luskan
 from tools4caom2.artifact_uri import extract_artifact_uri_filename, \
     make_artifact_uri
 
-from jcmt2caom2.md5sum import get_md5sum
+from jcmt2caom2.md5sum import get_md5sum, get_md5sums
 
 WVMFileInfo = namedtuple('WVMFileInfo', ('path', 'name', 'size', 'md5sum'))
 
@@ -38,9 +38,21 @@ logger = logging.getLogger(__name__)
 
 def find_wvm_files(
         base_wvm_dir, date_start, date_end,
-        with_size=False, with_md5sum=False):
+        with_size=False, with_md5sum=False, checksum_cache=None,
+        workers=1):
+    """
+    Find WVM files on disk, optionally with their sizes and MD5 sums.
+
+    MD5 sums are computed using the given number of worker threads.
+    If a ChecksumCache is given, they are obtained via the cache.
+    """
+
     result = []
 
+    md5sum_function = get_md5sum
+    if checksum_cache is not None:
+        md5sum_function = checksum_cache.get_md5sum
+
     logger.debug('Finding WVM files on disk')
 
     for dir_ in sorted(os.listdir(base_wvm_dir)):
@@ -64,7 +76,18 @@ def find_wvm_files(
             result.append(WVMFileInfo(
                 path, file_,
                 (os.stat(filepath).st_size if with_size else None),
-                (get_md5sum(filepath) if with_md5sum else None)))
+                None))
+
+    if with_md5sum:
+        logger.debug('Computing MD5 sums of %i WVM files', len(result))
+
+        md5sums = get_md5sums(
+            (os.path.join(x.path, x.name) for x in result),
+            workers=workers, md5sum_function=md5sum_function)
+
+        result = [
+            info._replace(md5sum=md5sum)
+            for (info, (_, md5sum)) in zip(result, md5sums)]
 
     return result
 
@@ -0,0 +1,67 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import unittest
+
+try:
+    from jcmt2caom2.caom2_tap import CAOM2TAP, ObsInfo
+except ImportError:
+    # The caom2_tap module requires tools4caom2.tapclient.
+    CAOM2TAP = None
+
+
+class DummyTAP(object):
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query):
+        self.queries.append(query)
+
+        if 'Artifact.uri' in query:
+            return [
+                ('p1', b'ad:JCMT/raw_1'),
+                ('p1', b'ad:JCMT/raw_2'),
+                ('p2', b'ad:JCMT/reduced_1'),
+            ]
+
+        return [
+            ('obs1', 'p1', 'raw', 1.0, 2.0, '2020-01-01'),
+            ('obs1', 'p2', 'reduced', 1.0, 2.0, '2021-01-01'),
+        ]
+
+
+@unittest.skipIf(CAOM2TAP is None, 'caom2_tap module can not be imported')
+class testCAOM2TAP(unittest.TestCase):
+    def test_obs_info_multiple(self):
+        tap = CAOM2TAP.__new__(CAOM2TAP)
+        tap.tap = DummyTAP()
+
+        result = tap.get_obs_info_multiple(['obs1', 'obs\'2'])
+
+        self.assertEqual(result, {
+            'obs1': [
+                ObsInfo('raw', 1.0, 2.0, '2020-01-01', 'ad:JCMT/raw_1'),
+                ObsInfo('raw', 1.0, 2.0, '2020-01-01', 'ad:JCMT/raw_2'),
+                ObsInfo('reduced', 1.0, 2.0, '2021-01-01',
+                        'ad:JCMT/reduced_1'),
+            ],
+            'obs\'2': [],
+        })
+
+        self.assertEqual(len(tap.tap.queries), 2)
+        for query in tap.tap.queries:
+            self.assertIn('IN (\'obs1\', \'obs\'\'2\')', query)
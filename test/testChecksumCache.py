@@ -0,0 +1,82 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from hashlib import md5
+import os
+import shutil
+import tempfile
+import unittest
+
+from jcmt2caom2.checksum_cache import ChecksumCache
+
+
+class testChecksumCache(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'cache.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _write(self, name, data):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_cache(self):
+        path = self._write('a.dat', b'first')
+        first = md5(b'first').hexdigest()
+        second = md5(b'other').hexdigest()
+
+        cache = ChecksumCache(self.filename)
+        self.assertEqual(cache.get_md5sum(path), first)
+        cache.close()
+
+        # Replace the contents without changing the size or modification
+        # time: the cached value should be returned (by a new connection).
+        stat = os.stat(path)
+        with open(path, 'r+b') as f:
+            f.write(b'other')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        cache = ChecksumCache(self.filename)
+        self.assertEqual(cache.get_md5sum(path), first)
+
+        # Changing the modification time invalidates the entry.
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        self.assertEqual(cache.get_md5sum(path), second)
+
+        # Relative paths share entries with absolute paths.
+        cwd = os.getcwd()
+        os.chdir(self.tempdir)
+        try:
+            self.assertEqual(cache.get_md5sum('a.dat'), second)
+        finally:
+            os.chdir(cwd)
+
+        self.assertEqual(
+            cache.db.execute('SELECT COUNT(*) FROM md5sum').fetchone(), (1,))
+
+        # Deleted files are removed by purge.
+        other = self._write('b.dat', b'b')
+        self.assertEqual(cache.get_md5sum(other), md5(b'b').hexdigest())
+        os.remove(path)
+        self.assertEqual(cache.purge(), 1)
+        self.assertEqual(cache.purge(), 0)
+
+        cache.close()
@@ -0,0 +1,81 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from caom2.observation import SimpleObservation
+
+from tools4caom2.error import CAOMError
+
+from jcmt2caom2.export import ObservationArchive
+
+
+class testExport(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.observations = [
+            SimpleObservation('JCMT', 'scuba2_{0:05d}_20150101T000000'.format(
+                n)) for n in range(5)]
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_tar(self):
+        filename = os.path.join(self.tempdir, 'export.tar.gz')
+
+        with ObservationArchive(filename) as archive:
+            for observation in self.observations:
+                archive.add(observation.observation_id, observation)
+
+        self.assertEqual(archive.filenames, [filename])
+
+        with tarfile.open(filename) as f:
+            index = f.extractfile('index.txt').read().decode('utf-8')
+            lines = index.splitlines()
+            self.assertEqual(len(lines), 5)
+
+            (obsid, name) = lines[0].split('\t')
+            self.assertEqual(obsid, 'scuba2_00000_20150101T000000')
+            self.assertEqual(name, 'scuba2_00000_20150101T000000.xml')
+
+            xml = f.extractfile(name).read().decode('utf-8')
+            self.assertIn('scuba2_00000_20150101T000000', xml)
+
+    def test_zip_shards(self):
+        filename = os.path.join(self.tempdir, 'export.zip')
+
+        with ObservationArchive(filename, shard_size=2) as archive:
+            for observation in self.observations:
+                archive.add(observation.observation_id, observation)
+
+        self.assertEqual(
+            [os.path.basename(x) for x in archive.filenames],
+            ['export-0001.zip', 'export-0002.zip', 'export-0003.zip'])
+
+        with zipfile.ZipFile(archive.filenames[-1]) as f:
+            self.assertEqual(
+                sorted(f.namelist()),
+                ['index.txt', 'scuba2_00004_20150101T000000.xml'])
+
+    def test_bad_extension(self):
+        with self.assertRaises(CAOMError):
+            ObservationArchive(os.path.join(self.tempdir, 'export.txt'))
@@ -0,0 +1,85 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from jcmt2caom2.file_scan import combine_regexes, scan_files
+
+
+class testFileScan(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _write(self, path, data=b'x'):
+        path = os.path.join(self.tempdir, path)
+        dirname = os.path.dirname(path)
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_combine_regexes(self):
+        pattern = combine_regexes([
+            re.compile(r'^jcmt.*\.fits$'),
+            re.compile(r'^.*\.png$'),
+        ])
+
+        self.assertTrue(pattern.match('jcmts_reduced.fits'))
+        self.assertTrue(pattern.match('preview_256.png'))
+        self.assertFalse(pattern.match('other.fits'))
+        self.assertFalse(pattern.match('jcmts_reduced.fits.bak'))
+
+        # Flags are preserved.
+        pattern = combine_regexes([
+            re.compile(r'^.*\.fits$', re.IGNORECASE),
+            re.compile(r'^.*\.png$', re.IGNORECASE),
+        ])
+
+        self.assertTrue(pattern.match('JCMTS_REDUCED.FITS'))
+        self.assertTrue(pattern.match('preview_256.PNG'))
+
+        with self.assertRaises(ValueError):
+            combine_regexes([
+                re.compile(r'^.*\.fits$', re.IGNORECASE),
+                re.compile(r'^.*\.png$'),
+            ])
+
+    def test_scan(self):
+        pattern = combine_regexes([re.compile(r'^.*\.fits$')])
+
+        a = self._write('a.fits', b'abc')
+        b = self._write('sub/b.fits')
+        c = self._write('sub/nested/c.fits')
+        self._write('sub/empty.fits', b'')
+        self._write('sub/notes.txt')
+
+        # Link back to the top of the tree should not cause files
+        # to be found again.
+        os.symlink(self.tempdir, os.path.join(self.tempdir, 'sub', 'loop'))
+
+        found = scan_files(self.tempdir, pattern)
+
+        self.assertEqual(list(found.keys()), [a, b, c])
+        self.assertEqual(found[a].st_size, 3)
@@ -0,0 +1,214 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from astropy.io import fits
+import numpy as np
+from pymoc import MOC
+
+from jcmt2caom2.fits_headers import header_snapshot, iter_fits_headers, \
+    moc_area_sq_deg, read_fits_headers, scan_fits_structure
+
+
+class testFitsHeaders(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _write_fits(self, name, n_extension):
+        filename = os.path.join(self.tempdir, name)
+
+        primary = fits.PrimaryHDU(np.zeros((3, 4), dtype=np.float32))
+        primary.header['OBJECT'] = name
+
+        hdus = [primary]
+        for i in range(n_extension):
+            extension = fits.ImageHDU(np.zeros(5, dtype=np.int16))
+            extension.header['EXTNAME'] = 'EXT{0}'.format(i)
+            hdus.append(extension)
+
+        fits.HDUList(hdus).writeto(filename)
+
+        return filename
+
+    def test_read(self):
+        filename = self._write_fits('a.fits', 2)
+
+        headers = read_fits_headers(filename)
+        self.assertEqual(headers.hdu_count, 3)
+        self.assertEqual(headers.header['OBJECT'], 'a.fits')
+        self.assertEqual(headers.first_extension['EXTNAME'], 'EXT0')
+        self.assertIsNone(headers.moc_area)
+
+        filename = self._write_fits('b.fits', 0)
+
+        headers = read_fits_headers(filename)
+        self.assertEqual(headers.hdu_count, 1)
+        self.assertIsNone(headers.first_extension)
+
+        filename = os.path.join(self.tempdir, 'c.txt')
+        with open(filename, 'w') as f:
+            f.write('not a FITS file\n')
+
+        self.assertIsNone(read_fits_headers(filename))
+
+    def test_iter(self):
+        filenames = [
+            self._write_fits('f{0:02d}.fits'.format(i), i % 3)
+            for i in range(20)]
+
+        for threads in (1, 4):
+            headers = list(iter_fits_headers(filenames, threads=threads))
+
+            self.assertEqual(
+                [x.header['OBJECT'] for x in headers],
+                [os.path.basename(x) for x in filenames])
+            self.assertEqual(
+                [x.hdu_count for x in headers],
+                [1 + (i % 3) for i in range(20)])
+
+    def test_scan_structure(self):
+        filename = os.path.join(self.tempdir, 'mixed.fits')
+
+        primary = fits.PrimaryHDU()
+        for i in range(50):
+            # Make the header span several blocks.
+            primary.header['KEY{0}'.format(i)] = i
+
+        table = fits.BinTableHDU.from_columns([
+            fits.Column(name='a', format='PJ()', array=np.array(
+                [np.arange(3), np.arange(7)], dtype=object)),
+            fits.Column(name='b', format='D', array=[1.0, 2.0]),
+        ])
+        table.header['EXTNAME'] = 'TABLE'
+
+        cube = fits.ImageHDU(np.zeros((5, 7, 11), dtype=np.float64))
+        cube.header['EXTNAME'] = 'CUBE'
+
+        groups = fits.GroupsHDU(fits.GroupData(
+            np.zeros((4, 1, 3, 2), dtype=np.float32),
+            parnames=['u', 'v'],
+            pardata=[np.zeros(4), np.zeros(4)],
+            bitpix=-32))
+
+        fits.HDUList([primary, table, cube]).writeto(filename)
+
+        structure = scan_fits_structure(filename)
+        self.assertEqual(structure.hdu_count, 3)
+        self.assertEqual(structure.header['KEY49'], 49)
+        self.assertEqual(structure.first_extension['EXTNAME'], 'TABLE')
+
+        groups_filename = os.path.join(self.tempdir, 'groups.fits')
+        fits.HDUList([groups, cube]).writeto(groups_filename)
+
+        structure = scan_fits_structure(groups_filename)
+        self.assertEqual(structure.hdu_count, 2)
+        self.assertEqual(structure.first_extension['EXTNAME'], 'CUBE')
+
+        # Compressed files are read via astropy.
+        with open(filename, 'rb') as f:
+            with gzip.open(filename + '.gz', 'wb') as g:
+                g.write(f.read())
+
+        with self.assertRaises(ValueError):
+            scan_fits_structure(filename + '.gz')
+
+        headers = read_fits_headers(filename + '.gz')
+        self.assertEqual(headers.hdu_count, 3)
+        self.assertEqual(headers.first_extension['EXTNAME'], 'TABLE')
+
+    def test_moc(self):
+        filename = os.path.join(self.tempdir, 'moc.fits')
+
+        moc = MOC()
+        moc.add(5, [1, 2, 3, 100])
+        moc.add(8, [5000, 5001])
+        moc.write(filename, filetype='fits')
+
+        headers = read_fits_headers(filename)
+        self.assertEqual(headers.hdu_count, 2)
+        self.assertAlmostEqual(headers.moc_area, moc.area_sq_deg)
+
+    def test_moc_area(self):
+        self.assertEqual(moc_area_sq_deg([]), 0.0)
+
+        # Whole sky at order 0.
+        self.assertAlmostEqual(
+            moc_area_sq_deg(np.arange(4 + 0, 4 + 12)), 41252.96125, places=4)
+
+        # The highest NPIX values at high orders, where the order can not
+        # be found reliably by floating point logarithm alone.
+        for order in (20, 26, 29):
+            moc = MOC()
+            moc.add(order, [12 * 4 ** order - 1])
+            self.assertAlmostEqual(
+                moc_area_sq_deg([4 * 4 ** order + 12 * 4 ** order - 1]),
+                moc.area_sq_deg)
+
+        # Overlapping and repeated cells should be counted once.
+        moc = MOC()
+        moc.add(5, [1, 2, 3, 100])
+        moc.add(8, [5000, 5001])
+        nuniq = [4 * 4 ** 5 + x for x in (1, 2, 3, 100, 3)]
+        nuniq.extend(4 * 4 ** 8 + x for x in (5000, 5001, 64))
+        self.assertAlmostEqual(moc_area_sq_deg(nuniq), moc.area_sq_deg)
+
+        with self.assertRaises(ValueError):
+            moc_area_sq_deg([3])
+
+    def test_snapshot(self):
+        header = fits.Header()
+        header['OBJECT'] = ('M82', 'Object name')
+        header['PRVCNT'] = 2
+        header['PRV1'] = 'a'
+        header['PRV2'] = 'b'
+        header['OBSRA'] = (None, 'Blank value')
+        header['HISTORY'] = 'processed'
+        header['COMMENT'] = 'comment'
+        header.append(('OBJECT', 'duplicate'))
+
+        snapshot = header_snapshot(header)
+        self.assertEqual(
+            list(snapshot.keys()),
+            ['OBJECT', 'PRVCNT', 'PRV1', 'PRV2', 'OBSRA'])
+        self.assertEqual(snapshot['OBJECT'], 'M82')
+        self.assertEqual(snapshot['object'], 'M82')
+        self.assertEqual(snapshot.comments['OBJECT'], 'Object name')
+        self.assertIsNone(snapshot['OBSRA'])
+        self.assertEqual(snapshot.comments['OBSRA'], 'Blank value')
+
+        with self.assertRaises(KeyError):
+            snapshot['TITLE']
+
+        with self.assertRaises(KeyError):
+            snapshot['title']
+
+        snapshot = header_snapshot(
+            header, frozenset(('OBJECT', 'PRVCNT')), re.compile(r'PRV\d+$'))
+        self.assertEqual(
+            sorted(snapshot.keys()), ['OBJECT', 'PRV1', 'PRV2', 'PRVCNT'])
+
+        snapshot = header_snapshot(header, frozenset(('OBJECT',)))
+        self.assertEqual(list(snapshot.keys()), ['OBJECT'])
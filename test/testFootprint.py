@@ -0,0 +1,261 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import logging
+import math
+import unittest
+
+import numpy as np
+
+from tools4caom2.error import CAOMError
+
+from jcmt2caom2.jsa.footprint import FootprintType, \
+    prefetch_footprints, raw_footprints
+
+try:
+    from jcmt2caom2.raw import raw
+except ImportError:
+    # The raw module requires the OMP database modules.
+    raw = None
+
+
+def is_simple(vertices):
+    """
+    Check that a quadrilateral, treated as planar, does not cross itself,
+    i.e. that neither pair of opposite edges intersects.
+    """
+
+    def cross(o, a, b):
+        return ((a[0] - o[0]) * (b[1] - o[1]) -
+                (a[1] - o[1]) * (b[0] - o[0]))
+
+    def intersect(p, q, r, s):
+        return (cross(p, q, r) * cross(p, q, s) < 0 and
+                cross(r, s, p) * cross(r, s, q) < 0)
+
+    (a, b, c, d) = vertices
+    return not (intersect(a, b, c, d) or intersect(b, c, d, a))
+
+
+class testFootprint(unittest.TestCase):
+    def test_footprints(self):
+        # Corners in the order bl, br, tr, tl.
+        corners = np.array([
+            # Normal box.
+            [(10.0, 20.0), (11.0, 20.0), (11.0, 21.0), (10.0, 21.0)],
+            # Point.
+            [(10.0, 20.0), (10.0, 20.0), (10.0, 20.0), (10.0, 20.0)],
+            # Line in X at the equator.
+            [(10.0, 0.0), (11.0, 0.0), (11.0, 0.0), (10.0, 0.0)],
+            # Line in Y at the equator.
+            [(10.0, 0.0), (10.0, 0.0), (10.0, 1.0), (10.0, 1.0)],
+            # Bowtie (tr and tl swapped).
+            [(10.0, 20.0), (11.0, 20.0), (10.0, 21.0), (11.0, 21.0)],
+            # Bowtie (br and tr swapped).
+            [(10.0, 20.0), (11.0, 21.0), (11.0, 20.0), (10.0, 21.0)],
+            # Concave box.
+            [(10.0, 20.0), (11.0, 20.0), (10.2, 20.2), (10.0, 21.0)],
+            # Triangle with coincident corners.
+            [(10.0, 20.0), (10.0, 20.0), (11.0, 21.0), (10.0, 21.0)],
+            # Missing coordinates.
+            [(10.0, 20.0), (np.nan, 20.0), (11.0, 21.0), (10.0, 21.0)],
+        ])
+
+        beamsize = 0.01
+        h = beamsize / 2.0
+
+        (kind, vertices) = raw_footprints(corners, beamsize)
+
+        self.assertEqual(kind.tolist(), [
+            FootprintType.NORMAL,
+            FootprintType.POINT,
+            FootprintType.LINE_X,
+            FootprintType.LINE_Y,
+            FootprintType.BOWTIE,
+            FootprintType.BOWTIE,
+            FootprintType.NORMAL,
+            FootprintType.DEGENERATE,
+            FootprintType.DEGENERATE,
+        ])
+
+        np.testing.assert_array_equal(vertices[0], corners[0])
+
+        cosdec = math.cos(math.radians(20.0))
+        np.testing.assert_allclose(vertices[1], [
+            (10.0 - h / cosdec, 20.0 - h),
+            (10.0 + h / cosdec, 20.0 - h),
+            (10.0 + h / cosdec, 20.0 + h),
+            (10.0 - h / cosdec, 20.0 + h)])
+
+        np.testing.assert_allclose(vertices[2], [
+            (10.0 - h, h), (11.0 + h, h), (11.0 + h, -h), (10.0 - h, -h)])
+
+        # Offsets follow those of raw.build_spatial_wcs, which for a
+        # line in Y places bl and tl on the +X side.
+        hx = h / math.cos(math.radians(0.5))
+        np.testing.assert_allclose(vertices[3], [
+            (10.0 + hx, -h), (10.0 - hx, -h), (10.0 - hx, 1.0 + h),
+            (10.0 + hx, 1.0 + h)])
+
+        # Bowties corrected by swapping bl and br, or br and tr.
+        np.testing.assert_array_equal(vertices[4], [
+            (11.0, 20.0), (10.0, 20.0), (10.0, 21.0), (11.0, 21.0)])
+        np.testing.assert_array_equal(vertices[5], [
+            (10.0, 20.0), (11.0, 20.0), (11.0, 21.0), (10.0, 21.0)])
+
+        np.testing.assert_array_equal(vertices[6], corners[6])
+
+        for i in range(7):
+            self.assertTrue(is_simple(vertices[i]), 'footprint {0}'.format(i))
+
+        # Beam size given per footprint.
+        (kind, vertices) = raw_footprints(corners[1:3], [0.02, 0.0])
+        np.testing.assert_allclose(vertices[0, 0], (
+            10.0 - 0.01 / cosdec, 19.99))
+        np.testing.assert_array_equal(vertices[1], corners[2])
+
+    def test_prefetch(self):
+        common = {
+            'obsrabl': 10.0, 'obsdecbl': 20.0,
+            'obsrabr': 11.0, 'obsdecbr': 20.0,
+            'obsratr': 11.0, 'obsdectr': 21.0,
+            'obsratl': 10.0, 'obsdectl': 21.0,
+        }
+
+        commons = [
+            dict(common, obsid='a', obs_type='science'),
+            dict(common, obsid='b', obs_type='skydip'),
+            dict(common, obsid='c', obs_type='pointing', obsrabl=None),
+        ]
+
+        footprints = prefetch_footprints(commons)
+
+        self.assertEqual(sorted(footprints.keys()), ['a'])
+
+        (kind, base, pad) = footprints['a']
+        self.assertEqual(kind, FootprintType.NORMAL)
+        self.assertEqual(base.shape, (4, 2))
+        self.assertEqual(pad.shape, (4, 2))
+
+    @unittest.skipIf(raw is None, 'raw module can not be imported')
+    def test_scalar_bowtie(self):
+        ingest = raw()
+        ingest.obsid = 'test'
+        ingest.footprint = None
+
+        common = {
+            'obsid': 'test', 'obs_type': 'science',
+            'obsrabl': 10.0, 'obsdecbl': 20.0,
+            'obsrabr': 11.0, 'obsdecbr': 20.0,
+            'obsratr': 10.0, 'obsdectr': 21.0,
+            'obsratl': 11.0, 'obsdectl': 21.0,
+        }
+
+        for (corners, expect) in [
+                # tr and tl swapped: corrected by swapping bl and br.
+                ({},
+                 [(11.0, 20.0), (10.0, 20.0), (10.0, 21.0), (11.0, 21.0)]),
+                # br and tr swapped.
+                ({'obsrabr': 11.0, 'obsdecbr': 21.0,
+                  'obsratr': 11.0, 'obsdectr': 20.0,
+                  'obsratl': 10.0},
+                 [(10.0, 20.0), (11.0, 20.0), (11.0, 21.0), (10.0, 21.0)]),
+                ]:
+            logging.disable(logging.WARNING)
+            try:
+                wcs = ingest.build_spatial_wcs(
+                    dict(common, **corners), 0.01)
+            finally:
+                logging.disable(logging.NOTSET)
+
+            self.assertEqual(
+                [(v.coord1, v.coord2) for v in wcs.axis.bounds.vertices],
+                expect)
+
+    @unittest.skipIf(raw is None, 'raw module can not be imported')
+    def test_scalar(self):
+        """
+        Compare the footprints with those given by the scalar code in
+        raw.build_spatial_wcs for random boxes of each type.
+        """
+
+        rng = np.random.RandomState(1234)
+        ingest = raw()
+        ingest.obsid = 'test'
+
+        def spatial_wcs(common, beamsize, footprint):
+            ingest.footprint = footprint
+            try:
+                wcs = ingest.build_spatial_wcs(common, beamsize)
+            except CAOMError:
+                return None
+            return [(v.coord1, v.coord2) for v in wcs.axis.bounds.vertices]
+
+        logging.disable(logging.WARNING)
+        try:
+            for i in range(1000):
+                (ra, dec) = (rng.uniform(0.0, 360.0), rng.uniform(-60, 80))
+                (dx, dy) = rng.uniform(0.001, 0.5, 2)
+                (ex, ey) = rng.uniform(-0.1, 0.1, 2)
+                corners = [
+                    # Point.
+                    [(ra, dec)] * 4,
+                    # Line in X.
+                    [(ra, dec), (ra + dx, dec + ey), (ra + dx, dec + ey),
+                     (ra, dec)],
+                    # Line in Y.
+                    [(ra, dec), (ra, dec), (ra + ex, dec + dy),
+                     (ra + ex, dec + dy)],
+                    # Bowties.
+                    [(ra, dec), (ra + dx, dec), (ra, dec + dy),
+                     (ra + dx, dec + dy)],
+                    [(ra, dec), (ra + dx, dec + dy), (ra + dx, dec),
+                     (ra, dec + dy)],
+                    # Corners of a box in random order.
+                    [[(ra, dec), (ra + dx, dec + ey), (ra + dx, dec + dy),
+                      (ra + ex, dec + dy)][j] for j in rng.permutation(4)],
+                    # Triangle.
+                    [(ra, dec), (ra, dec), (ra + dx, dec + dy),
+                     (ra, dec + dy)],
+                    # Other boxes.
+                    [(ra, dec), (ra + dx, dec + ey), (ra + dx, dec + dy),
+                     (ra + ex, dec + dy)],
+                ][i % 8]
+
+                common = {'obsid': 'test', 'obs_type': 'science'}
+                for ((ra_col, dec_col), (x, y)) in zip(
+                        [('obsrabl', 'obsdecbl'), ('obsrabr', 'obsdecbr'),
+                         ('obsratr', 'obsdectr'), ('obsratl', 'obsdectl')],
+                        corners):
+                    common[ra_col] = x
+                    common[dec_col] = y
+
+                beamsize = rng.uniform(0.001, 0.01)
+
+                expect = spatial_wcs(common, beamsize, None)
+                result = spatial_wcs(
+                    common, beamsize, prefetch_footprints([common])['test'])
+
+                if expect is None:
+                    self.assertIsNone(result)
+                else:
+                    np.testing.assert_allclose(
+                        result, expect, rtol=0.0, atol=1.0e-9)
+                    self.assertTrue(is_simple(result))
+
+        finally:
+            logging.disable(logging.NOTSET)
@@ -0,0 +1,142 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import ast
+import os
+import unittest
+
+import jcmt2caom2
+
+# Names of the variables holding headers in the functions checked.
+header_names = frozenset(('header', 'first_extension'))
+
+
+def read_module(*path):
+    """
+    Parse a module of the jcmt2caom2 package.
+
+    The modules are parsed rather than imported so that this test does
+    not require their dependencies.
+    """
+
+    filename = os.path.join(os.path.dirname(jcmt2caom2.__file__), *path)
+
+    with open(filename) as f:
+        return ast.parse(f.read(), filename)
+
+
+def find_function(tree, name):
+    for node in ast.walk(tree):
+        if isinstance(node, ast.FunctionDef) and node.name == name:
+            return node
+
+    raise Exception('function {0} not found'.format(name))
+
+
+def string_value(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+
+    return None
+
+
+def is_header(node):
+    """
+    Determine whether a node refers to a header, or to its comments.
+    """
+
+    if isinstance(node, ast.Attribute) and node.attr == 'comments':
+        node = node.value
+
+    return isinstance(node, ast.Name) and node.id in header_names
+
+
+def literal_keywords(function):
+    """
+    Find the header keywords given as string literals in a function.
+
+    These are keywords used to index a header (or its comments),
+    passed to a header's get method, passed to is_defined or is_blank,
+    passed as the second argument of a CAOMValidation method
+    or iterated over in a for loop.
+    """
+
+    keywords = set()
+
+    for node in ast.walk(function):
+        candidates = []
+
+        if isinstance(node, ast.Subscript) and is_header(node.value):
+            candidates.append(node.slice)
+
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name):
+                if func.id in ('is_defined', 'is_blank'):
+                    candidates.extend(node.args[:1])
+
+            elif isinstance(func, ast.Attribute):
+                if func.attr == 'get' and is_header(func.value):
+                    candidates.extend(node.args[:1])
+
+                elif (isinstance(func.value, ast.Attribute) and
+                        func.value.attr == 'validation'):
+                    candidates.extend(node.args[1:2])
+
+        elif (isinstance(node, ast.For) and
+                isinstance(node.iter, (ast.Tuple, ast.List))):
+            candidates.extend(node.iter.elts)
+
+        for candidate in candidates:
+            value = string_value(candidate)
+            if value is not None:
+                keywords.add(value.upper())
+
+    return keywords
+
+
+class testHeaderKeywords(unittest.TestCase):
+    def test_header_keywords(self):
+        """
+        Check that the header_keywords set includes all the keywords
+        used in read_file_info, since only these are copied into the
+        header snapshots which it is given.
+        """
+
+        ingest = read_module('jcmt2caom2ingest.py')
+
+        header_keywords = None
+
+        for node in ingest.body:
+            if (isinstance(node, ast.Assign) and
+                    [x.id for x in node.targets] == ['header_keywords']):
+                header_keywords = ast.literal_eval(node.value.args[0])
+
+        self.assertIsNotNone(header_keywords)
+
+        for (tree, function) in (
+                (ingest, 'read_file_info'),
+                (read_module('jsa', 'tile.py'), 'jsa_tile_wcs'),
+                (read_module('instrument', 'scuba2.py'),
+                 'scuba2_spectral_wcs')):
+            keywords = literal_keywords(find_function(tree, function))
+
+            # Ensure the search found the keywords at all.
+            self.assertTrue(keywords, function)
+
+            self.assertEqual(
+                sorted(keywords.difference(header_keywords)), [], function)
@@ -0,0 +1,125 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from datetime import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from jcmt2caom2.ingest_state import IngestState, advance_watermark, \
+    make_fingerprint
+
+
+class testIngestState(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'state.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_fingerprint(self):
+        common = {'obsid': 'x', 'date_obs': datetime(2015, 1, 1, 12, 0, 0)}
+        subsystem = {1: {'restfreq': 345.796}, 2: {'restfreq': 330.588}}
+
+        fingerprint = make_fingerprint(common, subsystem)
+
+        # Fingerprint should not depend on dictionary order.
+        self.assertEqual(
+            fingerprint,
+            make_fingerprint(
+                {'date_obs': datetime(2015, 1, 1, 12, 0, 0), 'obsid': 'x'},
+                {2: {'restfreq': 330.588}, 1: {'restfreq': 345.796}}))
+
+        common['date_obs'] = datetime(2015, 1, 1, 12, 0, 1)
+        self.assertNotEqual(fingerprint, make_fingerprint(common, subsystem))
+
+    def test_state_file(self):
+        state = IngestState(self.filename)
+
+        self.assertIsNone(state.get_fingerprint('obs1'))
+
+        state.set_fingerprint('obs1', 'abc')
+        state.set_fingerprint('obs2', 'def')
+        state.set_fingerprint('obs1', 'ghi')
+
+        self.assertEqual(state.get_fingerprint('obs1'), 'ghi')
+        self.assertEqual(state.get_fingerprint('obs2'), 'def')
+
+        state.close()
+
+        # Values should persist after re-opening the file.
+        state = IngestState(self.filename)
+        self.assertEqual(state.get_fingerprint('obs1'), 'ghi')
+        state.close()
+
+    def test_watermark(self):
+        state = IngestState(self.filename)
+
+        self.assertIsNone(state.get_watermark('raw-JCMT'))
+
+        watermark = datetime(2015, 1, 1, 12, 30, 45, 123456)
+        state.set_watermark('raw-JCMT', watermark)
+        state.set_watermark('raw-SANDBOX', datetime(2016, 1, 1))
+
+        self.assertEqual(state.get_watermark('raw-JCMT'), watermark)
+        self.assertEqual(state.get_watermark('raw-SANDBOX'),
+                         datetime(2016, 1, 1))
+
+        state.close()
+
+    def test_rejected(self):
+        state = IngestState(self.filename)
+
+        state.set_rejected('obs1', 'Forbidden instrument: X')
+        state.set_rejected('obs2', 'Serious errors found')
+        self.assertEqual(
+            state.get_rejected(['obs1', 'obs2', 'obs3']),
+            set(['obs1', 'obs2']))
+
+        state.clear_rejected(['obs1'])
+        self.assertEqual(state.get_rejected(['obs1', 'obs2']), set(['obs2']))
+
+        # Successful ingestion removes the rejection record.
+        state.set_fingerprint('obs2', 'abc')
+        self.assertEqual(state.get_rejected(['obs1', 'obs2']), set())
+
+        state.close()
+
+    def test_advance_watermark(self):
+        start = datetime(2015, 1, 1)
+        modified = [
+            ('obs1', datetime(2015, 1, 2)),
+            ('obs2', datetime(2015, 1, 3)),
+            ('obs3', datetime(2015, 1, 3)),
+            ('obs4', datetime(2015, 1, 4)),
+        ]
+
+        self.assertEqual(advance_watermark(start, [], []), start)
+        self.assertEqual(
+            advance_watermark(start, modified, []), datetime(2015, 1, 4))
+
+        # Held observations (and any with the same modification time)
+        # are included in the next pass.
+        self.assertEqual(
+            advance_watermark(start, modified, ['obs3']),
+            datetime(2015, 1, 2))
+        self.assertEqual(
+            advance_watermark(start, modified, ['obs4', 'obs2']),
+            datetime(2015, 1, 2))
+        self.assertEqual(advance_watermark(start, modified, ['obs1']), start)
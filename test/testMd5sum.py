@@ -0,0 +1,72 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from hashlib import md5
+import os
+import shutil
+import tempfile
+import unittest
+
+from jcmt2caom2.md5sum import buffer_size, get_md5sum, get_md5sums
+
+
+class testMd5sum(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _write(self, name, data):
+        path = os.path.join(self.tempdir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_md5sum(self):
+        # Data spanning several buffers, and an empty file.
+        data = os.urandom(2 * buffer_size + 123)
+        self.assertEqual(
+            get_md5sum(self._write('large.dat', data)),
+            md5(data).hexdigest())
+
+        self.assertEqual(
+            get_md5sum(self._write('empty.dat', b'')),
+            md5(b'').hexdigest())
+
+    def test_md5sums(self):
+        contents = [('f{0}.dat'.format(i), os.urandom(1000 * i))
+                    for i in range(20)]
+        paths = [self._write(name, data) for (name, data) in contents]
+        expect = [(path, md5(data).hexdigest())
+                  for (path, (_, data)) in zip(paths, contents)]
+
+        for workers in (1, 4):
+            self.assertEqual(
+                list(get_md5sums(iter(paths), workers=workers)), expect)
+
+        called = []
+
+        def md5sum_function(path):
+            called.append(path)
+            return os.path.basename(path)
+
+        self.assertEqual(
+            list(get_md5sums(paths[:3], workers=2,
+                             md5sum_function=md5sum_function)),
+            [(x, os.path.basename(x)) for x in paths[:3]])
+        self.assertEqual(sorted(called), paths[:3])
@@ -0,0 +1,65 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import unittest
+
+from astropy.io import fits
+
+from tools4caom2.error import CAOMError
+
+try:
+    from jcmt2caom2.jcmt2caom2ingest import member_keywords, member_obsid
+except ImportError:
+    # The ingestion module requires the tools4caom2 and OMP modules.
+    member_keywords = member_obsid = None
+
+
+@unittest.skipIf(member_keywords is None,
+                 'jcmt2caom2ingest module can not be imported')
+class testMemberKeywords(unittest.TestCase):
+    def test_keywords(self):
+        header = fits.Header()
+        self.assertEqual(member_keywords(header), [])
+
+        header['OBSCNT'] = 2
+        self.assertEqual(member_keywords(header), ['OBS1', 'OBS2'])
+
+        # MBRn keywords take precedence, even if there are none.
+        header['MBRCNT'] = 0
+        self.assertEqual(member_keywords(header), [])
+
+        header['MBRCNT'] = 1
+        self.assertEqual(member_keywords(header), ['MBR1'])
+
+    def test_obsid(self):
+        self.assertEqual(
+            member_obsid(
+                'f', 'MBR1', 'caom:JCMT/scuba2_00012_20140101T123456'),
+            'scuba2_00012_20140101T123456')
+
+        self.assertEqual(
+            member_obsid('f', 'OBS1', 'scuba2_00012_20140101T123456_850'),
+            'scuba2_00012_20140101T123456')
+
+        with self.assertRaises(CAOMError):
+            member_obsid('f', 'MBR1', 'caom:OTHER/x')
+
+        with self.assertRaises(ValueError):
+            member_obsid('f', 'MBR1', 'caom:JCMT/x/y')
+
+        with self.assertRaises(CAOMError):
+            member_obsid('f', 'OBS1', 'garbage')
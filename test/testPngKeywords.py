@@ -0,0 +1,163 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from binascii import hexlify
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+import zlib
+
+from jcmt2caom2 import png_keywords
+from jcmt2caom2.png_keywords import read_png_chunk_keywords, \
+    read_png_keywords
+
+xmp_packet = '''<x:xmpmeta xmlns:x="adobe:ns:meta/">
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:subject><rdf:Bag>
+<rdf:li>jsa:asn_type=obs</rdf:li>
+<rdf:li>jsa:obsid=scuba2_00012_20140101T123456</rdf:li>
+</rdf:Bag></dc:subject>
+</rdf:Description>
+</rdf:RDF>
+</x:xmpmeta>'''
+
+
+def _chunk(type_, data):
+    return (struct.pack('>I4s', len(data), type_) + data +
+            struct.pack('>I', zlib.crc32(type_ + data) & 0xffffffff))
+
+
+def _iptc_profile(keywords):
+    data = b''.join(
+        struct.pack('>BBBH', 0x1c, 2, 25, len(x)) + x.encode('utf-8')
+        for x in keywords)
+    return '\niptc\n{0:8d}\n{1}\n'.format(
+        len(data), hexlify(data).decode('ascii')).encode('latin-1')
+
+
+class testPngKeywords(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def _write_png(self, name, chunks, after_idat=()):
+        filename = os.path.join(self.tempdir, name)
+
+        with open(filename, 'wb') as f:
+            f.write(png_keywords.png_signature)
+            f.write(_chunk(b'IHDR', struct.pack(
+                '>IIBBBBB', 1, 1, 8, 0, 0, 0, 0)))
+            for chunk in chunks:
+                f.write(_chunk(*chunk))
+            f.write(_chunk(b'IDAT', zlib.compress(b'\0\0')))
+            for chunk in after_idat:
+                f.write(_chunk(*chunk))
+            f.write(_chunk(b'IEND', b''))
+
+        return filename
+
+    def test_chunks(self):
+        filename = self._write_png('a.png', [
+            (b'tEXt', b'Software\0test'),
+            (b'tEXt', b'Keywords\0jsa:productID=reduced-850um\n'),
+            (b'iTXt', b'XML:com.adobe.xmp\0\0\0\0\0' +
+                xmp_packet.encode('utf-8')),
+            (b'zTXt', b'Raw profile type iptc\0\0' + zlib.compress(
+                _iptc_profile(['jsa:asn_id=jcmts20140101_00012_850',
+                               'other keyword']))),
+        ], after_idat=[(b'tEXt', b'Keywords\0jsa:after=idat')])
+
+        with self.assertLogs(png_keywords.logger, 'WARNING') as logs:
+            keywords = read_png_chunk_keywords(filename)
+
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('other keyword', logs.output[0])
+
+        self.assertEqual(keywords, [
+            'jsa:productID=reduced-850um',
+            'jsa:asn_type=obs',
+            'jsa:obsid=scuba2_00012_20140101T123456',
+            'jsa:asn_id=jcmts20140101_00012_850',
+        ])
+
+        with self.assertLogs(png_keywords.logger, 'WARNING'):
+            keywords = read_png_keywords(filename)
+
+        self.assertEqual(keywords, {
+            'jsa:productID': 'reduced-850um',
+            'jsa:asn_type': 'obs',
+            'jsa:obsid': 'scuba2_00012_20140101T123456',
+            'jsa:asn_id': 'jcmts20140101_00012_850',
+        })
+
+    def test_fallback(self):
+        filename = self._write_png('b.png', [], after_idat=[
+            (b'tEXt', b'Keywords\0jsa:after=idat')])
+        not_png = os.path.join(self.tempdir, 'c.png')
+        with open(not_png, 'wb') as f:
+            f.write(b'not a PNG file')
+
+        self.assertEqual(read_png_chunk_keywords(filename), [])
+
+        with self.assertRaises(ValueError):
+            read_png_chunk_keywords(not_png)
+
+        called = []
+
+        def exiftool(filename):
+            called.append(os.path.basename(filename))
+            return ['jsa:productID=from-exiftool']
+
+        original = png_keywords.read_png_keywords_exiftool
+        png_keywords.read_png_keywords_exiftool = exiftool
+        try:
+            self.assertEqual(
+                read_png_keywords(filename),
+                {'jsa:productID': 'from-exiftool'})
+            self.assertEqual(
+                read_png_keywords(not_png),
+                {'jsa:productID': 'from-exiftool'})
+
+            # Keywords from exiftool must all be "key=value" pairs.
+            png_keywords.read_png_keywords_exiftool = \
+                lambda filename: ['jsa:productID=from-exiftool', 'other']
+            with self.assertRaises(ValueError):
+                read_png_keywords(filename)
+        finally:
+            png_keywords.read_png_keywords_exiftool = original
+
+        self.assertEqual(called, ['b.png', 'c.png'])
+
+    def test_bad_xmp(self):
+        filename = self._write_png('d.png', [
+            (b'iTXt', b'XML:com.adobe.xmp\0\0\0\0\0<x:xmpmeta><unclosed>'),
+        ])
+
+        original = png_keywords.read_png_keywords_exiftool
+        png_keywords.read_png_keywords_exiftool = \
+            lambda filename: ['jsa:productID=from-exiftool']
+        try:
+            self.assertEqual(
+                read_png_keywords(filename),
+                {'jsa:productID': 'from-exiftool'})
+        finally:
+            png_keywords.read_png_keywords_exiftool = original
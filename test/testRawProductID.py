@@ -0,0 +1,64 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import unittest
+
+from tools4caom2.error import CAOMError
+
+from jcmt2caom2.jsa.raw_product_id import raw_product_id
+
+
+class testRawProductID(unittest.TestCase):
+    """
+    Test cases for the function raw_product_id(backend, obsid, subsystem)
+    """
+
+    def test_scuba2(self):
+        self.assertEqual(
+            raw_product_id('SCUBA-2', 'scuba2_00001_20150101T000000', {}),
+            {'450': 'raw-450um', '850': 'raw-850um'})
+
+    def test_acsis(self):
+        subsystem = {
+            1: {'restfreq': 345.7959899, 'bwmode': '250MHzx8192',
+                'specid': 1, 'ifchansp': 30517.578},
+            2: {'restfreq': 330.587965, 'bwmode': '250MHzx8192',
+                'specid': 2, 'ifchansp': 30517.578},
+            3: {'restfreq': 330.587965, 'bwmode': '250MHzx8192',
+                'specid': 2, 'ifchansp': 30517.578},
+            4: {'restfreq': 345.7959899, 'bwmode': None,
+                'specid': 4, 'ifchansp': -488281.25},
+        }
+
+        self.assertEqual(
+            raw_product_id('ACSIS', 'acsis_00001_20150101T000000', subsystem),
+            {
+                '1': 'raw-345796MHz-250MHzx8192-1',
+                '2': 'raw-hybrid-330588MHz-250MHzx8192-2',
+                '3': 'raw-hybrid-330588MHz-250MHzx8192-2',
+                '4': 'raw-345796MHz-1000MHzx2048-4',
+            })
+
+    def test_acsis_errors(self):
+        with self.assertRaises(CAOMError):
+            raw_product_id('ACSIS', 'acsis_00001_20150101T000000', {})
+
+        with self.assertRaises(CAOMError):
+            raw_product_id('ACSIS', 'acsis_00001_20150101T000000', {
+                1: {'restfreq': 345.7959899, 'bwmode': None,
+                    'specid': 1, 'ifchansp': 12345.0},
+            })
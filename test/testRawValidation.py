@@ -0,0 +1,66 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+from datetime import datetime
+import logging
+import unittest
+
+from jcmt2caom2.arcdb import RawObsInfo
+
+try:
+    from jcmt2caom2.raw import raw
+except ImportError:
+    # The raw module requires the OMP database modules.
+    raw = None
+
+
+@unittest.skipIf(raw is None, 'raw module can not be imported')
+class testRawValidation(unittest.TestCase):
+    def test_null_backend(self):
+        ingest = raw()
+        ingest.obsid = 'scuba2_00012_20140101T123456'
+
+        common = {
+            'obsid': ingest.obsid,
+            'backend': None,
+            'instrume': 'SCUBA-2',
+            'obsgeo_x': -5464588.652191,
+            'obsgeo_y': -2493003.0215,
+            'obsgeo_z': 2150655.6609,
+            'obs_type': 'science',
+            'project': 'M14AU01',
+            'release_date': datetime(2015, 1, 1),
+            'sam_mode': 'scan',
+            'sw_mode': None,
+            'scan_pat': 'DAISY',
+            'inbeam': None,
+        }
+
+        logging.disable(logging.WARNING)
+        try:
+            problems = ingest.validate_observation(
+                RawObsInfo(common, [], [{'name': 'a.sdf'}]))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        by_type = {x['problem']: x for x in problems}
+
+        self.assertIn('no_subsystems', by_type)
+        self.assertIn('null_fields', by_type)
+        self.assertEqual(
+            by_type['null_fields']['fields'], ['backend', 'sw_mode'])
+        self.assertNotIn('exception', by_type)
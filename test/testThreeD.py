@@ -18,7 +18,10 @@ from __future__ import absolute_import
 import math
 import unittest
 
-from jcmt2caom2.jsa.threed import ThreeD
+import numpy as np
+
+from jcmt2caom2.jsa.threed import ThreeD, \
+    cross_array, dot_array, included_angle_array, unit_vectors
 from jcmt2caom2.jsa.twod import TwoD
 
 
@@ -113,3 +116,56 @@ class testThreeD(unittest.TestCase):
 
                 self.assertTrue(abs(90.0 - ThreeD.included_angle(a, b, c)) <
                                 1.0e-9)
+
+    def testThreeDConstructor(self):
+        a = ThreeD(1.0, 2.0, 3.0)
+        self.assertEqual(ThreeD(a), a)
+        self.assertEqual(ThreeD((1, 2, 3)), a)
+        self.assertEqual(ThreeD([1, 2, 3]), a)
+        self.assertEqual(ThreeD(a, 5.0, 6.0), a)
+
+        for args in [(), (None, 1.0, 2.0), (1.0, 2.0)]:
+            b = ThreeD(*args)
+            self.assertIsNone(b.x)
+            self.assertIsNone(b.y)
+            self.assertIsNone(b.z)
+
+    def testSignedIncludedAngle(self):
+        bl = ThreeD(TwoD(10.0, 20.0))
+        br = ThreeD(TwoD(11.0, 20.0))
+        tr = ThreeD(TwoD(11.0, 21.0))
+
+        angle = ThreeD.signed_included_angle(br, bl, tr)
+        self.assertAlmostEqual(abs(angle), ThreeD.included_angle(br, bl, tr))
+        self.assertEqual(
+            math.copysign(1, angle),
+            -math.copysign(1, ThreeD.signed_included_angle(tr, bl, br)))
+
+    def testThreeDArrays(self):
+        radec = np.array([
+            [(10.0, 20.0), (11.0, 20.0), (11.0, 21.0)],
+            [(200.0, -30.0), (200.0, -29.0), (199.0, -29.5)],
+            [(10.0, 20.0), (10.0, 20.0), (11.0, 21.0)],
+        ])
+
+        v = unit_vectors(radec)
+        (a, b, c) = (v[:, 0], v[:, 1], v[:, 2])
+
+        for i in range(2):
+            (sa, sb, sc) = (ThreeD(TwoD(*radec[i, j])) for j in range(3))
+
+            self.assertTrue((ThreeD(*v[i, 1]) - sb).abs() < 1.0e-12)
+            self.assertTrue(
+                (ThreeD(*cross_array(a, b)[i]) - ThreeD.cross(sa, sb)).abs()
+                < 1.0e-12)
+            self.assertAlmostEqual(
+                dot_array(a, c)[i], ThreeD.dot(sa, sc), places=12)
+            self.assertAlmostEqual(
+                included_angle_array(a, b, c)[i],
+                ThreeD.included_angle(sa, sb, sc), places=6)
+            self.assertAlmostEqual(
+                included_angle_array(a, b, c, signed=True)[i],
+                ThreeD.signed_included_angle(sa, sb, sc), places=6)
+
+        # Degenerate triangle.
+        self.assertTrue(np.isnan(included_angle_array(a, b, c)[2]))
@@ -84,3 +84,28 @@ class testTwoD(unittest.TestCase):
         yy.x = 3.0
         self.assertEqual(xx.x, 1.0)
         self.assertEqual(yy.x, 3.0)
+
+    def testTwoDConstructor(self):
+        a = TwoD(1.0, 2.0)
+        self.assertEqual(TwoD(a), a)
+        self.assertEqual(TwoD((1, 2)), a)
+        self.assertEqual(TwoD([1, 2]), a)
+        self.assertEqual(TwoD(a, 5.0), a)
+
+        for args in [(), (None, 1.0), (1.0,)]:
+            b = TwoD(*args)
+            self.assertIsNone(b.x)
+            self.assertIsNone(b.y)
+
+    def testTwoDInPlace(self):
+        a = TwoD(1.0, 2.0)
+        b = a
+        a += TwoD(1.0, 1.0)
+        a *= 2.0
+        a -= TwoD(0.0, 2.0)
+        a /= 2.0
+        self.assertIs(a, b)
+        self.assertEqual(a, TwoD(2.0, 2.0))
+
+        with self.assertRaises(AttributeError):
+            a.z = 0.0
@@ -0,0 +1,108 @@
+# Copyright (C) 2026 East Asian Observatory.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from jcmt2caom2.work_queue import WorkQueue
+
+
+class testWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tempdir, 'queue.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_lease_ack(self):
+        queue = WorkQueue(self.filename, lease_time=100.0)
+
+        self.assertEqual(queue.enqueue(['obs1', 'obs2', 'obs3'], now=0.0), 3)
+
+        # A second connection sees the same queue, and leased items are
+        # not given to another worker.
+        other = WorkQueue(self.filename)
+        self.assertEqual(queue.lease('w1', limit=2, now=1.0), ['obs1', 'obs2'])
+        self.assertEqual(other.lease('w2', limit=2, now=1.0), ['obs3'])
+        self.assertEqual(other.lease('w2', now=1.0), [])
+
+        self.assertTrue(queue.ack('obs1', 'w1'))
+        self.assertFalse(other.ack('obs2', 'w2'))
+        self.assertTrue(other.ack('obs3', 'w2'))
+
+        # Expired lease is given to another worker.
+        self.assertEqual(other.lease('w2', now=102.0), ['obs2'])
+        self.assertFalse(queue.ack('obs2', 'w1'))
+        self.assertTrue(other.ack('obs2', 'w2'))
+
+        self.assertEqual(queue.counts(), {'done': 3})
+
+        # Re-adding a completed item makes it pending again.
+        self.assertEqual(queue.enqueue(['obs1'], now=200.0), 1)
+        self.assertEqual(queue.counts(), {'done': 2, 'pending': 1})
+
+        queue.close()
+        other.close()
+
+    def test_renew(self):
+        queue = WorkQueue(self.filename, lease_time=100.0)
+        other = WorkQueue(self.filename)
+
+        queue.enqueue(['obs1', 'obs2'], now=0.0)
+        self.assertEqual(queue.lease('w1', limit=2, now=0.0), ['obs1', 'obs2'])
+
+        # Renewed lease is not given to another worker after the
+        # original expiry time.
+        self.assertTrue(queue.renew('obs1', 'w1', now=90.0))
+        self.assertFalse(other.renew('obs1', 'w2', now=90.0))
+        self.assertEqual(other.lease('w2', limit=2, now=150.0), ['obs2'])
+
+        # Lease which expired can not be renewed.
+        self.assertFalse(queue.renew('obs2', 'w1', now=150.0))
+        self.assertFalse(queue.renew('obs1', 'w1', now=190.0))
+
+        self.assertTrue(other.ack('obs2', 'w2'))
+        self.assertEqual(queue.counts(), {'done': 1, 'leased': 1})
+
+        queue.close()
+        other.close()
+
+    def test_retry(self):
+        queue = WorkQueue(self.filename, max_attempts=3, backoff=10.0)
+
+        queue.enqueue(['obs1'], now=0.0)
+
+        self.assertEqual(queue.lease('w1', now=0.0), ['obs1'])
+        self.assertTrue(queue.fail('obs1', 'w1', 'error 1', now=0.0))
+
+        # Retried after 10s, then 20s.
+        self.assertEqual(queue.lease('w1', now=9.0), [])
+        self.assertEqual(queue.lease('w1', now=10.0), ['obs1'])
+        self.assertTrue(queue.fail('obs1', 'w1', 'error 2', now=10.0))
+
+        self.assertEqual(queue.lease('w1', now=29.0), [])
+        self.assertEqual(queue.lease('w1', now=30.0), ['obs1'])
+        self.assertTrue(queue.fail('obs1', 'w1', 'error 3', now=30.0))
+
+        # No attempts remaining.
+        self.assertEqual(queue.lease('w1', now=1000.0), [])
+        self.assertEqual(queue.get_failed(), [('obs1', 'error 3')])
+
+        queue.close()